@@ -14,6 +14,7 @@
 #include "ILP/ILPDebug.h"
 #include "ILP/ILPUtil.h"
 #include "Logger.h"
+#include "PhaseTimings.h"
 #include "PassUtil.h"
 #include "ProfileHandler.h"
 
@@ -171,6 +172,10 @@ nlohmann::json ClusteredAnalysis::run(std::shared_ptr<HLAC::hlac> graph, bool sh
     auto clusteredTotalDuration = std::chrono::duration_cast<std::chrono::microseconds>(
         clusteredTotalEnd - clusteredTotalStart);
 
+    PhaseTimings::getInstance().add("ilp_build", totalBuildDuration);
+    PhaseTimings::getInstance().add("ilp_solve", totalSolveDuration);
+    PhaseTimings::getInstance().add("dag", totalDagDuration);
+
     if (showTimings) {
         auto &logger = Logger::getInstance();
         if (showAllTimings) {
@@ -189,6 +194,7 @@ nlohmann::json ClusteredAnalysis::run(std::shared_ptr<HLAC::hlac> graph, bool sh
 
     clusterCache.writeBackCache();
 
+    PhaseTimings::Scope outputPhase("output");
     nlohmann::json outputObject = nlohmann::json::object();
     outputObject["analysis"] = "clustered";
     outputObject["duration"] = clusteredTotalDuration.count();
@@ -13,15 +13,22 @@
 #include "EnergyFunction.h"
 #include "LLVMHandler.h"
 #include "Logger.h"
+#include "PhaseTimings.h"
 #include "PassUtil.h"
 #include "ProfileHandler.h"
 #include "LegacyAnalysis.h"
+#include "configuration/configurationUtils.h"
 
 nlohmann::json LegacyAnalysis::run(
     llvm::FunctionAnalysisManager &FAM,
-    FunctionTree *functionTree, bool showTimings, bool showAllTimings) {
+    FunctionTree *functionTree, const std::vector<Strategy> &strategies, bool showTimings, bool showAllTimings) {
     Logger::getInstance().log("Running Legacy Analysis for Energy", LOGLEVEL::INFO);
 
+    if (strategies.empty()) {
+        Logger::getInstance().log("No strategy provided for legacy analysis!", LOGLEVEL::ERROR);
+        return json::object();
+    }
+
     if (functionTree != nullptr) {
         auto legacyTotalStart = std::chrono::high_resolution_clock::now();
 
@@ -79,13 +86,43 @@ nlohmann::json LegacyAnalysis::run(
             if (!function->isDeclarationForLinker() && !function->getName().contains("llvm.dbg")) {
                 // Calculate the energy
                 constructProgramRepresentation(funcPool[i].programGraph, &funcPool[i], &handler,
-                                               &FAM, AnalysisStrategy::WORSTCASE);
+                                               &FAM, toAnalysisStrategy(strategies.front()));
                 //  Calculate the maximal amount of energy of the programgraph
             } else {
                 funcPool[i].programGraph = nullptr;
             }
         }
 
+        // Energy of every function for every strategy, indexed like the funcPool
+        std::vector<std::vector<double>> strategyEnergies(strategies.size(), std::vector<double>(funcPool.size()));
+        for (int i = 0; i < funcPool.size(); i++) {
+            strategyEnergies[0][i] = funcPool[i].energy;
+        }
+
+        // Evaluate the already constructed graphs for the remaining strategies. Every strategy starts from the same
+        // state as the first one and evaluates the functions in the same order, so the results equal separate runs
+        for (int s = 1; s < strategies.size(); s++) {
+            handler.efficient = 0;
+            handler.inefficient = 0;
+
+            for (auto &energyFunction : funcPool) {
+                energyFunction.energy = 0.0;
+            }
+
+            for (int i = 0; i < funcPool.size(); i++) {
+                if (funcPool[i].programGraph != nullptr) {
+                    funcPool[i].programGraph->resetEnergy(toAnalysisStrategy(strategies[s]));
+                    funcPool[i].energy = funcPool[i].programGraph->getEnergy(&handler);
+                }
+                strategyEnergies[s][i] = funcPool[i].energy;
+            }
+        }
+
+        // The energy of the first strategy is reported as the energy of the functions
+        for (int i = 0; i < funcPool.size(); i++) {
+            funcPool[i].energy = strategyEnergies[0][i];
+        }
+
         auto legacyAnalysisEnd = std::chrono::high_resolution_clock::now();
         auto legacyAnalysisDuration = std::chrono::duration_cast<std::chrono::microseconds>(
             legacyAnalysisEnd - legacyAnalysisStart);
@@ -93,6 +130,7 @@ nlohmann::json LegacyAnalysis::run(
         auto legacyTotalEnd = std::chrono::high_resolution_clock::now();
         auto legacyTotalDuration = std::chrono::duration_cast<std::chrono::microseconds>(
             legacyTotalEnd - legacyTotalStart);
+        PhaseTimings::getInstance().add("legacy", legacyTotalDuration);
 
         if (showTimings) {
             auto &logger = Logger::getInstance();
@@ -113,10 +151,16 @@ nlohmann::json LegacyAnalysis::run(
 
         // double duration = ms_double.count() / 1000;
 
+        PhaseTimings::Scope outputPhase("output");
         nlohmann::json outputObject = nlohmann::json::object();
         outputObject["analysis"] = "legacy";
         outputObject["duration"] = legacyAnalysisDuration.count();
         outputObject["functions"] = {};
+        outputObject["strategies"] = json::array();
+
+        for (auto strategy : strategies) {
+            outputObject["strategies"].push_back(ConfigurationUtils::strategyToStr(strategy));
+        }
 
         for (int i = 0; i < functionTree->getPreOrderVector().size(); i++) {
             auto energyFunction = &funcPool[i];
@@ -124,6 +168,11 @@ nlohmann::json LegacyAnalysis::run(
 
             json functionObject = json::object();
             functionObject["energy"] = energyFunction->energy;
+            functionObject["strategies"] = json::object();
+
+            for (int s = 0; s < strategies.size(); s++) {
+                functionObject["strategies"][ConfigurationUtils::strategyToStr(strategies[s])] = strategyEnergies[s][i];
+            }
 
             functionObject["nodes"] = nlohmann::json::array();
 
@@ -144,6 +193,17 @@ nlohmann::json LegacyAnalysis::run(
     }
 }
 
+AnalysisStrategy::Strategy LegacyAnalysis::toAnalysisStrategy(Strategy strategy) {
+    switch (strategy) {
+        case Strategy::BEST:
+            return AnalysisStrategy::BESTCASE;
+        case Strategy::AVERAGE:
+            return AnalysisStrategy::AVERAGECASE;
+        default:
+            return AnalysisStrategy::WORSTCASE;
+    }
+}
+
 /**
  * Calculates ProgramGraph-representation of a function
  * @param energyFunc Function to construct the graph for
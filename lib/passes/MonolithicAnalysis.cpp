@@ -15,6 +15,7 @@
 #include "ILP/ILPBuilder.h"
 #include "ILP/ILPUtil.h"
 #include "Logger.h"
+#include "PhaseTimings.h"
 #include "PassUtil.h"
 #include "ProfileHandler.h"
 #include "ILP/ILPDebug.h"
@@ -191,6 +192,9 @@ nlohmann::json MonolithicAnalysis::run(std::shared_ptr<HLAC::hlac> graph, bool s
     auto monoTotalDuration = std::chrono::duration_cast<std::chrono::microseconds>(
         monoTotalEnd - monoTotalStart);
 
+    PhaseTimings::getInstance().add("ilp_build", totalBuildDuration);
+    PhaseTimings::getInstance().add("ilp_solve", totalSolveDuration);
+
     if (showTimings) {
         auto &logger = Logger::getInstance();
         if (showAllTimings) {
@@ -207,6 +211,7 @@ nlohmann::json MonolithicAnalysis::run(std::shared_ptr<HLAC::hlac> graph, bool s
 
     // graph->printDotRepresentation();
 
+    PhaseTimings::Scope outputPhase("output");
     nlohmann::json outputObject = nlohmann::json::object();
     outputObject["analysis"] = "monolithic";
     outputObject["duration"] = monoTotalDuration.count();
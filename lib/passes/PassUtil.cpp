@@ -22,12 +22,14 @@
 #include <vector>
 
 #include "ClusteredAnalysis.h"
+#include "ConfigParser.h"
 #include "FunctionTree.h"
 #include "HLAC/hlacwrapper.h"
 #include "HLAC/util.h"
 #include "LegacyAnalysis.h"
 #include "MonolithicAnalysis.h"
 #include "PassUtil.h"
+#include "PhaseTimings.h"
 
 std::string PassUtil::formatScientific(double value, int precision) {
     std::ostringstream outputStream;
@@ -66,7 +68,8 @@ void PassUtil::prepareFunctionsForLegacyAnalysis(llvm::Module &module,
     }
 }
 
-json PassUtil::legacyWrapper(llvm::Module &module, llvm::FunctionAnalysisManager &functionAnalysisManager) {
+json PassUtil::legacyWrapper(llvm::Module &module, llvm::FunctionAnalysisManager &functionAnalysisManager,
+                             const std::vector<Strategy> &strategies) {
     auto legacyPreparationStart = std::chrono::high_resolution_clock::now();
 
     prepareFunctionsForLegacyAnalysis(module, functionAnalysisManager);
@@ -74,6 +77,7 @@ json PassUtil::legacyWrapper(llvm::Module &module, llvm::FunctionAnalysisManager
     auto legacyPreparationEnd = std::chrono::high_resolution_clock::now();
     auto legacyPreparationTime =
             std::chrono::duration_cast<std::chrono::microseconds>(legacyPreparationEnd - legacyPreparationStart);
+    PhaseTimings::getInstance().add("legacy", legacyPreparationTime);
 
     /*Logger::getInstance().log(
         "Legacy IR preparation took: " + std::to_string(legacyPreparationTime.count()) + " µs",
@@ -92,7 +96,7 @@ json PassUtil::legacyWrapper(llvm::Module &module, llvm::FunctionAnalysisManager
         throw std::runtime_error("Could not construct FunctionTree: main function not found.");
     }
 
-    return LegacyAnalysis::run(functionAnalysisManager, functionTree, SHOWTIMINGS);
+    return LegacyAnalysis::run(functionAnalysisManager, functionTree, strategies, SHOWTIMINGS);
 }
 
 void PassUtil::collectCallNodeBindingsFromNestedNodes(HLAC::GenericNode *currentNode, std::size_t topLevelNodeIndex,
@@ -141,6 +145,7 @@ void PassUtil::cacheDirectNodeEnergies(HLAC::GenericNode *currentNode,
 std::shared_ptr<HLAC::hlac> PassUtil::buildInitializedGraph(llvm::Module &module,
                                                             llvm::FunctionAnalysisManager &functionAnalysisManager,
                                                             ResultRegistry &resultRegistry) {
+    PhaseTimings::Scope hlacPhase("hlac");
     auto postOrderFunctionList = HLAC::Util::getLazyCallGraphPostOrder(module, functionAnalysisManager);
 
     auto getTargetLibraryInfo = [&functionAnalysisManager](llvm::Function &function) -> llvm::TargetLibraryInfo & {
@@ -245,7 +250,8 @@ PassUtil::runComparisonAnalysesOnClonedModules(llvm::Module &module, llvm::Modul
 
     std::unordered_map<std::string, nlohmann::json> output = {};
 
-    auto legacyOutput = legacyWrapper(*legacyModule, legacyFunctionAnalysisManager);
+    auto legacyOutput = legacyWrapper(*legacyModule, legacyFunctionAnalysisManager,
+                                      ConfigParser::getAnalysisConfiguration().legacyconfig.strategies);
     auto monolithicOutput =
             runMonolithicOnModule(*monolithicModule, monolithicFunctionAnalysisManager, monolithicRegistry);
     auto clusteredOutput = runClusteredOnModule(*clusteredModule, clusteredFunctionAnalysisManager, clusteredRegistry);
@@ -25,6 +25,7 @@
 #include "EnergyFunction.h"
 #include "HLAC/hlac.h"
 #include "PhasarHandler.h"
+#include "PhaseTimings.h"
 #include "ProfileHandler.h"
 #include "ProgramGraph.h"
 
@@ -35,6 +36,7 @@
 #include "OutputHandler.h"
 #include "PassUtil.h"
 #include "analyses/ResultRegistry.h"
+#include "configuration/configurationUtils.h"
 
 
 using json = nlohmann::json;
@@ -49,7 +51,7 @@ llvm::cl::opt<std::string> formatParameter("format", llvm::cl::desc("Format to p
                                            llvm::cl::value_desc("Please choose out of the options json/plain"));
 
 llvm::cl::opt<std::string>
-        analysisStrategyParameter("strategy", llvm::cl::desc("The strategy to analyze"),
+        analysisStrategyParameter("strategy", llvm::cl::desc("The strategies to analyze, separated by commas"),
                                   llvm::cl::value_desc("Please choose out of the options worst/average/best"));
 
 llvm::cl::opt<std::string>
@@ -78,15 +80,27 @@ struct Energy : llvm::PassInfoMixin<Energy> {
 
     std::string filepath;
 
+    /**
+     * Receives the output of the analysis instead of the output directory if set
+     */
+    std::shared_ptr<json> collectedOutput;
+
     /**
      * Constructor to run, when called from a method
      * @param filename Path to the .json file containing the energymodel
+     * @param registry Results of the loop bound and feasibility analyses
+     * @param collectedOutput Receives the output instead of the output directory, nullptr to write the output files
      */
-    explicit Energy(const std::string &filename, ResultRegistry &registry) {
+    explicit Energy(const std::string &filename, ResultRegistry &registry,
+                    std::shared_ptr<json> collectedOutput = nullptr) {
+        this->collectedOutput = std::move(collectedOutput);
+
         if (llvm::sys::fs::exists(filename) && !llvm::sys::fs::is_directory(filename)) {
-            // Create a JSONHandler object and read in the energypath
+            // Create a JSONHandler object and read in the energypath. A server reads the profile only once
             ProfileHandler &phandler = ProfileHandler::get_instance();
-            phandler.read(filename);
+            if (!phandler.isLoaded(filename)) {
+                phandler.read(filename);
+            }
             this->energyJson = phandler.getProfile()["cpu"];
 
             this->stopwatch_start = std::chrono::steady_clock::now();
@@ -348,12 +362,12 @@ struct Energy : llvm::PassInfoMixin<Energy> {
      * Function to run the analysis on a given module
      * @param module LLVM::Module to run the analysis on
      * @param moduleAnalysisManager llvm::ModuleAnalysisManager
-     * @param analysisStrategy Strategy to analyze the module with
+     * @param strategies Strategies to analyze the module with
      */
     void analysisRunner(
         llvm::Module &module,
         llvm::ModuleAnalysisManager &moduleAnalysisManager,
-        AnalysisStrategy::Strategy analysisStrategy) {
+        const std::vector<Strategy> &strategies) {
         auto &functionAnalysisManager =
             moduleAnalysisManager.getResult<llvm::FunctionAnalysisManagerModuleProxy>(module).getManager();
 
@@ -368,7 +382,7 @@ struct Energy : llvm::PassInfoMixin<Energy> {
 
         switch (ConfigParser::getAnalysisConfiguration().analysisType) {
             case AnalysisType::LEGACY:
-                output["legacy"] = PassUtil::legacyWrapper(module, functionAnalysisManager);
+                output["legacy"] = PassUtil::legacyWrapper(module, functionAnalysisManager, strategies);
                 break;
 
             case AnalysisType::MONOLITHIC: {
@@ -396,6 +410,27 @@ struct Energy : llvm::PassInfoMixin<Energy> {
                 break;
         }
 
+        // Every output document carries the phase timings of the whole run
+        const json timings = PhaseTimings::getInstance().toJson();
+        for (auto& [analysisName, analysisOutput] : output) {
+            if (analysisOutput.is_object()) {
+                analysisOutput["timings"] = timings;
+            }
+        }
+
+        // Collected output has the layout of the written files, the analyses are keyed by name if there are several
+        if (this->collectedOutput != nullptr) {
+            if (output.size() == 1) {
+                *this->collectedOutput = output.begin()->second;
+            } else {
+                *this->collectedOutput = json::object();
+                for (const auto& [analysisName, analysisOutput] : output) {
+                    (*this->collectedOutput)[analysisName] = analysisOutput;
+                }
+            }
+            return;
+        }
+
         auto filename = PassUtil::extractFileNameWithoutExtension(module.getName().str());
         const AnalysisOutputMode outputMode = ConfigParser::getAnalysisConfiguration().analysisOutputMode;
 
@@ -451,15 +486,22 @@ struct Energy : llvm::PassInfoMixin<Energy> {
      * @param moduleAnalysisManager Reference to a ModuleAnalysisManager
      */
     llvm::PreservedAnalyses run(llvm::Module &module, llvm::ModuleAnalysisManager &moduleAnalysisManager) {
-        auto strategy = ConfigParser::getAnalysisConfiguration().legacyconfig.strategy;
-
-        // Check the analysis-strategy the user requestet
-        if (strategy == Strategy::BEST) {
-            analysisRunner(module, moduleAnalysisManager, AnalysisStrategy::BESTCASE);
-        } else if (strategy == Strategy::WORST) {
-            analysisRunner(module, moduleAnalysisManager, AnalysisStrategy::WORSTCASE);
-        } else if (strategy == Strategy::AVERAGE) {
-            analysisRunner(module, moduleAnalysisManager, AnalysisStrategy::AVERAGECASE);
+        // Strategies given to the pass take precedence over the configured ones
+        if (!analysisStrategyParameter.empty()) {
+            auto strategies = ConfigurationUtils::strToStrategies(analysisStrategyParameter);
+            if (!strategies.empty()) {
+                ConfigParser::setStrategies(strategies);
+            } else {
+                llvm::errs() << "Please provide valid analysis strategies: best/worst/average" << "\n";
+                return llvm::PreservedAnalyses::all();
+            }
+        }
+
+        auto strategies = ConfigParser::getAnalysisConfiguration().legacyconfig.strategies;
+
+        // Check the analysis-strategies the user requested. All of them are evaluated in a single run
+        if (!strategies.empty()) {
+            analysisRunner(module, moduleAnalysisManager, strategies);
         } else {
             llvm::errs() << "Please provide a valid analysis strategy: best/worst/average"
                          << "\n";
@@ -0,0 +1,351 @@
+/*
+ * Copyright (c) 2026 Maximilian Krebs
+ * All rights reserved.
+*/
+
+#include "AnalysisServer.h"
+
+#include <fcntl.h>
+#include <poll.h>
+#include <sys/resource.h>
+#include <sys/socket.h>
+#include <sys/un.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+#include <algorithm>
+#include <cerrno>
+#include <csignal>
+#include <cstdio>
+#include <cstring>
+#include <exception>
+#include <iostream>
+#include <string>
+#include <utility>
+
+static volatile std::sig_atomic_t stopRequested = 0;
+
+static void handleStopSignal(int) {
+    stopRequested = 1;
+}
+
+AnalysisServer::AnalysisServer(std::string socketPath, int workers, Handler handler)
+    : socketPath(std::move(socketPath)), workers(std::max(workers, 1)), handler(std::move(handler)) {}
+
+AnalysisServer::~AnalysisServer() {
+    for (auto &worker : running) {
+        kill(worker.pid, SIGKILL);
+        waitpid(worker.pid, nullptr, 0);
+        close(worker.pipe);
+    }
+
+    for (auto &[client, buffer] : clients) {
+        close(client);
+    }
+
+    if (listenFd >= 0) {
+        close(listenFd);
+        unlink(socketPath.c_str());
+    }
+}
+
+bool AnalysisServer::listen() {
+    sockaddr_un address{};
+    address.sun_family = AF_UNIX;
+
+    if (socketPath.size() >= sizeof(address.sun_path)) {
+        std::cerr << "Error: Socket path is too long: " << socketPath << std::endl;
+        return false;
+    }
+    std::strncpy(address.sun_path, socketPath.c_str(), sizeof(address.sun_path) - 1);
+
+    listenFd = socket(AF_UNIX, SOCK_STREAM | SOCK_CLOEXEC, 0);
+    if (listenFd < 0) {
+        std::perror("socket");
+        return false;
+    }
+
+    // A socket left behind by a previous server would make bind fail
+    unlink(socketPath.c_str());
+
+    if (bind(listenFd, reinterpret_cast<sockaddr *>(&address), sizeof(address)) < 0 ||
+        ::listen(listenFd, SOMAXCONN) < 0) {
+        std::perror("bind");
+        close(listenFd);
+        listenFd = -1;
+        return false;
+    }
+
+    return true;
+}
+
+int AnalysisServer::run() {
+    if (!listen()) {
+        return 1;
+    }
+
+    struct sigaction action{};
+    action.sa_handler = handleStopSignal;
+    sigemptyset(&action.sa_mask);
+    sigaction(SIGINT, &action, nullptr);
+    sigaction(SIGTERM, &action, nullptr);
+    signal(SIGPIPE, SIG_IGN);
+
+    std::cout << "Listening on " << socketPath << " with " << workers << " workers" << std::endl;
+
+    while (!stopRequested) {
+        std::vector<pollfd> descriptors;
+        descriptors.push_back({listenFd, POLLIN, 0});
+
+        for (auto &[client, buffer] : clients) {
+            if (draining.count(client) == 0) {
+                descriptors.push_back({client, POLLIN, 0});
+            }
+        }
+        for (auto &worker : running) {
+            descriptors.push_back({worker.pipe, POLLIN, 0});
+        }
+
+        if (poll(descriptors.data(), descriptors.size(), -1) < 0) {
+            if (errno == EINTR) {
+                continue;
+            }
+            std::perror("poll");
+            return 1;
+        }
+
+        for (const auto &descriptor : descriptors) {
+            if (descriptor.revents == 0) {
+                continue;
+            }
+
+            if (descriptor.fd == listenFd) {
+                acceptClient();
+                continue;
+            }
+
+            auto worker = std::find_if(running.begin(), running.end(),
+                                       [&](const Worker &w) { return w.pipe == descriptor.fd; });
+            if (worker != running.end()) {
+                if (!readWorker(&*worker)) {
+                    Worker finished = std::move(*worker);
+                    running.erase(worker);
+                    finishWorker(finished);
+                }
+            } else if (clients.count(descriptor.fd) != 0 && !readClient(descriptor.fd)) {
+                // A client may stop sending and still wait for its responses
+                if (hasPendingRequests(descriptor.fd)) {
+                    draining.insert(descriptor.fd);
+                } else {
+                    closeClient(descriptor.fd);
+                }
+            }
+        }
+
+        startJobs();
+    }
+
+    std::cout << "Shutting down" << std::endl;
+    return 0;
+}
+
+void AnalysisServer::acceptClient() {
+    int client = accept4(listenFd, nullptr, nullptr, SOCK_CLOEXEC);
+
+    if (client >= 0) {
+        clients[client] = "";
+    }
+}
+
+bool AnalysisServer::readClient(int client) {
+    char buffer[4096];
+    ssize_t length = ::read(client, buffer, sizeof(buffer));
+
+    if (length <= 0) {
+        return length < 0 && errno == EINTR;
+    }
+
+    std::string &pending = clients[client];
+    pending.append(buffer, length);
+
+    size_t newline;
+    while ((newline = pending.find('\n')) != std::string::npos) {
+        std::string line = pending.substr(0, newline);
+        pending.erase(0, newline + 1);
+
+        if (line.find_first_not_of(" \t\r") == std::string::npos) {
+            continue;
+        }
+
+        json request = json::parse(line, nullptr, false);
+        if (request.is_discarded() || !request.is_object()) {
+            send(client, {{"status", "error"}, {"error", "Request is not a JSON object"}});
+            continue;
+        }
+
+        queue.push_back({client, request});
+    }
+
+    return true;
+}
+
+bool AnalysisServer::hasPendingRequests(int client) const {
+    return std::any_of(queue.begin(), queue.end(), [&](const Job &job) { return job.client == client; }) ||
+           std::any_of(running.begin(), running.end(), [&](const Worker &worker) { return worker.client == client; });
+}
+
+void AnalysisServer::closeClient(int client) {
+    close(client);
+    clients.erase(client);
+    draining.erase(client);
+
+    // Queued requests of the client are dropped, running ones finish without being answered
+    queue.erase(std::remove_if(queue.begin(), queue.end(), [&](const Job &job) { return job.client == client; }),
+                queue.end());
+
+    for (auto &worker : running) {
+        if (worker.client == client) {
+            worker.client = -1;
+        }
+    }
+}
+
+void AnalysisServer::startJobs() {
+    while (!queue.empty() && running.size() < static_cast<size_t>(workers)) {
+        Job job = std::move(queue.front());
+        queue.pop_front();
+        startJob(job);
+    }
+}
+
+void AnalysisServer::startJob(const Job &job) {
+    json id = job.request.contains("id") ? job.request["id"] : json(nullptr);
+
+    int pipeFds[2];
+    if (pipe2(pipeFds, O_CLOEXEC) < 0) {
+        send(job.client, {{"id", id}, {"status", "error"}, {"error", std::strerror(errno)}});
+        return;
+    }
+
+    std::cout.flush();
+    pid_t pid = fork();
+
+    if (pid < 0) {
+        close(pipeFds[0]);
+        close(pipeFds[1]);
+        send(job.client, {{"id", id}, {"status", "error"}, {"error", std::strerror(errno)}});
+        return;
+    }
+
+    if (pid == 0) {
+        close(pipeFds[0]);
+        signal(SIGINT, SIG_DFL);
+        signal(SIGTERM, SIG_DFL);
+
+        answer(job.request, pipeFds[1]);
+
+        std::cout.flush();
+        std::cerr.flush();
+        _exit(0);
+    }
+
+    close(pipeFds[1]);
+    running.push_back({pid, pipeFds[0], job.client, id, "", std::chrono::steady_clock::now()});
+}
+
+void AnalysisServer::answer(const json &request, int fd) {
+    json response = {{"id", request.contains("id") ? request["id"] : json(nullptr)}};
+
+    if (request.contains("program")) {
+        response["program"] = request["program"];
+    }
+
+    try {
+        response["result"] = handler(request);
+        response["status"] = "ok";
+    } catch (const std::exception &exception) {
+        response["status"] = "error";
+        response["error"] = exception.what();
+    }
+
+    std::string line = response.dump(-1, ' ', false, json::error_handler_t::replace) + "\n";
+    const char *data = line.data();
+    size_t remaining = line.size();
+
+    while (remaining > 0) {
+        ssize_t written = write(fd, data, remaining);
+        if (written < 0) {
+            if (errno == EINTR) {
+                continue;
+            }
+            return;
+        }
+        data += written;
+        remaining -= written;
+    }
+}
+
+bool AnalysisServer::readWorker(Worker *worker) {
+    char buffer[65536];
+    ssize_t length = ::read(worker->pipe, buffer, sizeof(buffer));
+
+    if (length < 0 && errno == EINTR) {
+        return true;
+    }
+    if (length <= 0) {
+        return false;
+    }
+
+    worker->output.append(buffer, length);
+    return true;
+}
+
+void AnalysisServer::finishWorker(const Worker &worker) {
+    close(worker.pipe);
+
+    int status = 0;
+    rusage usage{};
+    wait4(worker.pid, &status, 0, &usage);
+
+    auto duration = std::chrono::duration_cast<std::chrono::microseconds>(
+        std::chrono::steady_clock::now() - worker.start);
+
+    json response = json::parse(worker.output, nullptr, false);
+
+    if (response.is_discarded() || !response.is_object()) {
+        std::string reason = WIFSIGNALED(status)
+            ? "Analysis worker was terminated by signal " + std::to_string(WTERMSIG(status))
+            : "Analysis worker exited with status " + std::to_string(WEXITSTATUS(status)) + " without a result";
+        response = {{"id", worker.id}, {"status", "error"}, {"error", reason}};
+    }
+
+    response["duration"] = duration.count();
+    // ru_maxrss is in KiB and includes the pages the worker shares with the server
+    response["maxrss"] = static_cast<int64_t>(usage.ru_maxrss) * 1024;
+
+    if (worker.client >= 0) {
+        send(worker.client, response);
+
+        if (draining.count(worker.client) != 0 && !hasPendingRequests(worker.client)) {
+            closeClient(worker.client);
+        }
+    }
+}
+
+void AnalysisServer::send(int client, const json &response) {
+    std::string line = response.dump(-1, ' ', false, json::error_handler_t::replace) + "\n";
+    const char *data = line.data();
+    size_t remaining = line.size();
+
+    while (remaining > 0) {
+        ssize_t written = ::send(client, data, remaining, MSG_NOSIGNAL);
+        if (written < 0) {
+            if (errno == EINTR) {
+                continue;
+            }
+            return;
+        }
+        data += written;
+        remaining -= written;
+    }
+}
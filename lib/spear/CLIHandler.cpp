@@ -6,9 +6,12 @@
 
 #include "CLIHandler.h"
 
+#include <glob.h>
 #include <unistd.h>
 
+#include <algorithm>
 #include <filesystem>
+#include <fstream>
 #include <iostream>
 #include <stdexcept>
 #include <string>
@@ -37,6 +40,10 @@ CLIOptions CLIHandler::parseCLI(int argc, char **argv) {
             if (arg == "profile") {
                 operation = Operation::PROFILE;
             }
+
+            if (arg == "serve") {
+                operation = Operation::SERVE;
+            }
         }
 
         // Check the operations for the subprogram
@@ -97,7 +104,9 @@ CLIOptions CLIHandler::parseCLI(int argc, char **argv) {
             std::string profilePath;
             std::string configPath;
             std::string programPath;
+            std::string strategies;
             std::string forFunction;
+            int workers = 0;
 
             for (const auto &arg : arguments) {
                 if (arg == "--profile") {
@@ -122,15 +131,79 @@ CLIOptions CLIHandler::parseCLI(int argc, char **argv) {
 
                 if (arg == "--program") {
                     if (hasOption(arguments, "--program")) {
-                        const std::string_view programString = get_option(arguments, "--program");
+                        const std::string programString(get_option(arguments, "--program"));
 
-                        if (CLIHandler::exists(programString.data())) {
+                        // Patterns are expanded later, lists are given as @path
+                        bool isList = programString.size() > 1 && programString[0] == '@';
+                        if (CLIHandler::exists(isList ? programString.substr(1) : programString) ||
+                            isGlobPattern(programString)) {
                             programPath = programString;
                         }
                     }
                 }
+
+                if (arg == "--strategy") {
+                    if (hasOption(arguments, "--strategy")) {
+                        strategies = get_option(arguments, "--strategy");
+                    }
+                }
+
+                if (arg == "--workers") {
+                    if (hasOption(arguments, "--workers")) {
+                        try {
+                            workers = std::stoi(std::string(get_option(arguments, "--workers")));
+                        } catch (const std::exception &) {
+                            workers = -1;
+                        }
+                    }
+                }
+            }
+            return AnalysisOptions(profilePath, configPath, programPath, strategies, workers);
+
+        } else if (operation == Operation::SERVE) {
+            std::string profilePath;
+            std::string configPath;
+            std::string socketPath;
+            int workers = 0;
+
+            for (const auto &arg : arguments) {
+                if (arg == "--profile") {
+                    if (hasOption(arguments, "--profile")) {
+                        const std::string_view profileString = get_option(arguments, "--profile");
+
+                        if (CLIHandler::exists(profileString.data())) {
+                            profilePath = profileString;
+                        }
+                    }
+                }
+
+                if (arg == "--config") {
+                    if (hasOption(arguments, "--config")) {
+                        const std::string_view configLocationString = get_option(arguments, "--config");
+
+                        if (CLIHandler::exists(configLocationString.data())) {
+                            configPath = configLocationString;
+                        }
+                    }
+                }
+
+                if (arg == "--socket") {
+                    if (hasOption(arguments, "--socket")) {
+                        socketPath = get_option(arguments, "--socket");
+                    }
+                }
+
+                if (arg == "--workers") {
+                    if (hasOption(arguments, "--workers")) {
+                        try {
+                            workers = std::stoi(std::string(get_option(arguments, "--workers")));
+                        } catch (const std::exception &) {
+                            workers = -1;
+                        }
+                    }
+                }
             }
-            return AnalysisOptions(profilePath, configPath, programPath);
+            return ServeOptions(profilePath, configPath, socketPath, workers);
         }
     }
 
@@ -138,6 +211,59 @@ CLIOptions CLIHandler::parseCLI(int argc, char **argv) {
     return {};
 }
 
+std::vector<std::string> CLIHandler::expandProgramPaths(const std::string &programSpec) {
+    std::vector<std::string> programs;
+
+    if (programSpec.size() > 1 && programSpec[0] == '@') {
+        std::ifstream list(programSpec.substr(1));
+        std::string line;
+
+        while (std::getline(list, line)) {
+            line.erase(0, line.find_first_not_of(" \t"));
+            line.erase(line.find_last_not_of(" \t\r") + 1);
+
+            if (!line.empty() && line[0] != '#') {
+                programs.push_back(line);
+            }
+        }
+        return programs;
+    }
+
+    if (std::filesystem::is_directory(programSpec)) {
+        for (const auto &entry : std::filesystem::directory_iterator(programSpec)) {
+            if (entry.is_regular_file() && entry.path().extension() == ".ll") {
+                programs.push_back(entry.path().string());
+            }
+        }
+        std::sort(programs.begin(), programs.end());
+        return programs;
+    }
+
+    if (isGlobPattern(programSpec)) {
+        glob_t matches;
+
+        if (glob(programSpec.c_str(), 0, nullptr, &matches) == 0) {
+            for (size_t i = 0; i < matches.gl_pathc; i++) {
+                if (std::filesystem::is_regular_file(matches.gl_pathv[i])) {
+                    programs.emplace_back(matches.gl_pathv[i]);
+                }
+            }
+        }
+        globfree(&matches);
+        return programs;
+    }
+
+    if (std::filesystem::is_regular_file(programSpec)) {
+        programs.push_back(programSpec);
+    }
+
+    return programs;
+}
+
+bool CLIHandler::isGlobPattern(const std::string &programSpec) {
+    return programSpec.find_first_of("*?[") != std::string::npos;
+}
+
 bool CLIHandler::hasOption(const std::vector<std::string_view> &arguments, const std::string_view &option_name) {
     for (auto it = arguments.begin(), end = arguments.end(); it != end; ++it) {
         if (*it == option_name) {
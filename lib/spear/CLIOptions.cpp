@@ -15,18 +15,33 @@ ProfileOptions::ProfileOptions(std::string codePath, std::string configPath, std
     this->operation = Operation::PROFILE;
 }
 
-AnalysisOptions::AnalysisOptions(std::string profilePath, std::string configPath, std::string programPath) {
+AnalysisOptions::AnalysisOptions(std::string profilePath, std::string configPath, std::string programPath,
+                                 std::string strategies, int workers) {
     this->profilePath = std::move(profilePath);
     this->programPath = std::move(programPath);
     this->configPath = std::move(configPath);
+    this->strategies = std::move(strategies);
+    this->workers = workers;
 
     this->operation = Operation::ANALYZE;
 }
 
+ServeOptions::ServeOptions(std::string profilePath, std::string configPath, std::string socketPath, int workers) {
+    this->profilePath = std::move(profilePath);
+    this->configPath = std::move(configPath);
+    this->socketPath = std::move(socketPath);
+    this->workers = workers;
+
+    this->operation = Operation::SERVE;
+}
+
 CLIOptions::CLIOptions() {
     this->codePath = "";
     this->saveLocation = "";
     this->profilePath = "";
     this->operation = Operation::UNDEFINED;
     this->programPath = "";
+    this->strategies = "";
+    this->socketPath = "";
+    this->workers = 0;
 }
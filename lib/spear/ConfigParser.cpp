@@ -107,11 +107,8 @@ bool ConfigParser::fallbackValid(json object) {
 }
 
 bool ConfigParser::strategyValid(json object) {
-    if (object.contains("strategy") && object["strategy"].is_string()) {
-        std::string strategy = object["strategy"];
-        auto strat = ConfigurationUtils::strToStrategy(strategy);
-
-        if (strat != Strategy::UNDEFINED) {
+    if (object.contains("strategy") && (object["strategy"].is_string() || object["strategy"].is_array())) {
+        if (!parseStrategies(object["strategy"]).empty()) {
             return true;
         }
         std::cout << "Invalid analysis.strategy: unsupported value." << std::endl;
@@ -122,6 +119,22 @@ bool ConfigParser::strategyValid(json object) {
     return false;
 }
 
+std::vector<Strategy> ConfigParser::parseStrategies(const json &value) {
+    if (value.is_string()) {
+        return ConfigurationUtils::strToStrategies(value.get<std::string>());
+    }
+
+    std::string joined;
+    for (const auto &item : value) {
+        if (!item.is_string()) {
+            return {};
+        }
+        joined += (joined.empty() ? "" : ",") + item.get<std::string>();
+    }
+
+    return ConfigurationUtils::strToStrategies(joined);
+}
+
 bool ConfigParser::modeValid(json object) {
     if (object.contains("mode") && object["mode"].is_string()) {
         std::string mode = object["mode"];
@@ -343,6 +356,11 @@ AnalysisConfiguration ConfigParser::getAnalysisConfiguration() {
     return analysisConfiguration;
 }
 
+void ConfigParser::setStrategies(const std::vector<Strategy> &strategies) {
+    analysisConfiguration.legacyconfig.strategies = strategies;
+    analysisConfiguration.legacyconfig.strategy = strategies.front();
+}
+
 ProfilingConfiguration ConfigParser::getProfilingConfiguration() {
     return profilingConfiguration;
 }
@@ -370,8 +388,8 @@ void ConfigParser::parse() {
             legacyconfig["mode"].get<std::string>());
         analysisConfiguration.legacyconfig.format = ConfigurationUtils::strToFormat(
             legacyconfig["format"].get<std::string>());
-        analysisConfiguration.legacyconfig.strategy = ConfigurationUtils::strToStrategy(
-            legacyconfig["strategy"].get<std::string>());
+        analysisConfiguration.legacyconfig.strategies = parseStrategies(legacyconfig["strategy"]);
+        analysisConfiguration.legacyconfig.strategy = analysisConfiguration.legacyconfig.strategies.front();
         analysisConfiguration.legacyconfig.deepcalls = false;
 
         // Clear previous fallback configuration
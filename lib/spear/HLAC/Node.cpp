@@ -13,6 +13,7 @@
 #include "HLAC/HLACHashing.h"
 #include "HLAC/hlac.h"
 #include "HLAC/util.h"
+#include "InstructionCategory.h"
 #include "Logger.h"
 #include "ProfileHandler.h"
 
@@ -126,19 +127,14 @@ double Node::getEnergy() {
     auto &pHandler = ProfileHandler::get_instance();
 
     for (const llvm::Instruction &I : *this->block) {
-        std::string instname = I.getOpcodeName();
-
-        if (auto icmpinst = llvm::dyn_cast<llvm::ICmpInst>(&I)) {
-            instname = std::string("icmp ") + llvm::ICmpInst::getPredicateName(icmpinst->getPredicate()).str();
-        }
-
-        auto candiate = pHandler.getEnergyForInstruction(instname);
+        // Prefer the energy of the type the instruction operates on, e.g. fadd.v4f32 over fadd
+        auto candiate = pHandler.getEnergyForInstruction(InstructionCategory::getProfileKeys(I));
         if (candiate.has_value()) {
             energy += candiate.value();
         } else {
             // If we do not have an energy value for the instruction, we log this and continue with the next instruction
             /*Logger::getInstance().log(
-                    "No energy value found for instruction: " + std::string(instname)
+                    "No energy value found for instruction: " + std::string(I.getOpcodeName())
                     + " Using unknown value if exists!",
                     LOGLEVEL::WARNING);*/
 
@@ -5,7 +5,10 @@
 
 #include "InstructionCategory.h"
 #include <llvm/IR/Instructions.h>
+#include <llvm/IR/IntrinsicInst.h>
+#include <llvm/IR/DerivedTypes.h>
 
+#include <cstring>
 #include <vector>
 #include <string>
 
@@ -159,3 +162,68 @@ double InstructionCategory::getCalledFunctionEnergy(
 
     return energy;
 }
+
+std::string InstructionCategory::getProfileName(const llvm::Instruction &Instruction) {
+    // Comparisons are profiled separately for every predicate
+    if (auto icmpinst = llvm::dyn_cast<llvm::ICmpInst>(&Instruction)) {
+        return std::string("icmp ") + llvm::ICmpInst::getPredicateName(icmpinst->getPredicate()).str();
+    }
+
+    return Instruction.getOpcodeName();
+}
+
+std::string InstructionCategory::getTypeSuffix(const llvm::Type *Type) {
+    if (auto vectorType = llvm::dyn_cast<llvm::FixedVectorType>(Type)) {
+        auto element = getTypeSuffix(vectorType->getElementType());
+        if (element.empty()) {
+            return "";
+        }
+        return "v" + std::to_string(vectorType->getNumElements()) + element;
+    }
+
+    if (Type->isIntegerTy()) {
+        return "i" + std::to_string(Type->getIntegerBitWidth());
+    } else if (Type->isHalfTy()) {
+        return "f16";
+    } else if (Type->isFloatTy()) {
+        return "f32";
+    } else if (Type->isDoubleTy()) {
+        return "f64";
+    }
+
+    return "";
+}
+
+std::vector<std::string> InstructionCategory::getProfileKeys(const llvm::Instruction &Instruction) {
+    std::vector<std::string> keys;
+    std::string name = getProfileName(Instruction);
+    const llvm::Type *type = nullptr;
+
+    if (auto intrinsic = llvm::dyn_cast<llvm::IntrinsicInst>(&Instruction)) {
+        // Vector reductions are profiled as reduce.<operation>, the reduced vector is their last argument
+        auto callee = intrinsic->getCalledFunction()->getName();
+        if (callee.startswith("llvm.vector.reduce.")) {
+            auto operation = callee.drop_front(std::strlen("llvm.vector.reduce.")).split('.').first;
+            type = intrinsic->getArgOperand(intrinsic->arg_size() - 1)->getType();
+            keys.push_back("reduce." + operation.str() + "." + getTypeSuffix(type));
+        }
+    } else if (auto extractinst = llvm::dyn_cast<llvm::ExtractElementInst>(&Instruction)) {
+        type = extractinst->getVectorOperandType();
+    } else if (llvm::isa<llvm::CmpInst>(Instruction)) {
+        type = Instruction.getOperand(0)->getType();
+    } else if (!Instruction.getType()->isVoidTy()) {
+        type = Instruction.getType();
+    } else if (Instruction.getNumOperands() > 0) {
+        type = Instruction.getOperand(0)->getType();
+    }
+
+    if (keys.empty() && type != nullptr) {
+        auto suffix = getTypeSuffix(type);
+        if (!suffix.empty()) {
+            keys.push_back(name + "." + suffix);
+        }
+    }
+
+    keys.push_back(name);
+    return keys;
+}
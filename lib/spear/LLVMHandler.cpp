@@ -34,13 +34,8 @@ double LLVMHandler::getNodeSum(Node *node) {
     auto &pHandler = ProfileHandler::get_instance();
 
     for (const llvm::Instruction &I : *node->block) {
-        std::string instname = I.getOpcodeName();
-
-        if (auto icmpinst = llvm::dyn_cast<llvm::ICmpInst>(&I)) {
-            instname = std::string("icmp ") + llvm::ICmpInst::getPredicateName(icmpinst->getPredicate()).str();
-        }
-
-        auto candiate = pHandler.getEnergyForInstruction(instname);
+        // Prefer the energy of the type the instruction operates on, e.g. fadd.v4f32 over fadd
+        auto candiate = pHandler.getEnergyForInstruction(InstructionCategory::getProfileKeys(I));
         if (candiate.has_value()) {
             energy += candiate.value();
         } else {
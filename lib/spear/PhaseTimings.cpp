@@ -0,0 +1,48 @@
+/*
+ * Copyright (c) 2026 Maximilian Krebs
+ * All rights reserved.
+ */
+
+#include "PhaseTimings.h"
+
+#include <algorithm>
+#include <string>
+#include <utility>
+
+PhaseTimings::Scope::Scope(std::string phase) : phase(std::move(phase)), start(std::chrono::steady_clock::now()) {}
+
+PhaseTimings::Scope::~Scope() {
+    auto duration = std::chrono::duration_cast<std::chrono::microseconds>(std::chrono::steady_clock::now() - start);
+    PhaseTimings::getInstance().add(phase, duration);
+}
+
+PhaseTimings& PhaseTimings::getInstance() {
+    static PhaseTimings instance;
+    return instance;
+}
+
+void PhaseTimings::add(const std::string &phase, std::chrono::microseconds duration) {
+    auto entry = std::find_if(phases.begin(), phases.end(), [&](const auto &recorded) {
+        return recorded.first == phase;
+    });
+
+    if (entry != phases.end()) {
+        entry->second += duration;
+    } else {
+        phases.emplace_back(phase, duration);
+    }
+}
+
+void PhaseTimings::reset() {
+    phases.clear();
+}
+
+nlohmann::json PhaseTimings::toJson() const {
+    nlohmann::json timings = nlohmann::json::object();
+
+    for (const auto &[phase, duration] : phases) {
+        timings[phase] = duration.count();
+    }
+
+    return timings;
+}
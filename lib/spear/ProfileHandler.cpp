@@ -27,6 +27,11 @@ void ProfileHandler::read(const std::string& filename) {
     data = json::parse(fileStream);
 
     _profile = data;
+    _path = filename;
+}
+
+bool ProfileHandler::isLoaded(const std::string& filename) const {
+    return !_path.empty() && _path == filename;
 }
 
 void ProfileHandler::setOrCreate(std::string key, json &mapping) {
@@ -59,6 +64,17 @@ std::optional<double> ProfileHandler::getEnergyForInstruction(const std::string&
     }
 }
 
+std::optional<double> ProfileHandler::getEnergyForInstruction(const std::vector<std::string>& keys) {
+    for (const auto &key : keys) {
+        auto energy = getEnergyForInstruction(key);
+        if (energy.has_value()) {
+            return energy;
+        }
+    }
+
+    return std::nullopt;
+}
+
 std::optional<double> ProfileHandler::getProgramOffset() {
     if (_profile["cpu"].contains("_programoffset")) {
         return _profile["cpu"]["_programoffset"].get<double>();
@@ -262,6 +262,23 @@ double ProgramGraph::getEnergy(LLVMHandler *handler) {
     return sum;
 }
 
+// Reset the cached energy of all nodes, including the ones inside of LoopNodes
+void ProgramGraph::resetEnergy(AnalysisStrategy::Strategy strategy) {
+    for (auto node : this->nodes) {
+        node->strategy = strategy;
+        node->energy = 0;
+        node->hasCachedTotalEnergy = false;
+        node->cachedTotalEnergy = 0.0;
+        node->isCurrentlyEvaluating = false;
+
+        if (auto loopNode = dynamic_cast<LoopNode *>(node)) {
+            for (auto subgraph : loopNode->subgraphs) {
+                subgraph->resetEnergy(strategy);
+            }
+        }
+    }
+}
+
 // Find all the edges starting at the given Node
 std::vector<Edge *> ProgramGraph::findEdgesStartingAtNode(Node *sourceNode) {
     // Init the list
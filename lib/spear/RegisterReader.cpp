@@ -6,13 +6,37 @@
 #include "RegisterReader.h"
 #include <fcntl.h>
 #include <unistd.h>
+#include <algorithm>
 #include <cstdint>
+#include <filesystem>
+#include <fstream>
+#include <stdexcept>
 #include "iostream"
 #include "cstdio"
 #include "cmath"
 #include "CPU_vendor.h"
 
-RegisterReader::RegisterReader(int core) {
+// Unit of the energy_uj files of the powercap framework
+static constexpr double POWERCAP_UNIT = 1e-6;
+
+RegisterReader::RegisterReader(int core)
+    : RegisterReader(core, msrAvailable(core) ? EnergyBackend::MSR : EnergyBackend::POWERCAP) {}
+
+RegisterReader::RegisterReader(int core, EnergyBackend backend, const std::string &powercapRoot) : backend(backend) {
+    if (backend == EnergyBackend::MSR) {
+        initMsr(core);
+    } else {
+        initPowercap(powercapRoot);
+    }
+}
+
+RegisterReader::~RegisterReader() {
+    for (auto &domain : this->domains) {
+        close(domain.fileDescriptor);
+    }
+}
+
+void RegisterReader::initMsr(int core) {
     // Package -> 0x611
     // Cores -> 0x639
     int vendor = cpu_vendor_runtime();
@@ -34,6 +58,83 @@ RegisterReader::RegisterReader(int core) {
     snprintf(this->regFile, sizeof(this->regFile), "/dev/cpu/%d/msr", core);
 }
 
+void RegisterReader::initPowercap(const std::string &powercapRoot) {
+    std::vector<std::filesystem::path> zones;
+    std::error_code error;
+
+    for (const auto &entry : std::filesystem::directory_iterator(powercapRoot, error)) {
+        // Zones are named intel-rapl:<package>[:<subdomain>], also on AMD processors
+        if (entry.path().filename().string().rfind("intel-rapl:", 0) == 0) {
+            zones.push_back(entry.path());
+        }
+    }
+
+    // Packages sort in front of their subdomains
+    std::sort(zones.begin(), zones.end());
+
+    std::map<std::string, std::string> packageNames;
+    bool hasCores = false;
+
+    for (const auto &zone : zones) {
+        std::string zoneId = zone.filename().string();
+        std::string name;
+        uint64_t maxRange = 0;
+
+        std::ifstream nameFile(zone / "name");
+        std::ifstream rangeFile(zone / "max_energy_range_uj");
+        if (!(nameFile >> name) || !(rangeFile >> maxRange)) {
+            continue;
+        }
+
+        int fileDescriptor = open((zone / "energy_uj").c_str(), O_RDONLY);
+        if (fileDescriptor < 0) {
+            continue;
+        }
+
+        PowercapDomain domain;
+        domain.fileDescriptor = fileDescriptor;
+        domain.maxRange = maxRange;
+
+        auto separator = zoneId.find(':', std::string("intel-rapl:").size());
+        if (separator == std::string::npos) {
+            packageNames[zoneId] = name;
+            domain.name = name;
+        } else {
+            auto package = packageNames.find(zoneId.substr(0, separator));
+            domain.name = (package != packageNames.end() ? package->second : zoneId.substr(0, separator)) + "/" + name;
+            hasCores = hasCores || name == "core";
+        }
+
+        this->domains.push_back(domain);
+    }
+
+    if (this->domains.empty()) {
+        throw std::runtime_error("No readable RAPL domains found in " + powercapRoot);
+    }
+
+    for (auto &domain : this->domains) {
+        bool isPackage = domain.name.find('/') == std::string::npos;
+        bool isCore = !isPackage && domain.name.substr(domain.name.find('/') + 1) == "core";
+        domain.selected = hasCores ? isCore : isPackage;
+
+        updateDomain(&domain);
+        domain.total = 0;
+    }
+}
+
+bool RegisterReader::msrAvailable(int core) {
+    char file[32];
+    snprintf(file, sizeof(file), "/dev/cpu/%d/msr", core);
+
+    int registerFileDescriptor = open(file, O_RDONLY);
+    if (registerFileDescriptor < 0) {
+        return false;
+    }
+
+    close(registerFileDescriptor);
+    return true;
+}
+
 int64_t RegisterReader::read(uint64_t registerOffset) {
     int registerFileDescriptor = 0;
     uint64_t registerValueBuffer;
@@ -50,7 +151,40 @@ int64_t RegisterReader::read(uint64_t registerOffset) {
     return static_cast<int64_t>(registerValueBuffer);
 }
 
+void RegisterReader::updateDomain(PowercapDomain *domain) {
+    char buffer[32];
+    ssize_t length = pread(domain->fileDescriptor, buffer, sizeof(buffer) - 1, 0);
+    if (length <= 0) {
+        return;
+    }
+    buffer[length] = '\0';
+
+    uint64_t counter = std::strtoull(buffer, nullptr, 10);
+
+    // The counter restarts at zero after reaching the maximum of its range
+    if (counter >= domain->last) {
+        domain->total += counter - domain->last;
+    } else {
+        domain->total += domain->maxRange - domain->last + counter;
+    }
+
+    domain->last = counter;
+}
+
 double RegisterReader::getEnergy() {
+    if (this->backend == EnergyBackend::POWERCAP) {
+        uint64_t total = 0;
+
+        for (auto &domain : this->domains) {
+            if (domain.selected) {
+                updateDomain(&domain);
+                total += domain.total;
+            }
+        }
+
+        return static_cast<double>(total) * POWERCAP_UNIT;
+    }
+
     u_int64_t result = read(this->energyReg);
     auto mutlitplier = this->readMultiplier();
 
@@ -58,8 +192,27 @@ double RegisterReader::getEnergy() {
 }
 
 double RegisterReader::readMultiplier() {
+    if (this->backend == EnergyBackend::POWERCAP) {
+        return POWERCAP_UNIT;
+    }
+
     uint64_t result = read(this->unitReg);
     double unit = static_cast<char>(((result >> 8) & 0x1F));
     double multiplier = pow(0.5, unit);
     return multiplier;
 }
+
+std::map<std::string, double> RegisterReader::getDomainEnergies() {
+    std::map<std::string, double> energies;
+
+    for (auto &domain : this->domains) {
+        updateDomain(&domain);
+        energies[domain.name] = static_cast<double>(domain.total) * POWERCAP_UNIT;
+    }
+
+    return energies;
+}
+
+EnergyBackend RegisterReader::getBackend() const {
+    return this->backend;
+}
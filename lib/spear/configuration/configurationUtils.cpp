@@ -3,7 +3,9 @@
  * All rights reserved.
  */
 #include <algorithm>
+#include <sstream>
 #include <string>
+#include <vector>
 
 #include "configuration/configurationUtils.h"
 
@@ -27,13 +29,47 @@ Strategy ConfigurationUtils::strToStrategy(const std::string &str) {
         return Strategy::WORST;
     } else if (str == "average") {
         return Strategy::AVERAGE;
-    } else if (str == "worst") {
-        return Strategy::WORST;
+    } else if (str == "best") {
+        return Strategy::BEST;
     } else {
         return Strategy::UNDEFINED;
     }
 }
 
+std::vector<Strategy> ConfigurationUtils::strToStrategies(const std::string &str) {
+    std::vector<Strategy> strategies;
+    std::stringstream stream(str);
+    std::string item;
+
+    while (std::getline(stream, item, ',')) {
+        auto strategy = strToStrategy(item);
+
+        if (strategy == Strategy::UNDEFINED) {
+            return {};
+        }
+
+        // Every strategy is only evaluated once
+        if (std::find(strategies.begin(), strategies.end(), strategy) == strategies.end()) {
+            strategies.push_back(strategy);
+        }
+    }
+
+    return strategies;
+}
+
+std::string ConfigurationUtils::strategyToStr(Strategy strategy) {
+    switch (strategy) {
+        case Strategy::WORST:
+            return "worst";
+        case Strategy::AVERAGE:
+            return "average";
+        case Strategy::BEST:
+            return "best";
+        default:
+            return "undefined";
+    }
+}
+
 Format ConfigurationUtils::strToFormat(const std::string &str) {
     if (str == "plain") {
         return Format::PLAIN;
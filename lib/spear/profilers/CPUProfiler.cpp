@@ -11,6 +11,7 @@
 #include <cstdio>
 #include <string>
 #include <map>
+#include <set>
 #include <iostream>
 #include <utility>
 #include <algorithm>
@@ -342,7 +343,7 @@ json CPUProfiler::profile() {
     auto estimateStart = std::chrono::steady_clock::now();
 
     for (const auto& [key, value] : _profileCode) {
-        [[maybe_unused]] std::vector<double> measuredEnergy = this->_measureFile(value, 5);
+        [[maybe_unused]] std::vector<double> measuredEnergy = this->_measure(key, 5);
     }
 
     auto estimateEnd = std::chrono::steady_clock::now();
@@ -375,7 +376,7 @@ json CPUProfiler::profile() {
         std::map<std::string, std::vector<double>> measurements = std::map<std::string, std::vector<double>>();
 
         for (const auto& [key, value] : _profileCode) {
-            std::vector<double> measuredEnergy = this->_measureFile(value, iterations);
+            std::vector<double> measuredEnergy = this->_measure(key, iterations);
             measurements[key] = measuredEnergy;
         }
 
@@ -396,9 +397,43 @@ json CPUProfiler::profile() {
     // as they all include the base energy of the program. We use the median of the intercepts to mitigate
     // potential outliers.
     std::vector<double> intercepts;
+
+    // Kernels generated in loop mode include the overhead of the loop in their slope. The empty loop kernel only
+    // measures this overhead, so we subtract its slope from every instruction. A slope clamped to the minimum
+    // instruction energy carries no information and is ignored.
+    const double minInstructionEnergy = ConfigParser::getProfilingConfiguration().min_instruction_energy;
+    double loopOverhead = 0.0;
+
+    auto baselineIterator = regressions.find(this->loopBaseline);
+    if (!this->loopBaseline.empty() && baselineIterator != regressions.end() &&
+        baselineIterator->second.first > minInstructionEnergy) {
+        loopOverhead = baselineIterator->second.first;
+    }
+
+    // The baseline of a memory kernel initializes the same buffer inside the same loop, so its slope replaces the
+    // loop overhead for the kernels using the buffer
+    std::set<std::string> memoryBaselineKernels;
+    for (const auto& [instr, baseline] : this->memoryBaselines) {
+        memoryBaselineKernels.insert(baseline);
+    }
+
     for (const auto& [instr, coeff] : regressions) {
-        profmapping[instr] = coeff.first;
         intercepts.push_back(coeff.second);
+
+        if (instr == this->loopBaseline || memoryBaselineKernels.count(instr) > 0) {
+            continue;
+        }
+
+        double overhead = loopOverhead;
+
+        auto memoryBaseline = this->memoryBaselines.find(instr);
+        if (memoryBaseline != this->memoryBaselines.end()) {
+            auto initIterator = regressions.find(memoryBaseline->second);
+            overhead = initIterator != regressions.end() && initIterator->second.first > minInstructionEnergy
+                ? initIterator->second.first : loopOverhead;
+        }
+
+        profmapping[instr] = std::max(coeff.first - overhead, minInstructionEnergy);
     }
 
     // Store the constant offset in the profile mapping under a special key.
@@ -431,7 +466,20 @@ std::vector<double> CPUProfiler::_movingAverage(const std::vector<double>& data,
     return result;
 }
 
-std::vector<double> CPUProfiler::_measureFile(const std::string& file, uint64_t runtime) const {
+std::vector<double> CPUProfiler::_measure(const std::string& instruction, uint64_t runtime) const {
+    if (this->harness) {
+        return this->harness->measure(instruction, runtime);
+    }
+
+    return this->_measureFile(_profileCode.at(instruction), runtime, _kernelArgument(instruction));
+}
+
+std::string CPUProfiler::_kernelArgument(const std::string& instruction) const {
+    return this->bundled ? instruction : "";
+}
+
+std::vector<double> CPUProfiler::_measureFile(const std::string& file, uint64_t runtime,
+                                              const std::string& kernel) const {
     std::vector<double> results;
     results.reserve(runtime * number_of_cores);
 
@@ -445,7 +493,12 @@ std::vector<double> CPUProfiler::_measureFile(const std::string& file, uint64_t
                                                 MAP_SHARED | MAP_ANONYMOUS,
                                                 -1, 0));
 
-    char* args[] = { const_cast<char*>(file.c_str()), nullptr };
+    // Programs containing several kernels receive the kernel to run as their only argument
+    std::vector<char*> args = { const_cast<char*>(file.c_str()) };
+    if (!kernel.empty()) {
+        args.push_back(const_cast<char*>(kernel.c_str()));
+    }
+    args.push_back(nullptr);
 
     uint64_t iters = runtime;
 
@@ -478,7 +531,7 @@ std::vector<double> CPUProfiler::_measureFile(const std::string& file, uint64_t
 
                 sharedEnergyBefore[core] = powReader.getEnergy();
 
-                if (execv(file.c_str(), args) == -1) {
+                if (execv(file.c_str(), args.data()) == -1) {
                     perror("execv");
                     exit(1);
                 }
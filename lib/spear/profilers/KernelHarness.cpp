@@ -0,0 +1,247 @@
+/*
+ * Copyright (c) 2026 Maximilian Krebs
+ * All rights reserved.
+*/
+
+#include "profilers/KernelHarness.h"
+
+#include <dlfcn.h>
+#include <sched.h>
+#include <sys/socket.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+#include <algorithm>
+#include <cerrno>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+#include "RegisterReader.h"
+
+/**
+ * Send a value through the socket of a worker. Fails instead of raising SIGPIPE if the other side is gone
+ */
+static bool sendValue(int socket, uint64_t value) {
+    ssize_t sent;
+
+    do {
+        sent = send(socket, &value, sizeof(value), MSG_NOSIGNAL);
+    } while (sent == -1 && errno == EINTR);
+
+    return sent == sizeof(value);
+}
+
+/**
+ * Receive a value through the socket of a worker. Fails once the other side closed the socket
+ */
+static bool receiveValue(int socket, uint64_t *value) {
+    ssize_t received;
+
+    do {
+        received = recv(socket, value, sizeof(*value), MSG_WAITALL);
+    } while (received == -1 && errno == EINTR);
+
+    return received == sizeof(*value);
+}
+
+KernelHarness::KernelHarness(const std::string &library, const std::map<std::string, std::string> &symbols,
+                             unsigned int cores) : cores(std::max(cores, 1U)) {
+    this->handle = dlopen(library.c_str(), RTLD_NOW | RTLD_LOCAL);
+
+    if (this->handle == nullptr) {
+        throw std::runtime_error("CPU profiler: Could not load kernel library " + library + ": " + dlerror());
+    }
+
+    for (const auto &[instruction, symbol] : symbols) {
+        void *address = dlsym(this->handle, symbol.c_str());
+
+        if (address == nullptr) {
+            dlclose(this->handle);
+            throw std::runtime_error("CPU profiler: Kernel library " + library + " does not export " + symbol);
+        }
+
+        this->kernels[instruction] = reinterpret_cast<Kernel>(address);
+    }
+}
+
+KernelHarness::~KernelHarness() {
+    if (this->handle != nullptr) {
+        dlclose(this->handle);
+    }
+}
+
+std::vector<double> KernelHarness::measure(const std::string &instruction, uint64_t runtime) const {
+    std::vector<double> results;
+    results.reserve(runtime);
+
+    #ifdef __linux__
+    Kernel kernel = this->kernels.at(instruction);
+    uint64_t calls = 0;
+    std::vector<Worker> workers = _start(kernel, &calls);
+
+    // The workers are started and warmed up, only the calls of the kernel happen between the energy readings
+    try {
+        RegisterReader powReader(0);
+
+        for (uint64_t it = 0; it < runtime; /* manual increment inside */) {
+            double before = powReader.getEnergy();
+            _run(workers, calls);
+            double after = powReader.getEnergy();
+
+            // Samples covering no RAPL update or an overflow of the counter are repeated
+            double diff = after - before;
+            if (diff <= 0) {
+                continue;
+            }
+
+            results.push_back(diff / static_cast<double>(this->cores) / static_cast<double>(calls));
+            it++;
+        }
+    } catch (...) {
+        _stop(workers);
+        throw;
+    }
+
+    if (!_stop(workers)) {
+        throw std::runtime_error("CPU profiler: A kernel process did not finish successfully");
+    }
+    #endif
+
+    return results;
+}
+
+uint64_t KernelHarness::_calibrate(Kernel kernel) {
+    uint64_t calls = 0;
+    auto start = std::chrono::steady_clock::now();
+    std::chrono::steady_clock::duration elapsed{};
+
+    do {
+        kernel();
+        calls++;
+        elapsed = std::chrono::steady_clock::now() - start;
+    } while (elapsed < WARMUP_DURATION);
+
+    auto perCall = std::chrono::duration<double>(elapsed) / static_cast<double>(calls);
+    auto perSample = std::chrono::duration<double>(SAMPLE_DURATION) / perCall;
+
+    return std::max<uint64_t>(static_cast<uint64_t>(perSample), 1);
+}
+
+std::vector<KernelHarness::Worker> KernelHarness::_start(Kernel kernel, uint64_t *calls) const {
+    std::vector<Worker> workers;
+    workers.reserve(this->cores);
+
+    // Every core runs the kernel in its own process forked from the loaded library. The processes get private copies
+    // of the kernel globals on their first write, so the cores neither share cache lines nor race on the state
+    for (unsigned int core = 0; core < this->cores; core++) {
+        int sockets[2];
+
+        if (socketpair(AF_UNIX, SOCK_STREAM, 0, sockets) == -1) {
+            _stop(workers);
+            throw std::runtime_error("CPU profiler: Could not create the socket of a kernel process");
+        }
+
+        pid_t pid = fork();
+
+        if (pid == 0) {
+            // The sockets of the other workers must only be open in the profiling process, otherwise closing them
+            // would not stop these workers
+            close(sockets[0]);
+            for (const Worker &worker : workers) {
+                close(worker.socket);
+            }
+
+            _work(kernel, core, sockets[1]);
+        }
+
+        close(sockets[1]);
+
+        if (pid < 0) {
+            close(sockets[0]);
+            _stop(workers);
+            throw std::runtime_error("CPU profiler: Could not fork the kernel processes");
+        }
+
+        workers.push_back({pid, sockets[0]});
+    }
+
+    // The workers warm up in parallel. Every sample uses the largest amount of calls, so it fills every core
+    *calls = 1;
+
+    for (const Worker &worker : workers) {
+        uint64_t reported = 0;
+
+        if (!receiveValue(worker.socket, &reported)) {
+            _stop(workers);
+            throw std::runtime_error("CPU profiler: A kernel process could not be started");
+        }
+
+        *calls = std::max(*calls, reported);
+    }
+
+    return workers;
+}
+
+void KernelHarness::_run(const std::vector<Worker> &workers, uint64_t calls) {
+    for (const Worker &worker : workers) {
+        if (!sendValue(worker.socket, calls)) {
+            throw std::runtime_error("CPU profiler: A kernel process did not finish successfully");
+        }
+    }
+
+    for (const Worker &worker : workers) {
+        uint64_t done = 0;
+
+        if (!receiveValue(worker.socket, &done)) {
+            throw std::runtime_error("CPU profiler: A kernel process did not finish successfully");
+        }
+    }
+}
+
+bool KernelHarness::_stop(const std::vector<Worker> &workers) {
+    // Closing the sockets ends the loop of the workers
+    for (const Worker &worker : workers) {
+        close(worker.socket);
+    }
+
+    bool succeeded = true;
+
+    for (const Worker &worker : workers) {
+        int status = 0;
+        waitpid(worker.pid, &status, 0);
+        succeeded &= WIFEXITED(status) && WEXITSTATUS(status) == 0;
+    }
+
+    return succeeded;
+}
+
+void KernelHarness::_work(Kernel kernel, unsigned int core, int socket) {
+    #ifdef __linux__
+    cpu_set_t mask;
+    CPU_ZERO(&mask);
+    CPU_SET(core, &mask);
+
+    if (sched_setaffinity(0, sizeof(mask), &mask) == -1) {
+        _exit(1);
+    }
+    #endif
+
+    uint64_t calls = _calibrate(kernel);
+
+    if (!sendValue(socket, calls)) {
+        _exit(1);
+    }
+
+    while (receiveValue(socket, &calls)) {
+        for (uint64_t call = 0; call < calls; call++) {
+            kernel();
+        }
+
+        if (!sendValue(socket, calls)) {
+            _exit(1);
+        }
+    }
+
+    _exit(0);
+}
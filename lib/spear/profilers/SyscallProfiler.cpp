@@ -27,7 +27,7 @@
 std::unordered_map<uint32_t, Inflight> SyscallProfiler::inflight{};
 std::vector<double> SyscallProfiler::energy_per_syscall(SyscallProfiler::MAX_SYSCALL, 0.0);
 std::vector<uint64_t> SyscallProfiler::count_per_syscall(SyscallProfiler::MAX_SYSCALL, 0);
-RegisterReader SyscallProfiler::raplReader{0};
+std::unique_ptr<RegisterReader> SyscallProfiler::raplReader;
 
 SyscallProfiler::SyscallProfiler() : Profiler("SYSCALL") {}
 
@@ -63,7 +63,7 @@ int SyscallProfiler::set_ignore_tgid_map(syscall_trace_bpf* skel, uint32_t tgid_
  * Also marks the segment as not running.
  */
 void SyscallProfiler::stop_segment_and_accumulate(Inflight& inf) {
-    const double endEng = raplReader.getEnergy();
+    const double endEng = raplReader->getEnergy();
     const double dE = endEng - inf.start_energy;
 
     if (inf.syscall_id < MAX_SYSCALL) {
@@ -79,7 +79,7 @@ void SyscallProfiler::stop_segment_and_accumulate(Inflight& inf) {
  * segment as running.
  */
 void SyscallProfiler::start_segment(Inflight& inf) {
-    inf.start_energy = raplReader.getEnergy();
+    inf.start_energy = raplReader->getEnergy();
     inf.running = true;
 }
 
@@ -166,6 +166,9 @@ json SyscallProfiler::profile() {
     std::fill(energy_per_syscall.begin(), energy_per_syscall.end(), 0.0);
     std::fill(count_per_syscall.begin(), count_per_syscall.end(), 0);
 
+    // Throws if neither the MSR device nor the powercap framework can be read
+    raplReader = std::make_unique<RegisterReader>(0);
+
     json syscalls;
 
     // Define bpf skeleton and parameters
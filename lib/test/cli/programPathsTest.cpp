@@ -0,0 +1,76 @@
+/*
+ * Copyright (c) 2026 Maximilian Krebs
+ * All rights reserved.
+ */
+
+#include <catch2/catch_test_macros.hpp>
+
+#include <unistd.h>
+
+#include <filesystem>
+#include <fstream>
+#include <string>
+#include <vector>
+
+#include "CLIHandler.h"
+
+/**
+ * Directory of programs in a temporary directory
+ */
+struct FakeCorpus {
+    std::filesystem::path root;
+
+    FakeCorpus() {
+        root = std::filesystem::temp_directory_path() / ("spear-corpus-" + std::to_string(getpid()));
+        std::filesystem::remove_all(root);
+        std::filesystem::create_directories(root / "nested");
+
+        for (const auto *name : {"b.ll", "a.ll", "notes.txt", "nested/c.ll"}) {
+            std::ofstream(root / name) << "\n";
+        }
+    }
+
+    ~FakeCorpus() {
+        std::filesystem::remove_all(root);
+    }
+
+    std::string path(const std::string &name) const {
+        return (root / name).string();
+    }
+};
+
+TEST_CASE("program_paths_single_file") {
+    FakeCorpus corpus;
+
+    CHECK(CLIHandler::expandProgramPaths(corpus.path("a.ll")) == std::vector<std::string>{corpus.path("a.ll")});
+    CHECK(CLIHandler::expandProgramPaths(corpus.path("missing.ll")).empty());
+}
+
+TEST_CASE("program_paths_directory") {
+    FakeCorpus corpus;
+
+    // Only the .ll files directly inside the directory, sorted
+    CHECK(CLIHandler::expandProgramPaths(corpus.root.string()) ==
+          std::vector<std::string>{corpus.path("a.ll"), corpus.path("b.ll")});
+}
+
+TEST_CASE("program_paths_glob") {
+    FakeCorpus corpus;
+
+    CHECK(CLIHandler::isGlobPattern(corpus.path("*.ll")));
+    CHECK_FALSE(CLIHandler::isGlobPattern(corpus.path("a.ll")));
+
+    CHECK(CLIHandler::expandProgramPaths(corpus.path("*/*.ll")) ==
+          std::vector<std::string>{corpus.path("nested/c.ll")});
+    CHECK(CLIHandler::expandProgramPaths(corpus.path("[b]*")) == std::vector<std::string>{corpus.path("b.ll")});
+    CHECK(CLIHandler::expandProgramPaths(corpus.path("*.bc")).empty());
+}
+
+TEST_CASE("program_paths_list") {
+    FakeCorpus corpus;
+    std::ofstream(corpus.root / "programs") << corpus.path("b.ll") << "\n\n# skipped\n  "
+                                            << corpus.path("nested/c.ll") << " \r\n";
+
+    CHECK(CLIHandler::expandProgramPaths("@" + corpus.path("programs")) ==
+          std::vector<std::string>{corpus.path("b.ll"), corpus.path("nested/c.ll")});
+}
@@ -0,0 +1,103 @@
+/*
+ * Copyright (c) 2026 Maximilian Krebs
+ * All rights reserved.
+ */
+
+#include <catch2/catch_test_macros.hpp>
+#include <catch2/catch_approx.hpp>
+
+#include <unistd.h>
+
+#include <filesystem>
+#include <fstream>
+#include <string>
+
+#include "RegisterReader.h"
+
+/**
+ * Powercap tree in a temporary directory mimicking /sys/class/powercap
+ */
+struct FakePowercap {
+    std::filesystem::path root;
+
+    FakePowercap() {
+        root = std::filesystem::temp_directory_path() / ("spear-powercap-" + std::to_string(getpid()));
+        std::filesystem::remove_all(root);
+        std::filesystem::create_directories(root);
+    }
+
+    ~FakePowercap() {
+        std::filesystem::remove_all(root);
+    }
+
+    void addZone(const std::string &zone, const std::string &name, uint64_t energy, uint64_t maxRange) const {
+        std::filesystem::create_directories(root / zone);
+        std::ofstream(root / zone / "name") << name << "\n";
+        std::ofstream(root / zone / "max_energy_range_uj") << maxRange << "\n";
+        setEnergy(zone, energy);
+    }
+
+    void setEnergy(const std::string &zone, uint64_t energy) const {
+        std::ofstream(root / zone / "energy_uj") << energy << "\n";
+    }
+};
+
+TEST_CASE("powercap_core_domains") {
+    FakePowercap powercap;
+    powercap.addZone("intel-rapl:0", "package-0", 5000000, 262143328850);
+    powercap.addZone("intel-rapl:0:0", "core", 1000000, 262143328850);
+    powercap.addZone("intel-rapl:0:1", "dram", 2000000, 262143328850);
+    powercap.addZone("intel-rapl:1", "package-1", 7000000, 262143328850);
+    powercap.addZone("intel-rapl:1:0", "core", 3000000, 262143328850);
+
+    RegisterReader reader(0, EnergyBackend::POWERCAP, powercap.root.string());
+
+    CHECK(reader.getBackend() == EnergyBackend::POWERCAP);
+    CHECK(reader.readMultiplier() == Catch::Approx(1e-6));
+    CHECK(reader.getEnergy() == Catch::Approx(0.0));
+
+    powercap.setEnergy("intel-rapl:0:0", 1500000);
+    powercap.setEnergy("intel-rapl:1:0", 3250000);
+    powercap.setEnergy("intel-rapl:0:1", 2100000);
+
+    // Only the core domains contribute to the energy
+    CHECK(reader.getEnergy() == Catch::Approx(0.75));
+
+    auto energies = reader.getDomainEnergies();
+    CHECK(energies.size() == 5);
+    CHECK(energies["package-0/core"] == Catch::Approx(0.5));
+    CHECK(energies["package-0/dram"] == Catch::Approx(0.1));
+    CHECK(energies["package-1"] == Catch::Approx(0.0));
+}
+
+TEST_CASE("powercap_packages_without_cores") {
+    FakePowercap powercap;
+    powercap.addZone("intel-rapl:0", "package-0", 100, 1000);
+    powercap.addZone("intel-rapl:0:0", "dram", 100, 1000);
+
+    RegisterReader reader(0, EnergyBackend::POWERCAP, powercap.root.string());
+
+    powercap.setEnergy("intel-rapl:0", 400);
+    powercap.setEnergy("intel-rapl:0:0", 900);
+
+    CHECK(reader.getEnergy() == Catch::Approx(300e-6));
+}
+
+TEST_CASE("powercap_wraparound") {
+    FakePowercap powercap;
+    powercap.addZone("intel-rapl:0", "package-0", 900, 1000);
+
+    RegisterReader reader(0, EnergyBackend::POWERCAP, powercap.root.string());
+
+    powercap.setEnergy("intel-rapl:0", 50);
+    CHECK(reader.getEnergy() == Catch::Approx(150e-6));
+
+    powercap.setEnergy("intel-rapl:0", 60);
+    CHECK(reader.getEnergy() == Catch::Approx(160e-6));
+}
+
+TEST_CASE("powercap_missing_domains") {
+    FakePowercap powercap;
+
+    CHECK_THROWS_AS(RegisterReader(0, EnergyBackend::POWERCAP, powercap.root.string()), std::runtime_error);
+}
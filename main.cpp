@@ -3,11 +3,21 @@
  * All rights reserved.
 */
 
+#include <sys/wait.h>
+#include <unistd.h>
+
 #include <string>
 #include <utility>
+#include <algorithm>
 #include <cstdio>
+#include <filesystem>
 #include <iostream>
+#include <map>
+#include <memory>
+#include <optional>
 #include <stdexcept>
+#include <thread>
+#include <vector>
 
 #include "src/spear/profilers/Profiler.h"
 #include "LLVMHandler.h"
@@ -20,9 +30,12 @@
 #include "llvm/Transforms/Scalar/LoopRotation.h"
 #include "llvm/IRReader/IRReader.h"
 
+#include "AnalysisServer.h"
+#include "PhaseTimings.h"
 #include "CLIHandler.h"
 #include "ConfigParser.h"
 #include "Logger.h"
+#include "configuration/configurationUtils.h"
 #include "analyses/ResultRegistry.h"
 #include "profilers/CPUProfiler.h"
 #include "profilers/MetaProfiler.h"
@@ -81,19 +94,22 @@ void runProfileRoutine(CLIOptions opts) {
     }
 }
 
-void runAnalysisRoutine(CLIOptions opts) {
+bool runAnalysisRoutine(CLIOptions opts, std::shared_ptr<json> output = nullptr) {
     llvm::LLVMContext context;
     llvm::SMDiagnostic error;
     ResultRegistry resultRegistry;
+    PhaseTimings::getInstance().reset();
 
+    auto parsePhase = std::make_optional<PhaseTimings::Scope>("parse");
     auto moduleOriginal = llvm::parseIRFile(opts.programPath, error, context);
     if (!moduleOriginal) {
         llvm::errs() << "Failed to parse IR file: " << opts.programPath << "\n";
-        return;
+        return false;
     }
 
     // Separate copy for the optimized/canonicalized pipeline.
     auto moduleOptimized = llvm::CloneModule(*moduleOriginal);
+    parsePhase.reset();
 
     // Run lobbound on the original module as we need load/store
     auto startLB = std::chrono::high_resolution_clock::now();
@@ -105,8 +121,10 @@ void runAnalysisRoutine(CLIOptions opts) {
 
     auto durationLB = std::chrono::duration_cast<std::chrono::microseconds>(endLB - startLB);
     std::cout << "Loopbound took: " << durationLB.count() << " µs\n";
+    PhaseTimings::getInstance().add("loopbound", durationLB);
 
     {
+        PhaseTimings::Scope canonicalizePhase("canonicalize");
         llvm::PassBuilder passBuilder;
         llvm::LoopAnalysisManager loopAnalysisManager;
         llvm::FunctionAnalysisManager functionAnalysisManager;
@@ -147,6 +165,7 @@ void runAnalysisRoutine(CLIOptions opts) {
 
         auto durationFeas = std::chrono::duration_cast<std::chrono::microseconds>(endFeas - startFeas);
         std::cout << "Feasibility took: " << durationFeas.count() << " µs\n";
+        PhaseTimings::getInstance().add("feasibility", durationFeas);
     }
 
 
@@ -169,9 +188,127 @@ void runAnalysisRoutine(CLIOptions opts) {
 
         llvm::ModulePassManager energyMPM;
 
-        energyMPM.addPass(Energy(opts.profilePath, resultRegistry));
+        energyMPM.addPass(Energy(opts.profilePath, resultRegistry, output));
         energyMPM.run(*moduleOriginal, moduleAnalysisManager);
     }
+
+    return true;
+}
+
+int runBatchAnalysisRoutine(const CLIOptions &opts, const std::vector<std::string> &programs) {
+    // Read the profile once, every worker inherits it
+    ProfileHandler::get_instance().read(opts.profilePath);
+
+    // Outputs are named after the program, so programs with the same name overwrite each other
+    std::map<std::string, std::string> outputNames;
+    for (const auto &program : programs) {
+        auto name = std::filesystem::path(program).stem().string();
+        auto [existing, inserted] = outputNames.emplace(name, program);
+
+        if (!inserted) {
+            std::cerr << "Warning: " << program << " and " << existing->second << " write the same output " << name
+                      << "\n";
+        }
+    }
+
+    // The analysis relies on process-wide state, so every program runs in a worker process instead of a thread
+    size_t workers = opts.workers > 0 ? static_cast<size_t>(opts.workers)
+                                      : std::max<size_t>(1, std::thread::hardware_concurrency());
+    std::map<pid_t, std::string> running;
+    std::vector<std::string> failed;
+
+    auto waitForWorker = [&]() {
+        int status = 0;
+        pid_t pid = waitpid(-1, &status, 0);
+
+        if (pid > 0 && running.count(pid) != 0) {
+            if (!WIFEXITED(status) || WEXITSTATUS(status) != 0) {
+                failed.push_back(running[pid]);
+            }
+            running.erase(pid);
+        }
+    };
+
+    std::cout << "Analyzing " << programs.size() << " programs with " << workers << " workers" << std::endl;
+
+    for (const auto &program : programs) {
+        while (running.size() >= workers) {
+            waitForWorker();
+        }
+
+        std::cout.flush();
+        llvm::outs().flush();
+        pid_t pid = fork();
+
+        if (pid < 0) {
+            std::perror("fork");
+            failed.push_back(program);
+        } else if (pid == 0) {
+            bool success = runAnalysisRoutine(AnalysisOptions(opts.profilePath, opts.configPath, program));
+
+            std::cout.flush();
+            llvm::outs().flush();
+            _exit(success ? 0 : 1);
+        } else {
+            running[pid] = program;
+        }
+    }
+
+    while (!running.empty()) {
+        waitForWorker();
+    }
+
+    for (const auto &program : failed) {
+        std::cerr << "Error: Analysis of " << program << " failed\n";
+    }
+    std::cout << "Analyzed " << programs.size() - failed.size() << " of " << programs.size() << " programs"
+              << std::endl;
+
+    return failed.empty() ? 0 : 1;
+}
+
+json serveAnalysisRequest(const CLIOptions &serveOpts, const json &request) {
+    if (!request.contains("program") || !request["program"].is_string()) {
+        throw std::invalid_argument("Request is missing the program to analyze");
+    }
+
+    std::string programPath = request["program"].get<std::string>();
+    if (!std::filesystem::is_regular_file(programPath)) {
+        throw std::invalid_argument("Program not found: " + programPath);
+    }
+
+    // The request runs in its own worker process, so changing the configuration only affects this request
+    if (request.contains("strategy")) {
+        auto strategies = request["strategy"].is_string()
+            ? ConfigurationUtils::strToStrategies(request["strategy"].get<std::string>())
+            : std::vector<Strategy>();
+
+        if (strategies.empty()) {
+            throw std::invalid_argument("Invalid strategy. Please choose out of worst/average/best");
+        }
+        ConfigParser::setStrategies(strategies);
+    }
+
+    auto output = std::make_shared<json>();
+    runAnalysisRoutine(AnalysisOptions(serveOpts.profilePath, serveOpts.configPath, programPath), output);
+
+    if (output->is_null()) {
+        throw std::runtime_error("The analysis of " + programPath + " produced no output");
+    }
+
+    return *output;
+}
+
+int runServeRoutine(const CLIOptions &opts) {
+    // Read the profile once, every worker inherits it
+    ProfileHandler::get_instance().read(opts.profilePath);
+
+    int workers = opts.workers > 0 ? opts.workers : static_cast<int>(std::thread::hardware_concurrency());
+    AnalysisServer server(opts.socketPath, workers, [&opts](const json &request) {
+        return serveAnalysisRequest(opts, request);
+    });
+
+    return server.run();
 }
 
 
@@ -188,8 +325,20 @@ int main(int argc, char *argv[]) {
 
         analyze    Analyze a given program. Further parameters are required:
                    --profile       Path to the profile to use for the analysis (path)
-                   --program       Path to the program to analyze (path)
+                   --program       Program to analyze. A directory, a glob pattern or
+                                   @list with one path per line analyze several
+                                   programs, writing one output per program (path)
+                   --config        Configuration file for the analysis (path)
+                   --strategy      Strategies to evaluate, e.g. worst,best,average (optional)
+                   --workers       Maximum number of concurrent analyses of several
+                                   programs (optional)
+
+        serve      Answer analysis requests on a UNIX domain socket. The profile and
+                   the configuration are loaded once for all requests:
+                   --profile       Path to the profile to use for the analysis (path)
                    --config        Configuration file for the analysis (path)
+                   --socket        Path of the socket to listen on (path)
+                   --workers       Maximum number of concurrent analyses (optional)
 
     )";
 
@@ -229,9 +378,30 @@ int main(int argc, char *argv[]) {
                     bool hasProfilePath = !opts.profilePath.empty();
                     bool hasProgramPath = !opts.programPath.empty();
 
-                    if (hasProfilePath && hasProgramPath) {
+                    if (!opts.strategies.empty()) {
+                        auto strategies = ConfigurationUtils::strToStrategies(opts.strategies);
+
+                        if (strategies.empty()) {
+                            std::cerr << "Error: Invalid strategy. Please choose out of worst/average/best\n";
+                            return 1;
+                        }
+                        ConfigParser::setStrategies(strategies);
+                    }
+
+                    std::vector<std::string> programs;
+                    if (hasProgramPath) {
+                        programs = CLIHandler::expandProgramPaths(opts.programPath);
+                    }
+
+                    if (hasProfilePath && !programs.empty() && opts.workers >= 0) {
                         // std::cout << "Options valid" << std::endl;
                         Logger::getInstance().setLogLevel(LOGLEVEL::ERROR);
+
+                        if (programs.size() > 1) {
+                            return runBatchAnalysisRoutine(opts, programs);
+                        }
+
+                        opts.programPath = programs.front();
                         runAnalysisRoutine(opts);
                         return 0;
                     } else {
@@ -242,8 +412,10 @@ int main(int argc, char *argv[]) {
 
                             Analyzes a given program. Further parameters are required:
                                 --profile        Path to the profile to use for the analysis (path)
-                                --program        Path to the program to analyze (path)
+                                --program        Program, directory, glob pattern or @list of programs (path)
                                 --config         Configuration file for the analysis (path)
+                                --strategy       Strategies to evaluate, e.g. worst,best,average (optional)
+                                --workers        Maximum number of concurrent analyses (optional)
 
                         )";
 
@@ -255,6 +427,48 @@ int main(int argc, char *argv[]) {
                         }
                         if (!hasProgramPath) {
                             std::cerr << "Error: Program path is missing. Please specify --program <path>\n";
+                        } else if (programs.empty()) {
+                            std::cerr << "Error: No programs found for " << opts.programPath << "\n";
+                        }
+                        if (opts.workers < 0) {
+                            std::cerr << "Error: Workers must be a positive number\n";
+                        }
+
+                        std::cerr << std::endl;
+                        return 1;
+                    }
+                } else if (opts.operation == Operation::SERVE) {
+                    bool hasProfilePath = !opts.profilePath.empty();
+                    bool hasSocketPath = !opts.socketPath.empty();
+
+                    if (hasProfilePath && hasSocketPath && opts.workers >= 0) {
+                        Logger::getInstance().setLogLevel(LOGLEVEL::ERROR);
+                        return runServeRoutine(opts);
+                    } else {
+                        std::string serveHelpMsg =
+                        R"(Usage: spear serve <arguments>
+                        =================================
+                        Arguments:
+
+                            Answers analysis requests on a UNIX domain socket:
+                                --profile        Path to the profile to use for the analysis (path)
+                                --config         Configuration file for the analysis (path)
+                                --socket         Path of the socket to listen on (path)
+                                --workers        Maximum number of concurrent analyses (optional)
+
+                        )";
+
+
+                        std::cerr << serveHelpMsg;
+
+                        if (!hasProfilePath) {
+                            std::cerr << "Error: Profile path is missing. Please specify --profile <path>\n";
+                        }
+                        if (!hasSocketPath) {
+                            std::cerr << "Error: Socket path is missing. Please specify --socket <path>\n";
+                        }
+                        if (opts.workers < 0) {
+                            std::cerr << "Error: Workers must be a positive number\n";
                         }
 
                         std::cerr << std::endl;
@@ -9,17 +9,38 @@
 #include "FunctionTree.h"
 #include "HLAC/hlac.h"
 #include "ProgramGraph.h"
+#include "configuration/valuespace.h"
 #include "nlohmann/json.hpp"
 
+#include <vector>
+
 class LegacyAnalysis {
 public:
 
+    /**
+     * Run the legacy analysis for every given strategy. The program graphs are constructed once and evaluated for
+     * each strategy
+     * @param FAM FunctionAnalysisManager to base the analysis on
+     * @param functionTree FunctionTree of the analyzed program
+     * @param strategies Strategies to evaluate, the first one is reported as the energy of a function
+     * @param showTimings Log the total duration of the analysis
+     * @param showAllTiming Log the duration of every step of the analysis
+     * @return JSON object with the energy of every function for every strategy
+     */
     static nlohmann::json run(
         llvm::FunctionAnalysisManager &FAM,
         FunctionTree *functionTree,
+        const std::vector<Strategy> &strategies,
         bool showTimings, bool showAllTiming = false);
 
  private:
+    /**
+     * Convert a configured strategy to the strategy used by the program graph
+     * @param strategy Configured strategy
+     * @return Strategy of the program graph
+     */
+    static AnalysisStrategy::Strategy toAnalysisStrategy(Strategy strategy);
+
     static void constructProgramRepresentation(ProgramGraph *pGraph, EnergyFunction *energyFunc, LLVMHandler *handler,
                                                llvm::FunctionAnalysisManager *FAM,
                                                AnalysisStrategy::Strategy analysisStrategy);
@@ -15,6 +15,7 @@
 
 #include "HLAC/hlac.h"
 #include "ProgramGraph.h"
+#include "configuration/valuespace.h"
 
 #define SHOWTIMINGS true
 
@@ -46,9 +47,11 @@ class PassUtil {
      * Calculate only legacy analysis relevant analysis steps and execute the legacy analysis afterward
      * @param module Module to run the steps on
      * @param functionAnalysisManager FAM to base the underlying calculation on
+     * @param strategies Strategies the legacy analysis is evaluated for
      * @return JSON object with the result of the legacy analysis
      */
-    static nlohmann::json legacyWrapper(llvm::Module &module, llvm::FunctionAnalysisManager &functionAnalysisManager);
+    static nlohmann::json legacyWrapper(llvm::Module &module, llvm::FunctionAnalysisManager &functionAnalysisManager,
+                                        const std::vector<Strategy> &strategies);
 
     /**
      * Collect call CallNodeBindings from nodes contained in the given node.
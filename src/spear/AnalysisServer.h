@@ -0,0 +1,123 @@
+/*
+ * Copyright (c) 2026 Maximilian Krebs
+ * All rights reserved.
+*/
+
+#ifndef SRC_SPEAR_ANALYSISSERVER_H_
+#define SRC_SPEAR_ANALYSISSERVER_H_
+
+#include <sys/types.h>
+
+#include <chrono>
+#include <deque>
+#include <functional>
+#include <map>
+#include <set>
+#include <string>
+#include <vector>
+
+#include <nlohmann/json.hpp>
+
+using json = nlohmann::json;
+
+/**
+ * Server answering analysis requests on a UNIX domain socket.
+ *
+ * Clients send one JSON request per line and receive one JSON response per line, carrying the id of the request.
+ * Responses are sent as soon as their analysis finished, so they may arrive in a different order than the requests.
+ * Every analysis runs in a worker process forked from the server. The workers inherit the profile and configuration
+ * the server loaded once, while the process-wide state modified by an analysis never leaks into the next one.
+ */
+class AnalysisServer {
+ public:
+    /**
+     * Function answering a single request, runs inside the worker process. Exceptions are reported as error
+     * responses
+     */
+    using Handler = std::function<json(const json &request)>;
+
+    /**
+     * Construct a server
+     * @param socketPath Path of the socket to listen on
+     * @param workers Maximum amount of analyses running at the same time
+     * @param handler Function answering the requests
+     */
+    AnalysisServer(std::string socketPath, int workers, Handler handler);
+
+    ~AnalysisServer();
+
+    AnalysisServer(const AnalysisServer &) = delete;
+    AnalysisServer &operator=(const AnalysisServer &) = delete;
+
+    /**
+     * Listen on the socket and answer requests until SIGINT or SIGTERM is received
+     * @return Exit code of the server
+     */
+    int run();
+
+ private:
+    /**
+     * Request waiting for a free worker
+     */
+    struct Job {
+        int client;
+        json request;
+    };
+
+    /**
+     * Running worker process
+     */
+    struct Worker {
+        pid_t pid;
+        int pipe;
+        int client;
+        json id;
+        std::string output;
+        std::chrono::steady_clock::time_point start;
+    };
+
+    std::string socketPath;
+    int workers;
+    Handler handler;
+    int listenFd = -1;
+
+    /**
+     * Connected clients and the incomplete line they sent last
+     */
+    std::map<int, std::string> clients;
+    /**
+     * Clients which finished sending requests and are closed once their pending requests are answered
+     */
+    std::set<int> draining;
+    std::deque<Job> queue;
+    std::vector<Worker> running;
+
+    bool listen();
+    void acceptClient();
+
+    /**
+     * Read the available input of a client and queue its complete requests
+     * @return False if the client disconnected
+     */
+    bool readClient(int client);
+    void closeClient(int client);
+    bool hasPendingRequests(int client) const;
+    void startJobs();
+    void startJob(const Job &job);
+
+    /**
+     * Read the available output of a worker
+     * @return False once the worker closed its pipe
+     */
+    bool readWorker(Worker *worker);
+    void finishWorker(const Worker &worker);
+
+    /**
+     * Run the handler for the given request and write the response to the given descriptor
+     */
+    void answer(const json &request, int fd);
+
+    void send(int client, const json &response);
+};
+
+#endif  // SRC_SPEAR_ANALYSISSERVER_H_
@@ -29,6 +29,23 @@ class CLIHandler {
      */
     static CLIOptions parseCLI(int argc, char *argv[]);
 
+    /**
+     * Expand the value of --program into the programs to analyze. The value is either a single file, a directory
+     * whose .ll files are analyzed, a glob pattern like "*.ll" or @list, where list is a file containing one
+     * path per line. Empty lines and lines starting with # are skipped in lists
+     *
+     * @param programSpec Value given to --program
+     * @return Paths of the programs in a stable order, empty if nothing matched
+     */
+    static std::vector<std::string> expandProgramPaths(const std::string &programSpec);
+
+    /**
+     * Checks if the given value of --program is a glob pattern
+     * @param programSpec Value given to --program
+     * @return true if the value contains a wildcard
+     */
+    static bool isGlobPattern(const std::string &programSpec);
+
  private:
     /**
      * Checks if a vector of arguments contains a certain option
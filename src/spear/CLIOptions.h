@@ -14,7 +14,8 @@
 enum class Operation {
     UNDEFINED,
     ANALYZE,
-    PROFILE
+    PROFILE,
+    SERVE
 };
 
 
@@ -53,6 +54,21 @@ class CLIOptions {
      */
     std::string codePath;
 
+    /**
+     * Comma separated strategies overriding the configured ones, empty to use the configuration
+     */
+    std::string strategies;
+
+    /**
+     * Path of the socket the analysis server listens on
+     */
+    std::string socketPath;
+
+    /**
+     * Maximum amount of analyses running at the same time, 0 to use one per core
+     */
+    int workers;
+
     /**
      * Construct a new CLIOptions object
      * 
@@ -75,7 +91,17 @@ class ProfileOptions : public CLIOptions{
  */
 class AnalysisOptions : public CLIOptions{
  public:
-    AnalysisOptions(std::string profilePath, std::string configPath, std::string programPath);
+    AnalysisOptions(std::string profilePath, std::string configPath, std::string programPath,
+                    std::string strategies = "", int workers = 0);
+};
+
+/**
+ * Subclass to distinguish options related to the analysis server
+ *
+ */
+class ServeOptions : public CLIOptions{
+ public:
+    ServeOptions(std::string profilePath, std::string configPath, std::string socketPath, int workers);
 };
 
 
@@ -8,6 +8,7 @@
 
 
 #include <string>
+#include <vector>
 
 #include <nlohmann/json.hpp>
 #include "configuration/configurationobjects.h"
@@ -61,6 +62,13 @@ class ConfigParser {
      */
     static ProfilingConfiguration getProfilingConfiguration();
 
+    /**
+     * Replace the strategies of the legacy analysis, e.g. by the ones given on the command line.
+     *
+     * @param strategies Strategies to evaluate, must not be empty
+     */
+    static void setStrategies(const std::vector<Strategy> &strategies);
+
     /**
      * Parse the loaded JSON into typed configuration structs.
      */
@@ -120,13 +128,22 @@ class ConfigParser {
     bool analysisTypeValid(json object);
 
     /**
-     * Validate the analysis strategy configuration section.
+     * Validate the analysis strategy configuration section. The strategy is either a single strategy, a comma
+     * separated list or an array of strategies.
      *
      * @param object JSON object containing strategy data
      * @return True if valid, otherwise false
      */
     bool strategyValid(json object);
 
+    /**
+     * Parse the strategies of the analysis strategy configuration section.
+     *
+     * @param value Single strategy, comma separated list or array of strategies
+     * @return Parsed strategies, empty if any of them is unsupported
+     */
+    static std::vector<Strategy> parseStrategies(const json &value);
+
     /**
      *
      * @param object
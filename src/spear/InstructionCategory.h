@@ -72,6 +72,28 @@ class InstructionCategory {
      * @return
      */
     static double getCalledFunctionEnergy(llvm::Instruction &Instruction, const std::vector<EnergyFunction *>& pool);
+
+    /**
+     * Name of the given instruction inside the profile, e.g. add or icmp eq
+     * @param Instruction
+     * @return
+     */
+    static std::string getProfileName(const llvm::Instruction &Instruction);
+
+    /**
+     * Short name of the given type as used by LLVM intrinsics, e.g. i64, f32 or v4f32 for <4 x float>
+     * @param Type
+     * @return Name of the type, empty if the type has no short name
+     */
+    static std::string getTypeSuffix(const llvm::Type *Type);
+
+    /**
+     * Keys the energy of the given instruction can be found under in the profile, ordered by preference. The key
+     * specific to the type the instruction operates on, e.g. fadd.v4f32, comes before the untyped one
+     * @param Instruction
+     * @return
+     */
+    static std::vector<std::string> getProfileKeys(const llvm::Instruction &Instruction);
 };
 
 #endif  // SRC_SPEAR_INSTRUCTIONCATEGORY_H_
@@ -0,0 +1,69 @@
+/*
+ * Copyright (c) 2026 Maximilian Krebs
+ * All rights reserved.
+ */
+
+#ifndef SRC_SPEAR_PHASETIMINGS_H_
+#define SRC_SPEAR_PHASETIMINGS_H_
+
+#include <chrono>
+#include <string>
+#include <utility>
+#include <vector>
+
+#include <nlohmann/json.hpp>
+
+/**
+ * Durations of the phases of an analysis run, e.g. parse, loopbound, feasibility, hlac, ilp_build, ilp_solve and
+ * output. Durations recorded for the same phase add up. The timings are written to the output documents under
+ * "timings", so the output phase covers the construction of the documents but not writing them
+ */
+class PhaseTimings {
+ public:
+    /**
+     * Measures the time until it goes out of scope and records it for the given phase
+     */
+    class Scope {
+     public:
+        explicit Scope(std::string phase);
+        ~Scope();
+
+        Scope(const Scope&) = delete;
+        Scope& operator=(const Scope&) = delete;
+
+     private:
+        std::string phase;
+        std::chrono::steady_clock::time_point start;
+    };
+
+    // Access the singleton instance
+    static PhaseTimings& getInstance();
+
+    // Deleted copy/move to enforce singleton
+    PhaseTimings(const PhaseTimings&) = delete;
+    PhaseTimings& operator=(const PhaseTimings&) = delete;
+    PhaseTimings(PhaseTimings&&) = delete;
+    PhaseTimings& operator=(PhaseTimings&&) = delete;
+
+    /**
+     * Add the given duration to the phase
+     */
+    void add(const std::string &phase, std::chrono::microseconds duration);
+
+    /**
+     * Forget all recorded phases, called before a new program is analyzed
+     */
+    void reset();
+
+    /**
+     * Recorded phases mapped to their duration in µs
+     */
+    nlohmann::json toJson() const;
+
+ private:
+    PhaseTimings() = default;  // private constructor
+
+    std::vector<std::pair<std::string, std::chrono::microseconds>> phases;
+};
+
+#endif  // SRC_SPEAR_PHASETIMINGS_H_
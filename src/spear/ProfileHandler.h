@@ -10,6 +10,7 @@
 #include <string>
 #include <variant>
 #include <optional>
+#include <vector>
 #include <nlohmann/json.hpp>
 
 using json = nlohmann::json;
@@ -53,6 +54,13 @@ class ProfileHandler {
      */
     std::optional<double> getEnergyForInstruction(const std::string &instruction);
 
+    /**
+     * Return the energy stored under the first of the given keys found in the profile
+     * @param keys Keys of the instruction, ordered by preference
+     * @return Energy if any of the keys exists in the profile, nullopt otherwise
+     */
+    std::optional<double> getEnergyForInstruction(const std::vector<std::string> &keys);
+
     /**
      * Return the program offset value from the profile, if it exists
      * @return Program offset energy if entry exits in the profile, nullopt otherwise
@@ -77,6 +85,13 @@ class ProfileHandler {
      */
     void read(const std::string& filename);
 
+    /**
+     * Check if the profile was read from the given file, e.g. by a server analyzing several programs
+     * @param filename Path of the profile
+     * @return True if the last profile read came from the given file
+     */
+    bool isLoaded(const std::string& filename) const;
+
     /**
      * Query the local _profile variable
      */
@@ -97,6 +112,11 @@ class ProfileHandler {
      * Internal profile storage
      */
     json _profile;
+
+    /**
+     * Path of the file the profile was read from, empty if it was not read from a file
+     */
+    std::string _path;
 };
 
 #endif  // SRC_SPEAR_PROFILEHANDLER_H_
@@ -325,6 +325,13 @@ class ProgramGraph {
      */
     double getEnergy(LLVMHandler *handler);
 
+    /**
+     * Switch all nodes of this ProgramGraph and the subgraphs of its LoopNodes to the given strategy and drop their
+     * cached energy, so the graph can be evaluated again without reconstructing it
+     * @param strategy The strategy the next energy calculation should follow
+     */
+    void resetEnergy(AnalysisStrategy::Strategy strategy);
+
     /**
      * Calculates the LoopNodes contained in this ProgramGraph
      * @return Returns a Vector of references to the contained LoopNodes.
@@ -6,7 +6,53 @@
 #ifndef SRC_SPEAR_REGISTERREADER_H_
 #define SRC_SPEAR_REGISTERREADER_H_
 #include <cstdint>
+#include <map>
+#include <string>
+#include <vector>
 
+/**
+ * Source of the energy counters
+ */
+enum class EnergyBackend {
+    /**
+     * RAPL registers read through /dev/cpu/N/msr, requires root access
+     */
+    MSR,
+    /**
+     * RAPL domains exposed by the powercap framework under /sys/class/powercap
+     */
+    POWERCAP
+};
+
+/**
+ * Energy counter of a RAPL domain exposed by the powercap framework
+ */
+struct PowercapDomain {
+    /**
+     * Name of the domain, subdomains are prefixed with their package, e.g. package-0/core
+     */
+    std::string name;
+    /**
+     * Descriptor of the opened energy_uj file of the domain
+     */
+    int fileDescriptor = -1;
+    /**
+     * Value of max_energy_range_uj, the counter wraps around after reaching it
+     */
+    uint64_t maxRange = 0;
+    /**
+     * Counter value of the previous read
+     */
+    uint64_t last = 0;
+    /**
+     * Microjoules accumulated since the domain was opened
+     */
+    uint64_t total = 0;
+    /**
+     * True if the domain contributes to getEnergy
+     */
+    bool selected = false;
+};
 
 /**
  * Class to read out the Intel RAPL Registers
@@ -15,24 +61,48 @@ class RegisterReader {
     /**
      * The address of the register containing the energycounter
      */
-    uint64_t energyReg;
+    uint64_t energyReg = 0;
     /**
      * The address of the register containing the unit register
      */
-    uint64_t unitReg;
+    uint64_t unitReg = 0;
     /**
      * Char-Array to safe the file containing all the processor register
      */
     char regFile[32]{};
+    /**
+     * Backend the energy is read from
+     */
+    EnergyBackend backend;
+    /**
+     * RAPL domains of the powercap backend
+     */
+    std::vector<PowercapDomain> domains;
 
  public:
         /**
-         * Constructor setting the core to read the rapl registers from
+         * Constructor setting the core to read the rapl registers from. The registers are read through the MSR
+         * device if it is accessible and through the powercap framework otherwise
          * @param core The core to read
          */
         explicit RegisterReader(int core);
         /**
-         * Method to read the energy from the respective register
+         * Constructor using the given backend
+         * @param core The core to read, only used by the MSR backend
+         * @param backend The backend to read the energy from
+         * @param powercapRoot Directory containing the powercap zones
+         */
+        RegisterReader(int core, EnergyBackend backend, const std::string &powercapRoot = "/sys/class/powercap");
+
+        ~RegisterReader();
+
+        RegisterReader(const RegisterReader &) = delete;
+        RegisterReader &operator=(const RegisterReader &) = delete;
+
+        /**
+         * Method to read the energy from the respective register. The powercap backend sums up the core domains of
+         * all packages, which corresponds to the core register of the MSR backend. Without core domains the
+         * packages are summed up instead
          * @return The current energy-counter
          */
         double getEnergy();
@@ -41,6 +111,21 @@ class RegisterReader {
          * @return The current multiplier used for the energy-counter
          */
         double readMultiplier();
+        /**
+         * Reads the energy of every package and subdomain of the powercap backend
+         * @return Energy in joules accumulated since construction, indexed by the domain name
+         */
+        std::map<std::string, double> getDomainEnergies();
+        /**
+         * @return The backend the energy is read from
+         */
+        EnergyBackend getBackend() const;
+        /**
+         * Checks if the MSR device of the given core can be read
+         * @param core The core to check
+         * @return True if the device can be opened for reading
+         */
+        static bool msrAvailable(int core);
 
  private:
         /**
@@ -49,6 +134,20 @@ class RegisterReader {
          * @return Value in the register as 64-bit unsigned integer
          */
         int64_t read(uint64_t registerOffset);
+        /**
+         * Selects the RAPL registers of the processor vendor
+         */
+        void initMsr(int core);
+        /**
+         * Opens the energy counters of all RAPL packages and their subdomains
+         * @param powercapRoot Directory containing the powercap zones
+         */
+        void initPowercap(const std::string &powercapRoot);
+        /**
+         * Reads the counter of the given domain and accumulates the difference to the previous read
+         * @param domain The domain to update
+         */
+        static void updateDomain(PowercapDomain *domain);
 };
 
 
@@ -8,6 +8,7 @@
 #define SRC_SPEAR_CONFIGURATION_CONFIGURATIONUTILS_H_
 
 #include <string>
+#include <vector>
 #include "configuration/valuespace.h"
 
 class ConfigurationUtils {
@@ -36,6 +37,22 @@ class ConfigurationUtils {
      */
     static Strategy strToStrategy(const std::string &str);
 
+    /**
+     * Convert a comma separated list of strategies, e.g. "worst,best,average", to strategy enum types
+     *
+     * @param str String to convert
+     * @return Strategy enum types in the given order, empty if any of the strategies is unsupported
+     */
+    static std::vector<Strategy> strToStrategies(const std::string &str);
+
+    /**
+     * Convert a strategy enum type to its string representation
+     *
+     * @param strategy Strategy to convert
+     * @return String representation as accepted by strToStrategy
+     */
+    static std::string strategyToStr(Strategy strategy);
+
     /**
      * Convert a string to an analysis type enum type
      *
@@ -17,6 +17,10 @@ struct LegacyAnalysisConfiguration {
     Mode mode;
     Format format;
     Strategy strategy;
+    /**
+     * All strategies the analysis is evaluated for. The first one equals strategy
+     */
+    std::vector<Strategy> strategies;
     bool deepcalls;
 };
 
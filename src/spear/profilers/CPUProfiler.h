@@ -7,6 +7,7 @@
 #define SRC_SPEAR_PROFILERS_CPUPROFILER_H_
 
 #include <map>
+#include <memory>
 #include <string>
 #include <vector>
 #include <fstream>
@@ -14,6 +15,7 @@
 #include <utility>
 
 #include "Profiler.h"
+#include "KernelHarness.h"
 using json = nlohmann::json;
 
 /**
@@ -83,18 +85,6 @@ class CPUProfiler : public Profiler {
         std::string programs_path = codePath + "/cpu/compiled/";
         std::string meta_path = codePath + "/cpu/meta.json";
 
-        std::vector<std::string> filenames;
-        for (const auto& entry : std::filesystem::directory_iterator(programs_path)) {
-            if (entry.is_regular_file()) {
-                std::string filename = entry.path().filename().string();
-                filenames.push_back(entry.path().filename().string());  // only the file name, not full path
-            }
-        }
-
-        for (const std::string& filename : filenames) {
-            _profileCode[filename] = programs_path + filename;
-        }
-
         json metadata;
         std::ifstream fileStream(meta_path);
         if (!fileStream) {
@@ -108,11 +98,65 @@ class CPUProfiler : public Profiler {
             throw std::runtime_error("CPU profiler: Metadata file malformed!");
         }
 
+        this->number_of_cores = std::thread::hardware_concurrency();
+
+        // Kernels generated in the library layout are called in-process from a shared library
+        if (metadata.contains("layout") && metadata["layout"] == "library") {
+            if (!metadata.contains("library") || !metadata.contains("symbols")) {
+                throw std::runtime_error("CPU profiler: Metadata file malformed!");
+            }
+
+            std::string library = programs_path + metadata["library"].get<std::string>() + ".so";
+            auto symbols = metadata["symbols"].get<std::map<std::string, std::string>>();
+            for (const auto& [kernel, symbol] : symbols) {
+                _profileCode[kernel] = library;
+            }
+
+            this->harness = std::make_unique<KernelHarness>(library, symbols, this->number_of_cores);
+            this->log("Running all kernels in-process from the library " + library);
+        } else if (metadata.contains("layout") && metadata["layout"] == "bundle") {
+            // Kernels generated in the bundle layout share a single program, which selects the kernel by its argument
+            if (!metadata.contains("bundle") || !metadata.contains("kernels")) {
+                throw std::runtime_error("CPU profiler: Metadata file malformed!");
+            }
+
+            std::string bundle = programs_path + metadata["bundle"].get<std::string>();
+            for (const auto& kernel : metadata["kernels"]) {
+                _profileCode[kernel.get<std::string>()] = bundle;
+            }
+
+            this->bundled = true;
+            this->log("Running all kernels from the program " + bundle);
+        } else {
+            std::vector<std::string> filenames;
+            for (const auto& entry : std::filesystem::directory_iterator(programs_path)) {
+                if (entry.is_regular_file()) {
+                    filenames.push_back(entry.path().filename().string());  // only the file name, not full path
+                }
+            }
+
+            for (const std::string& filename : filenames) {
+                _profileCode[filename] = programs_path + filename;
+            }
+        }
+
         this->programiterations = metadata["repeated_executions"];
 
         this->log(std::string("repeated_executions ") + std::to_string(this->programiterations));
 
-        this->number_of_cores = std::thread::hardware_concurrency();
+        // Kernels generated in loop mode come with an empty loop kernel, which measures the loop overhead
+        if (metadata.contains("loop_baseline")) {
+            this->loopBaseline = metadata["loop_baseline"].get<std::string>();
+            this->log("Subtracting loop overhead measured by " + this->loopBaseline);
+        }
+
+        // Memory kernels come with a kernel that only initializes their buffer, which measures the initialization
+        if (metadata.contains("memory_baselines")) {
+            this->memoryBaselines = metadata["memory_baselines"].get<std::map<std::string, std::string>>();
+            this->log("Subtracting the buffer initialization from " + std::to_string(this->memoryBaselines.size()) +
+                " memory kernels");
+        }
+
         this->log(std::string("number of cores ") + std::to_string(this->number_of_cores));
     }
 
@@ -167,6 +211,26 @@ class CPUProfiler : public Profiler {
      */
     uint64_t programiterations;
 
+    /**
+     * Name of the empty loop kernel used to subtract the loop overhead. Empty if the kernels are fully unrolled
+     */
+    std::string loopBaseline;
+
+    /**
+     * Mapping of every memory kernel to the kernel that only initializes its buffer
+     */
+    std::map<std::string, std::string> memoryBaselines;
+
+    /**
+     * True if all kernels are contained in a single program, which expects the kernel name as its argument
+     */
+    bool bundled = false;
+
+    /**
+     * Harness calling the kernels in-process if they are generated as shared library, nullptr otherwise
+     */
+    std::unique_ptr<KernelHarness> harness;
+
     /**
      * Number of cores available on the system.
     */
@@ -180,9 +244,28 @@ class CPUProfiler : public Profiler {
     /**
      * Measure a given file for its energy usage using the amounts of repetitions specific in the object
      * @param file Path the file is stored at
+     * @param runtime Amount of measurements
+     * @param kernel Kernel passed as argument to the program. No argument is passed if empty
      * @return Returns vector containing all recorded measurement values
      */
-    [[nodiscard]] std::vector<double> _measureFile(const std::string& file, uint64_t runtime = -1) const;
+    [[nodiscard]] std::vector<double> _measureFile(const std::string& file, uint64_t runtime = -1,
+                                                   const std::string& kernel = "") const;
+
+    /**
+     * Measure the kernel of the given instruction for its energy usage. Depending on the layout of the kernels
+     * the kernel is called in-process or its program is executed
+     * @param instruction Name of the instruction
+     * @param runtime Amount of measurements
+     * @return Returns vector containing all recorded measurement values
+     */
+    [[nodiscard]] std::vector<double> _measure(const std::string& instruction, uint64_t runtime) const;
+
+    /**
+     * Argument selecting the kernel of the given instruction inside its profile program
+     * @param instruction Name of the instruction
+     * @return Instruction name in the bundle layout, an empty string otherwise
+     */
+    [[nodiscard]] std::string _kernelArgument(const std::string& instruction) const;
 
     /**
      * Calculates a moving average on the given data with the specified window
@@ -0,0 +1,130 @@
+/*
+ * Copyright (c) 2026 Maximilian Krebs
+ * All rights reserved.
+*/
+
+#ifndef SRC_SPEAR_PROFILERS_KERNELHARNESS_H_
+#define SRC_SPEAR_PROFILERS_KERNELHARNESS_H_
+
+#include <sys/types.h>
+
+#include <chrono>
+#include <cstdint>
+#include <map>
+#include <string>
+#include <vector>
+
+/**
+ * Executes the profile kernels exported by a shared library. The library is loaded once by the profiling process.
+ * Measuring a kernel forks one worker process per core from it, which stays alive for all samples and calls the
+ * kernel in a tight loop whenever a sample starts. The measurements neither contain the startup of a program, the work
+ * of the dynamic loader nor the creation of the workers
+ */
+class KernelHarness {
+ public:
+    /**
+     * Signature of the kernel functions exported by the library
+     */
+    using Kernel = int (*)();
+
+    /**
+     * Loads the given library and resolves the symbols of all kernels
+     * @param library Path of the shared library
+     * @param symbols Mapping between instruction name and the symbol of its kernel
+     * @param cores Number of cores executing a kernel in parallel
+     */
+    KernelHarness(const std::string &library, const std::map<std::string, std::string> &symbols, unsigned int cores);
+
+    /**
+     * Unloads the library
+     */
+    ~KernelHarness();
+
+    KernelHarness(const KernelHarness &) = delete;
+    KernelHarness &operator=(const KernelHarness &) = delete;
+
+    /**
+     * Measure the energy of a single execution of the given kernel. Every worker warms up the kernel first,
+     * afterwards each sample executes it on every core as often as needed to span several RAPL updates
+     * @param instruction Name of the instruction the kernel belongs to
+     * @param runtime Amount of samples
+     * @return Vector containing the energy of a single kernel execution per core for every sample
+     */
+    [[nodiscard]] std::vector<double> measure(const std::string &instruction, uint64_t runtime) const;
+
+ private:
+    /**
+     * Duration the kernel is executed before sampling starts. Also used to estimate the duration of a single call
+     */
+    static constexpr std::chrono::milliseconds WARMUP_DURATION{50};
+
+    /**
+     * Minimal duration of a single sample. RAPL counters are updated roughly every millisecond, shorter samples
+     * would mostly measure the update granularity
+     */
+    static constexpr std::chrono::milliseconds SAMPLE_DURATION{10};
+
+    /**
+     * Handle of the loaded library
+     */
+    void *handle = nullptr;
+
+    /**
+     * Number of cores executing a kernel in parallel
+     */
+    unsigned int cores;
+
+    /**
+     * Mapping of instruction names to the kernel functions
+     */
+    std::map<std::string, Kernel> kernels;
+
+    /**
+     * Worker process executing a kernel on a single core. It receives the amount of calls of a sample through its
+     * socket and answers once it is done
+     */
+    struct Worker {
+        pid_t pid;
+        int socket;
+    };
+
+    /**
+     * Warm up the given kernel and calculate how often it has to be called to fill a sample
+     * @param kernel Kernel to calibrate
+     * @return Calls per sample
+     */
+    [[nodiscard]] static uint64_t _calibrate(Kernel kernel);
+
+    /**
+     * Fork a worker pinned to every core. Each core runs in its own process, so the kernels do not share their
+     * globals. The workers warm up the kernel before they report how often it has to be called to fill a sample
+     * @param kernel Kernel to execute
+     * @param calls Set to the calls per sample, the maximum over all workers
+     * @return Started workers
+     */
+    [[nodiscard]] std::vector<Worker> _start(Kernel kernel, uint64_t *calls) const;
+
+    /**
+     * Let every worker call its kernel and wait until all of them are done
+     * @param workers Workers executing the kernel
+     * @param calls Amount of calls per worker
+     */
+    static void _run(const std::vector<Worker> &workers, uint64_t calls);
+
+    /**
+     * Let the workers exit and wait for them
+     * @param workers Workers to stop
+     * @return True if all workers finished successfully
+     */
+    static bool _stop(const std::vector<Worker> &workers);
+
+    /**
+     * Body of a worker process. Serves samples until the socket is closed
+     * @param kernel Kernel to execute
+     * @param core Core the worker is pinned to
+     * @param socket Socket connected to the profiling process
+     */
+    [[noreturn]] static void _work(Kernel kernel, unsigned int core, int socket);
+};
+
+#endif  // SRC_SPEAR_PROFILERS_KERNELHARNESS_H_
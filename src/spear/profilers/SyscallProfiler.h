@@ -8,6 +8,7 @@
 
 #include <bpf/libbpf.h>
 
+#include <memory>
 #include <unordered_map>
 #include <vector>
 
@@ -89,9 +90,10 @@ class SyscallProfiler : public Profiler {
 
  private:
     /*
-     * Register reader to handle measurements
+     * Register reader to handle measurements. Created by profile(), so spear starts on machines without readable
+     * RAPL counters and only the syscall profiling reports their absence
      */
-    static RegisterReader raplReader;
+    static std::unique_ptr<RegisterReader> raplReader;
 
     /*
      * Stop the current measurement and accumulate the measured energy since the last start
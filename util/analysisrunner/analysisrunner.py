@@ -1,12 +1,21 @@
-import csv
+import argparse
 import math
 import os
 import json
-import struct
 import sys
 import subprocess
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from timeit import default_timer as timer
+from typing import Dict, List, Optional
+
+from journal import CsvJournal, read_json, write_json
+from memoryusage import DEFAULT_INTERVAL, MemoryMonitor, MemoryUsage, communicate, memory_entry, \
+    print_memory_report, server_usage
+from resultcache import DEFAULT_MAX_SIZE, ResultCache
+from resultreader import extract_file, nested
+from spearclient import AnalysisError, SpearClient, result, start_server
 
 # libpath = "../../cmake-build-debug/src/main/passes/energy/Energy.so"
 # modelpath = "../../cmake-build-debug/profile.json"
@@ -15,105 +24,375 @@ core = 1
 
 # iterations = 100
 
+stategies = ["worst", "best", "average"]
+
+
+class CommandResult:
+    """
+    Captured outcome of an external command
+    """
+    command: List[str]
+    returncode: int
+    stdout: str
+    stderr: str
+    duration: float
+    memory: Optional[MemoryUsage]
+
+    def __init__(self, command: List[str], returncode: int, stdout: str, stderr: str, duration: float,
+                 memory: Optional[MemoryUsage] = None):
+        self.command = command
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration = duration
+        self.memory = memory
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+    def error(self) -> str:
+        """
+        Short description of a failed command
+        """
+        message = self.stderr.strip().splitlines()
+        return f"{Path(self.command[0]).name} exited with {self.returncode}" + (f": {message[-1]}" if message else "")
+
+
+def run_command(command: List[str], interval: Optional[float] = None) -> CommandResult:
+    """
+    Run the given command and capture its output and peak memory. With an interval the RSS of the command is sampled
+    every interval seconds. Commands that cannot be started are reported like failed ones
+    """
+    start = timer()
+
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    except OSError as e:
+        return CommandResult(command, 127, "", str(e), timer() - start)
+
+    with MemoryMonitor(process, interval) as monitor:
+        stdout, stderr = communicate(process)
+
+    return CommandResult(command, process.returncode, stdout, stderr, timer() - start, monitor.usage)
+
 
 def runprogram(spear, file, iterations):
-    ges_energy = 0
+    result = run_command([spear, "-a", str(iterations), file])
+
+    if not result.ok:
+        raise RuntimeError(result.error())
+
+    return float(result.stdout)
+
+
+def write_analysis_config(baseconfig, loopbound, outputdir):
+    """
+    Derive the configuration of the runner from the given spear configuration. The legacy analysis evaluates all
+    strategies at once, loops without a computable bound are approximated by the given bound and the results are
+    written to the given directory
+    """
+    with open(baseconfig) as f:
+        config = json.load(f)
+
+    analysis = config["analysis"]
+    analysis["type"] = "legacy"
+    analysis["outputmode"] = "normal"
+    analysis["outputDirectory"] = str(outputdir)
+    analysis["elbMappingActivated"] = False
+    analysis["ELBs"] = []
+    analysis["legacyConfig"]["strategy"] = stategies
+
+    loops = analysis.setdefault("fallback", {}).setdefault("loops", {})
+    for key in loops:
+        loops[key] = int(loopbound)
+
+    os.makedirs(outputdir, exist_ok=True)
+    configpath = os.path.join(outputdir, "analysisrunner.json")
+    with open(configpath, "w") as f:
+        json.dump(config, f, indent=2)
+
+    return configpath
+
+
+def analysis_command(file, spear, modelpath, configpath, strategies=None):
+    return [spear, "analyze",
+            "--profile", modelpath,
+            "--program", file,
+            "--config", configpath,
+            "--strategy", ",".join(strategies or stategies)]
+
+
+MAIN_STRATEGIES = ("functions", "main", "strategies")
+
+
+def read_analysis_output(file, outputdir):
+    """
+    Read the part of the output spear wrote for the given file the runner uses. The output is streamed, as it gets
+    large for big programs
+    """
+    return nested(extract_file(os.path.join(outputdir, "{}.json".format(Path(file).stem)), [MAIN_STRATEGIES]))
+
+
+def main_energies(output):
+    """
+    Energy of the main function for every strategy
+    """
+    functions, main, strategies = MAIN_STRATEGIES
+    energies = output[functions][main][strategies]
+    return {strategy: energies[strategy] for strategy in stategies}
+
+
+class AnalysisResult:
+    """
+    Outcome of the analysis of a single file. Either the output of spear or an error is set
+    """
+    file: str
+    output: Optional[dict]
+    error: Optional[str]
+    duration: float
+    cached: bool
+    memory: Optional[MemoryUsage]
+
+    def __init__(self, file: str, output: Optional[dict], error: Optional[str], duration: float,
+                 cached: bool = False, memory: Optional[MemoryUsage] = None):
+        self.file = file
+        self.output = output
+        self.error = error
+        self.duration = duration
+        self.cached = cached
+        self.memory = memory
 
-    process = subprocess.Popen([spear, "-a", str(iterations), file], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    stdout, stderr = process.communicate()
+    @property
+    def ok(self) -> bool:
+        return self.error is None
 
-    return float(stdout)
 
+def analyze_file(file, spear, modelpath, configpath, outputdir, bound, cache: Optional[ResultCache],
+                 server: Optional[str] = None, interval: Optional[float] = None) -> AnalysisResult:
+    """
+    Analyze a single file, through the analysis server listening on the given socket if there is one. The output is
+    taken from the cache if none of the inputs of the analysis changed. The peak memory of the analysis is recorded,
+    with an interval also its RSS over time, which the server does not report
+    """
+    start = timer()
+    key = None
+    memory = None
 
-def readRapl():
-    registerpath = "/dev/cpu/{}/msr".format(core)
-    energyreg = 0x639
-    unitreg = 0x606
+    try:
+        if cache is not None:
+            key = cache.key({"program": file, "profile": modelpath, "config": configpath, "spear": spear},
+                            strategies=stategies, loopbound=int(bound))
+            output = cache.get(key)
 
-    energy = 0
-    unit = 0
+            if output is not None:
+                return AnalysisResult(file, output, None, timer() - start, cached=True)
 
-    with open(registerpath, 'rb') as rf:
-        rf.seek(energyreg)
-        rawenergy = rf.read(8)
-        energy = struct.unpack('L', rawenergy)
-        cleaned_energy = energy[0]
+        if server is not None:
+            with SpearClient(server) as client:
+                client.submit(file, ",".join(stategies))
+                response = client.receive()
+                memory = server_usage(response)
+                output = result(response)
+        else:
+            command = run_command(analysis_command(file, spear, modelpath, configpath), interval)
+            memory = command.memory
 
-        rf.seek(0)
-        rf.seek(unitreg)
-        rawunit = rf.read(8)
-        unit = struct.unpack('Q', rawunit)[0]
-        cleaned_unit = (unit >> 8) & 0x1F
+            if not command.ok:
+                return AnalysisResult(file, None, command.error(), timer() - start, memory=memory)
 
-    return cleaned_energy * pow(0.5, cleaned_unit)
+            output = read_analysis_output(file, outputdir)
 
+        if key is not None:
+            cache.put(key, output)
+    except AnalysisError as e:
+        return AnalysisResult(file, None, str(e), timer() - start, memory=memory)
+    except (OSError, ValueError) as e:
+        return AnalysisResult(file, None, "{}: {}".format(type(e).__name__, e), timer() - start, memory=memory)
 
-def execute_analysis(file, strategy, loopbound, libpath, modelpath):
-    command = 'opt -disable-output ' \
-              '-load-pass-plugin {0} ' \
-              '--passes="function(mem2reg,loop-rotate),energy" ' \
-              '--profile {1} ' \
-              '--mode program ' \
-              '--format json ' \
-              '--strategy {2} ' \
-              '--loopbound {3} {4}'.format(libpath, modelpath, strategy, loopbound, file)
+    return AnalysisResult(file, output, None, timer() - start, memory=memory)
 
-    outputstream = os.popen(command)
-    output = outputstream.read()
 
-    return json.loads(output)
+def run_analyses(files: List[str], spear, modelpath, configpath, outputdir, bound, workers,
+                 cache: Optional[ResultCache] = None, server: Optional[str] = None,
+                 interval: Optional[float] = None) -> Dict[str, AnalysisResult]:
+    """
+    Run the analysis of every file on a pool of at most workers concurrent processes. Each analysis evaluates all
+    strategies at once. The analyses are CPU bound subprocesses, so threads suffice to keep the pool busy
+    """
+    results = {}
 
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for file in files:
+            future = pool.submit(analyze_file, file, spear, modelpath, configpath, outputdir, bound, cache, server,
+                                 interval)
+            futures[future] = file
 
-def write_analysis_result_to_csv(result):
+        for future in as_completed(futures):
+            file = futures[future]
+            result = future.result()
+            results[file] = result
+
+            status = "cached" if result.cached else "ok" if result.ok else "failed"
+            memory = ", {:.1f} MiB".format(result.memory.peak_rss / (1 << 20)) if result.memory is not None else ""
+            print("[{}/{}] {} {} ({:.2f}s{})".format(len(results), len(files), Path(file).name, status,
+                                                    result.duration, memory))
+
+    return results
+
+
+CSV_HEADER = ["File", "Worstcase", "Averagecase", "Bestcase", "Mean", "Variance", "Standard Deviation", "Measurement"]
+
+
+def analysis_row(entry):
     toround = 5
 
-    with open('analysis_result.csv', 'w') as f:
-        w = csv.writer(f)
-        w.writerow(["File", "Worstcase", "Averagecase", "Bestcase", "Mean", "Variance", "Standard Deviation", "Measurement"])
-        for key in result.keys():
-            entry = result[key]
-            mean = (entry["worst"] + entry["average"] + entry["best"])/3
-            variant = ((entry["worst"]-mean)**2 + (entry["average"]-mean)**2 + (entry["best"]-mean)**2)/3
-            deviation = math.sqrt(variant)
-            w.writerow([entry["name"], round(entry["worst"], toround), round(entry["average"], toround), round(entry["best"], toround), round(mean, toround), round(variant, toround), round(deviation, toround), round(entry["measurement"], toround)])
+    mean = (entry["worst"] + entry["average"] + entry["best"])/3
+    variant = ((entry["worst"]-mean)**2 + (entry["average"]-mean)**2 + (entry["best"]-mean)**2)/3
+    deviation = math.sqrt(variant)
+    return [entry["name"], round(entry["worst"], toround), round(entry["average"], toround), round(entry["best"], toround), round(mean, toround), round(variant, toround), round(deviation, toround), round(entry["measurement"], toround)]
+
+
+MEMORY_PATH = "analysis_memory.json"
 
 
-def main(builddir, bound, iterations, analysispath):
+def main(builddir, bound, iterations, analysispath, workers=os.cpu_count(), baseconfig=None, cachedir=None,
+         cachesize=DEFAULT_MAX_SIZE, resume=False, serve=False, interval=None):
     simpledirpath = analysispath
-    simpledir = os.listdir(simpledirpath)
-    stategies = ["worst", "best", "average"]
+    files = sorted(file for file in os.listdir(simpledirpath) if file.endswith(".ll"))
+
+    # Peak memory of every analyzed file, kept across resumed runs
+    memory = read_json(MEMORY_PATH) if resume else {}
+
+    # Every row is written as soon as its file is measured, so an interrupted run can be resumed
+    with CsvJournal("analysis_result.csv", CSV_HEADER, resume) as journal:
+        finished = [file for file in files if file in journal.done]
+        if finished:
+            print("Skipping {} files finished by a previous run".format(len(finished)))
+
+        files = [file for file in files if file not in journal.done]
+        failures = run(builddir, bound, iterations, simpledirpath, files, workers, baseconfig, cachedir, cachesize,
+                       journal, serve, interval, memory)
+
+    if memory:
+        print("Peak memory per instruction:")
+        print_memory_report(memory)
+
+    for failure in failures:
+        print(failure, file=sys.stderr)
+
+    if failures:
+        sys.exit(1)
 
-    analysis_dict = {}
 
-    for file in simpledir:
-        if file.endswith(".ll"):
-            filename = Path(file).stem
+def run(builddir, bound, iterations, simpledirpath, files, workers, baseconfig, cachedir, cachesize,
+        journal: CsvJournal, serve=False, interval=None, memory=None) -> List[str]:
+    """
+    Analyze and measure the given files and append their rows to the journal. The peak memory of every analysis is
+    added to memory and written to the memory file. Returns the failures
+    """
+    spear = "{}/spear".format(builddir)
+    modelpath = "{}/profile.json".format(builddir)
+    outputdir = "{}/analysisrunner".format(builddir)
 
-            relpath = "{0}/{1}".format(simpledirpath, file)
-            print("Running analysis for file {} [{}]".format(filename, relpath))
-            analysis_dict[file] = {}
-            for strategy in stategies:
-                # print("\t{}...".format(strategy))
-                json_result = execute_analysis(relpath, strategy, int(bound), "{}/src/main/passes/energy/Energy.so".format(builddir), "{}/profile.json".format(builddir))
-                analysis_dict[file][strategy] = json_result["main"]["energy"]
+    if baseconfig is None:
+        baseconfig = Path(__file__).resolve().parents[2] / "defaultconfig.json"
+    configpath = write_analysis_config(baseconfig, bound, outputdir)
 
+    cache = None
+    if cachedir is not None:
+        cache = ResultCache(cachedir, cachesize)
+
+    paths = ["{0}/{1}".format(simpledirpath, file) for file in files]
+    print("Running analyses for {} files on {} workers".format(len(files), workers))
+
+    if serve:
+        # The server loads the profile and the configuration once for all files
+        server = os.path.join(outputdir, "spear.sock")
+        process = start_server(spear, modelpath, configpath, server, workers)
+
+        try:
+            results = run_analyses(paths, spear, modelpath, configpath, outputdir, bound, workers, cache, server)
+        finally:
+            process.terminate()
+            process.wait()
+    else:
+        results = run_analyses(paths, spear, modelpath, configpath, outputdir, bound, workers, cache,
+                               interval=interval)
+
+    if memory is not None:
+        # Cached results were not analyzed, so they have no memory
+        for file, relpath in zip(files, paths):
+            if results[relpath].memory is not None:
+                memory[file] = memory_entry(relpath, results[relpath].memory)
+        write_json(MEMORY_PATH, memory)
+
+    analysis_dict = {}
+    failures = []
+
+    for file, relpath in zip(files, paths):
+        result = results[relpath]
+
+        try:
+            if not result.ok:
+                raise RuntimeError(result.error)
+            analysis_dict[file] = main_energies(result.output)
             analysis_dict[file]["name"] = file
+        except (RuntimeError, KeyError) as e:
+            failures.append("Analysis of {} failed: {}".format(relpath, e))
+
+    # The measurements read RAPL, so they run one after another once all analyses finished and the system is idle
+    for file, entry in analysis_dict.items():
+        filename = Path(file).stem
+        print("Measuring {}".format(filename))
 
-            measurement = runprogram("{}/spear".format(builddir), "{}/{}".format(simpledirpath, filename), int(iterations))
-            analysis_dict[file]["measurement"] = measurement
+        try:
+            entry["measurement"] = runprogram("{}/spear".format(builddir), "{}/{}".format(simpledirpath, filename),
+                                              int(iterations))
+        except (RuntimeError, ValueError) as e:
+            failures.append("Measurement of {} failed: {}".format(filename, e))
+            continue
 
-    write_analysis_result_to_csv(analysis_dict)
+        journal.append(analysis_row(entry))
 
-    # for i in range(1, 1000):
-    #     engergy_before = readRapl()
-    #     sleep(10)
-    #     energy_after = readRapl()
-    #
-    #     print(energy_after - engergy_before)
+    return failures
 
 
 if __name__ == "__main__":
-    if len(sys.argv) == 5:
-        main(sys.argv[1], sys.argv[2], sys.argv[3], sys.argv[4])
-    else:
-        print("Please provide a path to a folder containing .ll files")
+    parser = argparse.ArgumentParser(description="Compare the analysis of .ll files against their measured energy.")
+    parser.add_argument("builddir", help="Build directory containing spear, the energy pass and profile.json")
+    parser.add_argument("bound", help="Loop bound used for loops whose bound the analysis cannot calculate")
+    parser.add_argument("iterations", help="Iterations of every measurement")
+    parser.add_argument("analysispath", help="Path to a folder containing .ll files")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count(),
+                        help="Number of analyses running concurrently. Measurements always run alone")
+    parser.add_argument("--config", type=Path, default=None,
+                        help="spear configuration the analyses are based on (default: defaultconfig.json)")
+    parser.add_argument("--cache-dir", type=Path, default=None,
+                        help="Directory of the result cache (default: <builddir>/.analysiscache)")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_SIZE >> 20,
+                        help="Maximum size of the result cache in MiB")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Analyze every file, even if its result is cached")
+    parser.add_argument("--serve", action="store_true",
+                        help="Analyze the files through a spear serve process instead of one spear run per file")
+    parser.add_argument("--resume", action="store_true",
+                        help="Keep the rows of analysis_result.csv and skip the files they cover")
+    parser.add_argument("--rss-series", type=float, nargs="?", const=DEFAULT_INTERVAL, default=None,
+                        metavar="SECONDS",
+                        help="Sample the RSS of every analysis every SECONDS seconds (default: {}) and store the "
+                             "series in {}. The server does not report it".format(DEFAULT_INTERVAL, MEMORY_PATH))
+
+    args = parser.parse_args()
+
+    if args.jobs < 1:
+        print("Jobs must be greater than 0")
+        sys.exit(1)
+
+    cachedir = None
+    if not args.no_cache:
+        cachedir = args.cache_dir if args.cache_dir is not None else Path(args.builddir) / ".analysiscache"
+
+    main(args.builddir, args.bound, args.iterations, args.analysispath, args.jobs, args.config, cachedir,
+         args.cache_size << 20, args.resume, args.serve, args.rss_series)
@@ -0,0 +1,283 @@
+"""
+Timing harness of the runners.
+
+A measurement runs a number of warmup iterations, whose durations are dropped, and then collects one sample per
+iteration. Sampling stops once the bootstrap confidence interval of the median is narrower than the target relative to
+the median, or when the maximum number of samples is reached.
+
+Samples of two builds are compared with the one-sided Mann-Whitney U test, which makes no assumption about the
+distribution of the durations. A slowdown is reported if the test is significant and the median grew by more than a
+threshold, so tiny but consistent differences do not count as regressions.
+"""
+
+import math
+import random
+import statistics
+from itertools import groupby
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_RESAMPLES = 1000
+DEFAULT_ALPHA = 0.01
+DEFAULT_THRESHOLD = 0.05
+
+# Largest product of the sample sizes for which the exact distribution of U is computed
+EXACT_LIMIT = 400
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """
+    Percentile of sorted samples, interpolating linearly between the closest ranks
+    """
+    position = (len(ordered) - 1) * fraction
+    lower = math.floor(position)
+    upper = math.ceil(position)
+
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def bootstrap_interval(samples: List[float], confidence: float = DEFAULT_CONFIDENCE,
+                       resamples: int = DEFAULT_RESAMPLES, seed: int = 0,
+                       statistic: Callable[[List[float]], float] = statistics.median) -> Tuple[float, float]:
+    """
+    Percentile bootstrap confidence interval of the statistic, the median by default. The generator is seeded, so
+    the interval of the same samples is reproducible
+    """
+    generator = random.Random(seed)
+    estimates = sorted(statistic(generator.choices(samples, k=len(samples))) for _ in range(resamples))
+    tail = (1 - confidence) / 2
+
+    return percentile(estimates, tail), percentile(estimates, 1 - tail)
+
+
+class Statistics:
+    """
+    Summary of the samples of a measurement
+    """
+    samples: List[float]
+    warmup: int
+    min: float
+    median: float
+    mean: float
+    p95: float
+    mad: float
+    confidence: float
+    ci_low: float
+    ci_high: float
+
+    def __init__(self, samples: List[float], warmup: int = 0, confidence: float = DEFAULT_CONFIDENCE):
+        ordered = sorted(samples)
+
+        self.samples = list(samples)
+        self.warmup = warmup
+        self.min = ordered[0]
+        self.median = statistics.median(ordered)
+        self.mean = statistics.fmean(ordered)
+        self.p95 = percentile(ordered, 0.95)
+        self.mad = statistics.median(abs(sample - self.median) for sample in ordered)
+        self.confidence = confidence
+        self.ci_low, self.ci_high = bootstrap_interval(ordered, confidence)
+
+    @property
+    def relative_width(self) -> float:
+        """
+        Width of the confidence interval relative to the median
+        """
+        if self.median == 0:
+            return 0.0 if self.ci_high == self.ci_low else math.inf
+
+        return (self.ci_high - self.ci_low) / abs(self.median)
+
+    def to_dict(self) -> dict:
+        return {
+            "samples": self.samples,
+            "warmup": self.warmup,
+            "min": self.min,
+            "median": self.median,
+            "mean": self.mean,
+            "p95": self.p95,
+            "mad": self.mad,
+            "confidence": self.confidence,
+            "ci": [self.ci_low, self.ci_high],
+        }
+
+
+def phase_breakdown(runs: List[Dict[str, float]]) -> dict:
+    """
+    Summarize the durations of the analysis phases over several runs. Every run maps the phases to their duration.
+    The share of a phase is its median relative to the sum of the medians of all phases
+    """
+    phases = {}
+    for run in runs:
+        for phase, duration in run.items():
+            phases.setdefault(phase, []).append(duration)
+
+    breakdown = {phase: {"runs": len(durations), "min": min(durations), "median": statistics.median(durations),
+                         "mean": statistics.fmean(durations), "max": max(durations), "samples": durations}
+                 for phase, durations in phases.items()}
+
+    total = sum(summary["median"] for summary in breakdown.values())
+    for summary in breakdown.values():
+        summary["share"] = summary["median"] / total if total > 0 else 0.0
+
+    return breakdown
+
+
+def dominant_phase(breakdown: dict) -> Optional[str]:
+    """
+    Phase with the largest median duration
+    """
+    if not breakdown:
+        return None
+
+    return max(breakdown, key=lambda phase: breakdown[phase]["median"])
+
+
+def measure(sample: Callable[[], float], max_samples: int, warmup: int = 1, min_samples: int = 5,
+            target: Optional[float] = None, confidence: float = DEFAULT_CONFIDENCE) -> Statistics:
+    """
+    Call sample for the warmup runs and then until the relative width of the confidence interval of the median drops
+    below the target, taking at least min_samples and at most max_samples samples. Without a target all max_samples
+    samples are taken
+    """
+    for _ in range(warmup):
+        sample()
+
+    samples = []
+    while len(samples) < max_samples:
+        samples.append(sample())
+
+        if target is not None and len(samples) >= max(min_samples, 2):
+            if Statistics(samples, warmup, confidence).relative_width <= target:
+                break
+
+    return Statistics(samples, warmup, confidence)
+
+
+def _u_counts(larger: int, smaller: int) -> List[int]:
+    """
+    Number of orderings of two samples of the given sizes without ties for every value of U, the amount of pairs in
+    which the element of the first sample is larger
+    """
+    # counts[j] holds the distribution for the current size of the first sample and j elements of the second
+    counts = [[1] for _ in range(smaller + 1)]
+
+    for i in range(1, larger + 1):
+        row = [[1]]
+        for j in range(1, smaller + 1):
+            # Either the largest element belongs to the first sample and beats all j elements, or to the second
+            distribution = [0] * (i * j + 1)
+            for u, count in enumerate(counts[j]):
+                distribution[u + j] += count
+            for u, count in enumerate(row[j - 1]):
+                distribution[u] += count
+            row.append(distribution)
+        counts = row
+
+    return counts[smaller]
+
+
+def mann_whitney(baseline: List[float], current: List[float]) -> float:
+    """
+    One-sided p-value of the Mann-Whitney U test against the hypothesis that the current samples are not larger than
+    the baseline samples. The distribution of U is exact for small samples without ties, otherwise the normal
+    approximation with tie and continuity correction is used
+    """
+    m, n = len(current), len(baseline)
+    combined = sorted([(value, True) for value in current] + [(value, False) for value in baseline])
+
+    # Tied values share the average of their ranks
+    rank_sum = 0.0
+    ties = []
+    rank = 1
+    for _, group in groupby(combined, key=lambda item: item[0]):
+        group = list(group)
+        average = rank + (len(group) - 1) / 2
+        rank_sum += average * sum(1 for _, is_current in group if is_current)
+        ties.append(len(group))
+        rank += len(group)
+
+    u = rank_sum - m * (m + 1) / 2
+
+    if all(size == 1 for size in ties) and m * n <= EXACT_LIMIT:
+        counts = _u_counts(m, n)
+        return sum(counts[math.ceil(u):]) / sum(counts)
+
+    total = m + n
+    variance = m * n / 12 * ((total + 1) - sum(size ** 3 - size for size in ties) / (total * (total - 1)))
+    if variance <= 0:
+        return 1.0
+
+    z = (u - m * n / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def smallest_p_value(baseline: int, current: int) -> float:
+    """
+    Smallest p-value the test can reach with the given sample sizes
+    """
+    return 1 / math.comb(baseline + current, current)
+
+
+class Comparison:
+    """
+    Comparison of the samples of one measurement between the baseline and the current build. change is the relative
+    change of the median
+    """
+    baseline: float
+    current: float
+    change: float
+    p_value: float
+    inconclusive: bool
+    regression: bool
+
+    def __init__(self, baseline: List[float], current: List[float], alpha: float = DEFAULT_ALPHA,
+                 threshold: float = DEFAULT_THRESHOLD):
+        self.baseline = statistics.median(baseline)
+        self.current = statistics.median(current)
+        self.change = self.current / self.baseline - 1 if self.baseline > 0 else (math.inf if self.current > 0
+                                                                                  else 0.0)
+        self.p_value = mann_whitney(baseline, current)
+        # Too few samples to ever reach the significance level
+        self.inconclusive = smallest_p_value(len(baseline), len(current)) > alpha
+        self.regression = self.p_value < alpha and self.change > threshold
+
+    def to_dict(self) -> dict:
+        return {
+            "baseline": self.baseline,
+            "current": self.current,
+            "change": self.change,
+            "p": self.p_value,
+            "inconclusive": self.inconclusive,
+            "regression": self.regression,
+        }
+
+
+def holm(p_values: List[float], alpha: float = DEFAULT_ALPHA) -> List[bool]:
+    """
+    Holm's step-down procedure: which of the hypotheses with the given p-values are rejected, keeping the
+    probability of any false rejection below alpha
+    """
+    rejected = [False] * len(p_values)
+
+    for rank, index in enumerate(sorted(range(len(p_values)), key=lambda i: p_values[i])):
+        if p_values[index] >= alpha / (len(p_values) - rank):
+            break
+        rejected[index] = True
+
+    return rejected
+
+
+def compare_family(samples: List[Tuple[List[float], List[float]]], alpha: float = DEFAULT_ALPHA,
+                   threshold: float = DEFAULT_THRESHOLD) -> List[Comparison]:
+    """
+    Compare several measurements, given as (baseline, current) samples, at once. The regressions are corrected for
+    the number of comparisons with Holm's procedure. A measurement is inconclusive if its samples cannot reach the
+    strictest level of the procedure
+    """
+    comparisons = [Comparison(baseline, current, alpha / len(samples), threshold) for baseline, current in samples]
+
+    for comparison, rejected in zip(comparisons, holm([comparison.p_value for comparison in comparisons], alpha)):
+        comparison.regression = rejected and comparison.change > threshold
+
+    return comparisons
@@ -1,14 +1,21 @@
-import csv
+import argparse
 import datetime
 import math
 import os
-import json
 import struct
 import sys
 import subprocess
 from timeit import default_timer as timer
 from pathlib import Path
 
+from analysisrunner import analysis_command, run_command, write_analysis_config
+from benchmark import DEFAULT_ALPHA, DEFAULT_CONFIDENCE, DEFAULT_THRESHOLD, Comparison, compare_family, \
+    dominant_phase, measure, phase_breakdown
+from journal import CsvJournal, read_json, write_json
+from memoryusage import DEFAULT_INTERVAL, memory_entry, print_memory_report, server_usage
+from resultreader import extract_file
+from spearclient import SpearClient, result, start_server
+
 # libpath = "../../cmake-build-debug/src/main/passes/energy/Energy.so"
 # modelpath = "../../cmake-build-debug/profile.json"
 core = 1
@@ -24,59 +31,294 @@ def runprogram(spear, file, iterations):
     return float(stdout)
 
 
-def execute_analysis(file, strategy, loopbound, libpath, modelpath, iterations):
-    total_diff = 0
+def record_timings(timings, runs):
+    """
+    Append the phase timings spear reports in µs to runs, converted to seconds
+    """
+    if runs is not None and isinstance(timings, dict):
+        runs.append({phase: duration / 1e6 for phase, duration in timings.items()})
+
+
+def analysis_timings(output):
+    """
+    Phase timings of an analysis output, None if it has none. The output of several analyses is keyed by the name of
+    the analysis, and every analysis carries the timings of the whole run
+    """
+    if not isinstance(output, dict):
+        return None
+
+    if "timings" in output:
+        return output["timings"]
+
+    for entry in output.values():
+        if isinstance(entry, dict) and "timings" in entry:
+            return entry["timings"]
+
+    return None
+
+
+def result_duration(output):
+    """
+    Duration of the analyses of an analysis output in µs, None if it has none. The output of several analyses is keyed
+    by the name of the analysis, each of them reports its own duration
+    """
+    if not isinstance(output, dict):
+        return None
+
+    if "duration" in output:
+        return output["duration"]
+
+    durations = [entry["duration"] for entry in output.values() if isinstance(entry, dict) and "duration" in entry]
+    return sum(durations) if durations else None
+
+
+def analysis_duration(file, strategy, spear, modelpath, configpath, outputdir, runs=None, usages=None,
+                      interval=None):
+    """
+    Duration of a single analysis of the file in seconds, as measured by spear analyze. The phase timings of the
+    analysis are appended to runs and its memory to usages. With an interval the RSS is sampled meanwhile
+    """
+    outputpath = os.path.join(outputdir, "{}.json".format(Path(file).stem))
+
+    # spear analyze exits with 0 even if the analysis of the program failed, so an old output must not be read
+    if os.path.exists(outputpath):
+        os.remove(outputpath)
+
+    command = run_command(analysis_command(file, spear, modelpath, configpath, [strategy]), interval)
+
+    if usages is not None and command.memory is not None:
+        usages.append(command.memory)
+
+    if not command.ok:
+        raise RuntimeError(command.error())
+    if not os.path.exists(outputpath):
+        raise RuntimeError("spear analyze wrote no output for {}".format(file))
 
-    for i in range(iterations):
-        command = 'opt -disable-output ' \
-              '-load-pass-plugin {0} ' \
-              '--passes="function(mem2reg,loop-rotate),energy" ' \
-              '--profile {1} ' \
-              '--mode program ' \
-              '--format json ' \
-              '--strategy {2} ' \
-              '--loopbound {3} {4}'.format(libpath, modelpath, strategy, loopbound, file)
+    # Only the duration and the timings are needed from the output, which is large for big programs. A written file
+    # holds a single analysis, several analyses are written to files of their own
+    output = extract_file(outputpath, [("duration",), ("timings",)])
+    record_timings(output.get(("timings",)), runs)
 
-        outputstream = os.popen(command)
-        output = outputstream.read()
-        energy = json.loads(output)
+    # The analysis measures in microseconds
+    return output[("duration",)] / 1e6
 
-        total_diff = energy["duration"]
 
-    return total_diff/iterations
+def server_duration(client, file, strategy, runs=None, usages=None):
+    """
+    Duration of a single analysis of the file in seconds, as measured by the analysis itself. The duration the server
+    reports spans the whole worker, so the duration is taken from the result like spear analyze writes it. The phase
+    timings of the analysis are appended to runs and the memory of the worker to usages
+    """
+    client.submit(file, strategy)
+    response = client.receive()
+    output = result(response)
+    record_timings(analysis_timings(output), runs)
 
+    usage = server_usage(response)
+    if usages is not None and usage is not None:
+        usages.append(usage)
 
-def write_analysis_result_to_csv(result):
+    duration = result_duration(output)
+    if duration is None:
+        raise RuntimeError("The analysis of {} reported no duration".format(file))
+
+    # The analysis measures in microseconds
+    return duration / 1e6
+
+
+def peak_usage(usages):
+    """
+    Usage of the sample with the largest peak memory, None if no sample reported its memory
+    """
+    return max(usages, key=lambda usage: usage.peak_rss, default=None)
+
+
+def execute_analysis(file, strategy, spear, modelpath, configpath, outputdir, iterations, harness, interval=None):
+    runs = []
+    usages = []
+    stats = measure(lambda: analysis_duration(file, strategy, spear, modelpath, configpath, outputdir, runs, usages,
+                                              interval),
+                    iterations, **harness)
+
+    # The phases of the warmup runs are dropped like their durations, their memory is kept as it does not warm up
+    return stats, phase_breakdown(runs[stats.warmup:]), peak_usage(usages)
+
+
+def execute_analysis_on_server(file, strategy, server, iterations, harness):
+    runs = []
+    usages = []
+    with SpearClient(server) as client:
+        stats = measure(lambda: server_duration(client, file, strategy, runs, usages), iterations, **harness)
+
+    return stats, phase_breakdown(runs[stats.warmup:]), peak_usage(usages)
+
+
+CSV_PATH = "durationanalysis.csv"
+JSON_PATH = "durationanalysis.json"
+CSV_HEADER = ["File", "Analyse", "Ausführung"]
+
+
+def duration_row(entry):
     toround = 9
 
-    with open('durationanalysis.csv', 'w') as f:
-        w = csv.writer(f)
-        w.writerow(["File", "Analyse", "Ausführung"])
-        for key in result.keys():
-            entry = result[key]
+    return [entry["name"], round(entry["analysis"].mean, toround), round(entry["execution"], toround)]
+
+
+def baseline_entry(entry):
+    """
+    Samples of the analysis and of every phase of a summary entry, as stored in the baseline
+    """
+    phases = entry.get("phases", {})
+    return {"analysis": entry["analysis"]["samples"],
+            "phases": {phase: summary["samples"] for phase, summary in phases.items() if "samples" in summary}}
 
-            w.writerow([entry["name"], round(entry["analysis"], toround), round(entry["execution"], toround)])
 
+def print_comparison(file, measurement, comparison, status):
+    print("{:<30} {:<14} {:>12.6f} {:>12.6f} {:>+8.1%} {:>9.2g}  {}".format(
+        file, measurement, comparison.baseline, comparison.current, comparison.change, comparison.p_value, status))
 
-def main(builddir, bound, iterations, analysispath):
+
+def compare_to_baseline(summary, baseline, alpha=DEFAULT_ALPHA, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare the samples of every file against the baseline and print the comparisons. Only the duration of the whole
+    analysis is gated, corrected for the number of files with Holm's procedure. The phases are compared for
+    information. Returns the files that got significantly slower and the files with too few samples to tell
+    """
+    files = baseline.get("files", {})
+
+    print("{:<30} {:<14} {:>12} {:>12} {:>8} {:>9}  status".format("file", "measurement", "baseline", "current",
+                                                                   "change", "p"))
+    compared = []
+    for file, entry in sorted(summary.items()):
+        if file not in files:
+            print("{:<30} not in the baseline".format(file))
+        elif files[file]["analysis"] and entry["analysis"]["samples"]:
+            compared.append(file)
+
+    for file in sorted(files.keys() - summary.keys()):
+        print("{:<30} not measured".format(file))
+
+    if not compared:
+        return [], []
+
+    comparisons = compare_family([(files[file]["analysis"], summary[file]["analysis"]["samples"])
+                                  for file in compared], alpha, threshold)
+    regressions = []
+    inconclusive = []
+
+    for file, comparison in zip(compared, comparisons):
+        if comparison.regression:
+            regressions.append(file)
+        elif comparison.inconclusive:
+            inconclusive.append(file)
+
+        status = "slower" if comparison.regression else "inconclusive" if comparison.inconclusive else "ok"
+        print_comparison(file, "analysis", comparison, status)
+
+        current = baseline_entry(summary[file])["phases"]
+        for phase, before in sorted(files[file].get("phases", {}).items()):
+            after = current.get(phase)
+            if before and after:
+                phase_comparison = Comparison(before, after, alpha, threshold)
+                print_comparison(file, phase, phase_comparison,
+                                 "info, slower" if phase_comparison.regression else "info")
+
+    return regressions, inconclusive
+
+
+def main(builddir, bound, iterations, analysispath, resume=False, serve=False, baseconfig=None, harness=None,
+         interval=None, baselinepath=None, bless=False, alpha=DEFAULT_ALPHA, threshold=DEFAULT_THRESHOLD):
+    server = None
+    process = None
+
+    baseline = read_json(baselinepath) if baselinepath is not None else {}
+    if baselinepath is not None and not baseline and not bless:
+        print("There is no baseline at {}, store one with --bless".format(baselinepath), file=sys.stderr)
+        sys.exit(1)
+
+    outputdir = "{}/durationtester".format(builddir)
+    if baseconfig is None:
+        baseconfig = Path(__file__).resolve().parents[2] / "defaultconfig.json"
+    configpath = write_analysis_config(baseconfig, bound, outputdir)
+
+    if serve:
+        # One worker, so the measured analyses do not compete for the CPU
+        server = os.path.join(outputdir, "spear.sock")
+        process = start_server("{}/spear".format(builddir), "{}/profile.json".format(builddir), configpath, server, 1)
+
+    try:
+        summary = measure_files(builddir, iterations, analysispath, resume, configpath, outputdir, server,
+                                harness or {}, interval)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if baselinepath is None:
+        return
+
+    regressions, inconclusive = compare_to_baseline(summary, baseline, alpha, threshold) if baseline else ([], [])
+
+    if bless:
+        write_json(baselinepath, {"files": {file: baseline_entry(entry) for file, entry in summary.items()}})
+        print("Stored the samples of {} files as baseline in {}".format(len(summary), baselinepath))
+        return
+
+    # A comparison that cannot become significant would let every slowdown pass
+    if inconclusive:
+        print("{} files have too few samples to detect a slowdown at the corrected significance level, raise the "
+              "iterations: {}".format(len(inconclusive), ", ".join(inconclusive)), file=sys.stderr)
+    if regressions:
+        print("{} files are significantly slower than the baseline: {}".format(
+            len(regressions), ", ".join(regressions)), file=sys.stderr)
+    if inconclusive or regressions:
+        sys.exit(1)
+
+
+def measure_files(builddir, iterations, analysispath, resume, configpath, outputdir, server, harness, interval=None):
     simpledirpath = analysispath
     simpledir = os.listdir(simpledirpath)
     stategies = ["worst", "best", "average"]
 
     analysis_dict = {}
 
-    for file in simpledir:
-        if file.endswith(".ll"):
+    # All samples and their statistics, keyed by file
+    summary = read_json(JSON_PATH) if resume else {}
+
+    # Every row is written as soon as its file is processed, so an interrupted run can be resumed
+    with CsvJournal(CSV_PATH, CSV_HEADER, resume) as journal:
+        for file in simpledir:
+            if not file.endswith(".ll"):
+                continue
+
+            if file in journal.done:
+                print("Skipping {}, finished by a previous run".format(file))
+                continue
+
             filename = Path(file).stem
 
             relpath = "{0}/{1}".format(simpledirpath, file)
             print("Running time analysis for file {} [{}]".format(filename, relpath))
             analysis_dict[file] = {}
 
-            analysis_duration = execute_analysis(relpath, "worst", int(bound),
-                                                 "{}/src/main/passes/energy/Energy.so".format(builddir),
-                                                 "{}/profile.json".format(builddir), int(iterations))
-            analysis_dict[file]["analysis"] = analysis_duration
+            if server is not None:
+                analysis_stats, phases, usage = execute_analysis_on_server(relpath, "worst", server,
+                                                                           int(iterations), harness)
+            else:
+                analysis_stats, phases, usage = execute_analysis(relpath, "worst", "{}/spear".format(builddir),
+                                                                 "{}/profile.json".format(builddir), configpath,
+                                                                 outputdir, int(iterations), harness, interval)
+            analysis_dict[file]["analysis"] = analysis_stats
+
+            print("Analysis: median {:.6f}s, {:.0%} CI [{:.6f}s, {:.6f}s] from {} samples".format(
+                analysis_stats.median, analysis_stats.confidence, analysis_stats.ci_low, analysis_stats.ci_high,
+                len(analysis_stats.samples)))
+
+            dominant = dominant_phase(phases)
+            if dominant is not None:
+                print("Phases: {} (dominated by {}, {:.0%})".format(
+                    ", ".join("{} {:.6f}s".format(phase, summary["median"]) for phase, summary in phases.items()),
+                    dominant, phases[dominant]["share"]))
 
             analysis_dict[file]["name"] = file
 
@@ -84,18 +326,78 @@ def main(builddir, bound, iterations, analysispath):
                                             int(iterations))
             analysis_dict[file]["execution"] = execution_duration
 
-    write_analysis_result_to_csv(analysis_dict)
+            summary[file] = {"analysis": analysis_stats.to_dict(), "phases": phases, "dominant_phase": dominant,
+                             "execution": execution_duration}
+            if usage is not None:
+                summary[file]["memory"] = memory_entry(relpath, usage)
+                print("Memory: peak {:.1f} MiB".format(usage.peak_rss / (1 << 20)))
+            write_json(JSON_PATH, summary)
+            journal.append(duration_row(analysis_dict[file]))
+
+    dominated = {file: entry for file, entry in summary.items() if entry.get("dominant_phase") is not None}
+    if dominated:
+        print("Dominant analysis phases:")
+        for file, entry in sorted(dominated.items()):
+            phase = entry["dominant_phase"]
+            print("  {}: {} ({:.0%})".format(file, phase, entry["phases"][phase]["share"]))
+
+    memory = {file: entry["memory"] for file, entry in summary.items() if "memory" in entry}
+    if memory:
+        print("Peak memory per instruction:")
+        print_memory_report(memory)
 
-    # for i in range(1, 1000):
-    #     engergy_before = readRapl()
-    #     sleep(10)
-    #     energy_after = readRapl()
-    #
-    #     print(energy_after - engergy_before)
+    return summary
 
 
 if __name__ == "__main__":
-    if len(sys.argv) == 5:
-        main(sys.argv[1], sys.argv[2], sys.argv[3], sys.argv[4])
-    else:
-        print("Please provide a path to a folder containing .ll files")
+    parser = argparse.ArgumentParser(description="Compare the duration of the analysis of .ll files against their "
+                                                 "execution.")
+    parser.add_argument("builddir", help="Build directory containing spear and profile.json")
+    parser.add_argument("bound", help="Loop bound used by the analysis")
+    parser.add_argument("iterations", help="Iterations of every execution and maximum number of samples of every "
+                                           "analysis")
+    parser.add_argument("analysispath", help="Path to a folder containing .ll files")
+    parser.add_argument("--resume", action="store_true",
+                        help="Keep the results of durationanalysis.csv and .json and skip the files they cover")
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="Analyses run before the samples are taken, their durations are dropped")
+    parser.add_argument("--min-samples", type=int, default=5,
+                        help="Samples taken before the confidence interval is checked")
+    parser.add_argument("--target-ci", type=float, default=None,
+                        help="Stop sampling once the confidence interval of the median is narrower than this fraction "
+                             "of the median, e.g. 0.02. All iterations are sampled if not given")
+    parser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE,
+                        help="Confidence level of the interval")
+    parser.add_argument("--serve", action="store_true",
+                        help="Analyze the files through a spear serve process instead of one spear analyze run per "
+                             "analysis")
+    parser.add_argument("--config", type=Path, default=None,
+                        help="spear configuration the analyses are based on (default: defaultconfig.json)")
+    parser.add_argument("--compare", type=Path, default=None, metavar="BASELINE",
+                        help="Compare the samples of every file and phase against the baseline JSON and exit non-zero "
+                             "if any got significantly slower")
+    parser.add_argument("--bless", action="store_true",
+                        help="Store the samples of this run as the baseline given by --compare instead of failing on "
+                             "slowdowns")
+    parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA,
+                        help="Significance level of the Mann-Whitney U test of a slowdown (default: {})".format(
+                            DEFAULT_ALPHA))
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative growth of the median a significant slowdown must exceed (default: {})".format(
+                            DEFAULT_THRESHOLD))
+    parser.add_argument("--rss-series", type=float, nargs="?", const=DEFAULT_INTERVAL, default=None,
+                        metavar="SECONDS",
+                        help="Sample the RSS of every analysis every SECONDS seconds (default: {}) and store the "
+                             "series of the sample with the largest peak in {}. The server does not report "
+                             "it".format(DEFAULT_INTERVAL, JSON_PATH))
+
+    args = parser.parse_args()
+
+    if args.bless and args.compare is None:
+        print("--bless needs the baseline given by --compare")
+        sys.exit(1)
+
+    harness = {"warmup": args.warmup, "min_samples": args.min_samples, "target": args.target_ci,
+               "confidence": args.confidence}
+    main(args.builddir, args.bound, args.iterations, args.analysispath, args.resume, args.serve, args.config, harness,
+         args.rss_series, args.compare, args.bless, args.alpha, args.threshold)
@@ -0,0 +1,96 @@
+"""
+Crash safe output of the runners.
+
+Every row is appended and synced to disk as soon as its file is processed, so an interrupted run keeps all finished
+rows. A resumed run reads the existing rows and skips the files they cover. JSON summaries are replaced as a whole.
+"""
+
+import csv
+import json
+import os
+from typing import List, Set
+
+
+class CsvJournal:
+    """
+    CSV file written row by row. The first column identifies the processed file
+    """
+    path: str
+    header: List[str]
+    done: Set[str]
+
+    def __init__(self, path: str, header: List[str], resume: bool = False):
+        self.path = path
+        self.header = header
+        self.done = set()
+
+        resumed = resume and os.path.exists(path) and self._recover()
+
+        self._file = open(path, "a" if resumed else "w", newline="")
+        self._writer = csv.writer(self._file)
+
+        if not resumed:
+            self._append(header)
+
+    def _recover(self) -> bool:
+        """
+        Read the finished rows of an existing journal. A row cut off by a crash is removed, so the run writes it
+        again. Returns False if not even the header was written
+        """
+        with open(self.path, "rb+") as f:
+            content = f.read()
+            complete = content.rfind(b"\n") + 1
+
+            if complete < len(content):
+                f.truncate(complete)
+
+        with open(self.path, newline="") as f:
+            rows = list(csv.reader(f))
+
+        if not rows:
+            return False
+
+        if rows[0] != self.header:
+            raise ValueError("{} was written with a different header: {}".format(self.path, ", ".join(rows[0])))
+
+        self.done = {row[0] for row in rows[1:] if row}
+        return True
+
+    def _append(self, row: List):
+        self._writer.writerow(row)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, row: List):
+        """
+        Append the row of a processed file and sync it to disk
+        """
+        self._append(row)
+        self.done.add(str(row[0]))
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> "CsvJournal":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_json(path, content):
+    """
+    Replace the JSON file at once, so an interrupted run never leaves a truncated file
+    """
+    temporary = "{}.tmp".format(path)
+    with open(temporary, "w") as f:
+        json.dump(content, f, indent=2)
+    os.replace(temporary, path)
+
+
+def read_json(path):
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,254 @@
+"""
+Peak memory of the analyses launched by the runners.
+
+The kernel reports the peak resident set size of a reaped child in ru_maxrss, including the descendants it waited
+for. A child starting a new program keeps the peak of the runner it was spawned from, though, so ru_maxrss never drops
+below the peak of the runner at that time. The runners keep their results in memory, so this floor grows over a run.
+ru_maxrss is therefore only used if it exceeds the peak of the runner. Otherwise the peak is the largest VmHWM of the
+process tree, which is sampled from /proc while the child runs and misses at most the growth during the last
+interval before the child exits. Optionally the RSS of the child and all of its descendants is recorded as well, which
+shows how the memory grows over time.
+"""
+
+import os
+import re
+import subprocess
+import threading
+from timeit import default_timer as timer
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_INTERVAL = 0.1
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+# Instructions are indented inside function bodies, labels, metadata and declarations start at the line begin
+_INSTRUCTION = re.compile(r"^[ \t]+[%@\w]", re.MULTILINE)
+
+
+class MemoryUsage:
+    """
+    Memory of a single analysis. peak_rss is in bytes, the series holds (seconds since the start, bytes) samples
+    """
+    peak_rss: int
+    series: List[Tuple[float, int]]
+
+    def __init__(self, peak_rss: int, series: Optional[List[Tuple[float, int]]] = None):
+        self.peak_rss = peak_rss
+        self.series = series if series is not None else []
+
+    def to_dict(self) -> dict:
+        content = {"peak_rss": self.peak_rss}
+        if self.series:
+            content["series"] = self.series
+        return content
+
+
+def descendants(pid: int) -> List[int]:
+    """
+    The process and all of its descendants that are still alive
+    """
+    processes = [pid]
+
+    for process in processes:
+        try:
+            for task in os.listdir("/proc/{}/task".format(process)):
+                with open("/proc/{}/task/{}/children".format(process, task)) as f:
+                    processes += [int(child) for child in f.read().split()]
+        except OSError:
+            continue
+
+    return processes
+
+
+def peak_rss(pid: int) -> Optional[int]:
+    """
+    Peak resident memory of the current program of the process in bytes, None if the process is gone
+    """
+    try:
+        with open("/proc/{}/status".format(pid)) as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+def tree_peak_rss(pid: int) -> int:
+    """
+    Largest peak resident memory of the process and its descendants in bytes, the value ru_maxrss reports for a
+    process tree
+    """
+    return max((peak_rss(process) or 0 for process in descendants(pid)), default=0)
+
+
+def tree_rss(pid: int) -> int:
+    """
+    Resident memory of the process and its descendants in bytes
+    """
+    total = 0
+
+    for process in descendants(pid):
+        try:
+            with open("/proc/{}/statm".format(process)) as f:
+                total += int(f.read().split()[1]) * _PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            continue
+
+    return total
+
+
+class MemoryMonitor:
+    """
+    Reaps a started process with wait4 on exit of the context and records its peak RSS in usage. The peak RSS of the
+    process tree is sampled meanwhile, with an interval also its RSS every interval seconds. Read the pipes of the
+    process inside the context, as the process is waited for on exit
+    """
+    process: subprocess.Popen
+    interval: Optional[float]
+    usage: Optional[MemoryUsage]
+
+    def __init__(self, process: subprocess.Popen, interval: Optional[float] = None):
+        self.process = process
+        self.interval = interval
+        self.usage = None
+        # The peak of the runner only grows, so reading it after the start bounds the peak the process inherited
+        self._floor = peak_rss(os.getpid()) or 0
+        self._peak = 0
+        self._series = []
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def _sample(self):
+        start = timer()
+
+        while True:
+            self._peak = max(self._peak, tree_peak_rss(self.process.pid))
+
+            if self.interval is not None:
+                rss = tree_rss(self.process.pid)
+                if rss > 0:
+                    self._series.append((round(timer() - start, 6), rss))
+
+            if self._stopped.wait(self.interval or DEFAULT_INTERVAL):
+                return
+
+    def __enter__(self) -> "MemoryMonitor":
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # A process whose output is no longer read might never exit
+        if exc_type is not None:
+            self.process.kill()
+
+        # Stop sampling once the process exited, but before it is reaped, so no other process can take over its pid
+        os.waitid(os.P_PID, self.process.pid, os.WEXITED | os.WNOWAIT)
+        self._stopped.set()
+        self._sampler.join()
+
+        # Popen must not reap the process itself, the resource usage is only reported to the first waiter
+        _, status, rusage = os.wait4(self.process.pid, 0)
+        self.process.returncode = os.waitstatus_to_exitcode(status)
+
+        # ru_maxrss is in KiB on Linux. Above the peak of the runner it is the peak of the process tree itself, a
+        # process exiting before the first sample only leaves it as upper bound
+        maxrss = rusage.ru_maxrss * 1024
+        self.usage = MemoryUsage(maxrss if maxrss > self._floor or self._peak == 0 else self._peak, self._series)
+
+
+def communicate(process: subprocess.Popen) -> Tuple[str, str]:
+    """
+    Read stdout and stderr of the process until both are closed without waiting for the process, unlike
+    Popen.communicate
+    """
+    stderr = []
+    reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+    reader.start()
+
+    stdout = process.stdout.read()
+    reader.join()
+
+    process.stdout.close()
+    process.stderr.close()
+    return stdout, stderr[0]
+
+
+def server_usage(response: dict) -> Optional[MemoryUsage]:
+    """
+    Memory reported by the analysis server for the worker that answered the response
+    """
+    if "maxrss" not in response:
+        return None
+
+    return MemoryUsage(response["maxrss"])
+
+
+def count_instructions(file) -> int:
+    """
+    Amount of instructions in the textual IR file
+    """
+    count = 0
+    inside = False
+
+    with open(file, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line.startswith("define "):
+                inside = True
+            elif line.startswith("}"):
+                inside = False
+            elif inside and _INSTRUCTION.match(line):
+                count += 1
+
+    return count
+
+
+def available_memory() -> Optional[int]:
+    """
+    Memory available for new processes in bytes, None if it is unknown
+    """
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+def memory_entry(file, usage: MemoryUsage) -> dict:
+    """
+    Peak memory of the analysis of the file together with its size in instructions
+    """
+    instructions = count_instructions(file)
+    entry = usage.to_dict()
+    entry["instructions"] = instructions
+    entry["per_instruction"] = usage.peak_rss / instructions if instructions > 0 else None
+    return entry
+
+
+def print_memory_report(entries: Dict[str, dict], limit: Optional[int] = None):
+    """
+    Rank the files by their peak memory per instruction and estimate how many analyses fit into the available
+    memory at once
+    """
+    if not entries:
+        return
+
+    ranked = sorted(entries.items(), key=lambda item: item[1]["per_instruction"] or 0, reverse=True)
+
+    print("{:>12} {:>12} {:>14}  file".format("peak MiB", "instructions", "KiB/instr"))
+    for file, entry in ranked[:limit]:
+        per_instruction = entry["per_instruction"]
+        print("{:>12.1f} {:>12} {:>14}  {}".format(
+            entry["peak_rss"] / (1 << 20), entry["instructions"],
+            "{:.3f}".format(per_instruction / 1024) if per_instruction is not None else "-", file))
+
+    largest = max(entry["peak_rss"] for entry in entries.values())
+    available = available_memory()
+    if available is not None and largest > 0:
+        print("Largest peak {:.1f} MiB, {} analyses of that size fit into the available {:.1f} MiB".format(
+            largest / (1 << 20), available // largest, available / (1 << 20)))
@@ -0,0 +1,380 @@
+"""
+Reading of the RAPL energy counters.
+
+Two backends are supported. RaplSampler reads the registers through the MSR device of a core, which requires root
+access. PowercapSampler reads the RAPL domains exposed by the powercap framework in sysfs. Since Linux 5.10 the
+energy counters there are only readable by root as well, unless an administrator grants access to the energy_uj files.
+open_sampler picks the MSR device if it can be read and the powercap framework otherwise.
+
+The samplers keep their files open and read them with pread. The counters wrap around after a few minutes of load,
+so every read accumulates the difference to the previous read into an unbounded total. File-backed fakes of the MSR
+device and the powercap tree allow using the samplers without RAPL hardware.
+
+Measuring the energy of a piece of work in joules:
+
+    with open_sampler(core) as sampler:
+        before = sampler.energy()
+        work()
+        print(sampler.energy() - before)
+"""
+
+import glob
+import os
+import shutil
+import struct
+import tempfile
+from timeit import default_timer as timer
+from typing import Dict, List, MutableSequence, Optional
+
+# Registers used by RegisterReader.cpp: core energy and power unit
+INTEL_ENERGY_REGISTER = 0x639
+INTEL_UNIT_REGISTER = 0x606
+AMD_ENERGY_REGISTER = 0xC001029A
+AMD_UNIT_REGISTER = 0xC0010299
+
+COUNTER_MASK = 0xFFFFFFFF
+
+POWERCAP_ROOT = "/sys/class/powercap"
+
+# Unit of the energy_uj files of the powercap framework
+POWERCAP_UNIT = 1e-6
+
+_REGISTER = struct.Struct("<Q")
+
+
+def cpu_vendor() -> str:
+    """
+    Vendor of the processor as reported by /proc/cpuinfo, e.g. GenuineIntel
+    """
+    with open("/proc/cpuinfo") as f:
+        for line in f:
+            if line.startswith("vendor_id"):
+                return line.split(":", 1)[1].strip()
+
+    return ""
+
+
+def vendor_registers(vendor: Optional[str] = None):
+    """
+    Energy and unit register of the given vendor, defaults to the vendor of the processor
+    """
+    vendor = cpu_vendor() if vendor is None else vendor
+
+    if vendor == "GenuineIntel":
+        return INTEL_ENERGY_REGISTER, INTEL_UNIT_REGISTER
+    if vendor in ("AuthenticAMD", "HygonGenuine"):
+        return AMD_ENERGY_REGISTER, AMD_UNIT_REGISTER
+
+    raise RuntimeError("Unknown CPU vendor {}, RAPL is not supported".format(vendor or "<none>"))
+
+
+class EnergySampler:
+    """
+    Common interface of the backends. energy returns the joules consumed since the creation of the sampler
+    """
+
+    def energy(self) -> float:
+        raise NotImplementedError
+
+    def sample(self, energies: MutableSequence[float], timestamps: Optional[MutableSequence[float]] = None,
+               interval: float = 0.0) -> int:
+        """
+        Fill the given preallocated sequences with the energy and the time of consecutive reads, e.g. an
+        array("d", bytes(8 * n)). Reads are spaced at least interval seconds apart, a busy wait keeps the rate high.
+        Returns the amount of samples
+        """
+        count = len(energies)
+        if timestamps is not None and len(timestamps) < count:
+            raise ValueError("The timestamps cannot hold {} samples".format(count))
+
+        energy = self.energy
+        deadline = timer()
+
+        for i in range(count):
+            now = timer()
+            while now < deadline:
+                now = timer()
+
+            energies[i] = energy()
+            if timestamps is not None:
+                timestamps[i] = now
+
+            deadline = now + interval
+
+        return count
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RaplSampler(EnergySampler):
+    """
+    Energy counter of a single core. The counter starts at zero when the sampler is created and is returned in
+    joules
+    """
+    path: str
+    energy_register: int
+    unit_register: int
+    unit: float
+
+    def __init__(self, core: int = 0, path: Optional[str] = None, energy_register: Optional[int] = None,
+                 unit_register: Optional[int] = None):
+        if energy_register is None or unit_register is None:
+            energy_register, unit_register = vendor_registers()
+
+        self.path = path if path is not None else "/dev/cpu/{}/msr".format(core)
+        self.energy_register = energy_register
+        self.unit_register = unit_register
+        self._fd = os.open(self.path, os.O_RDONLY)
+
+        try:
+            self.unit = 0.5 ** ((self.read_register(unit_register) >> 8) & 0x1F)
+            self._last = self.read_counter()
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+        self._total = 0
+
+    def read_register(self, register: int) -> int:
+        """
+        Raw 64-bit value of the given register
+        """
+        data = os.pread(self._fd, _REGISTER.size, register)
+
+        if len(data) != _REGISTER.size:
+            raise OSError("Short read of register {:#x} from {}".format(register, self.path))
+
+        return _REGISTER.unpack(data)[0]
+
+    def read_counter(self) -> int:
+        """
+        Raw value of the 32-bit energy counter
+        """
+        return self.read_register(self.energy_register) & COUNTER_MASK
+
+    def ticks(self) -> int:
+        """
+        Counter ticks since the creation of the sampler. Wraparounds of the hardware counter are accounted for as
+        long as the counter is read at least once per wraparound
+        """
+        counter = self.read_counter()
+        self._total += (counter - self._last) & COUNTER_MASK
+        self._last = counter
+
+        return self._total
+
+    def energy(self) -> float:
+        """
+        Energy in joules since the creation of the sampler
+        """
+        return self.ticks() * self.unit
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PowercapDomain:
+    """
+    Energy counter of a RAPL domain in the powercap framework. Subdomains are named after their package, e.g.
+    package-0/core
+    """
+    name: str
+    path: str
+    max_range: int
+    total: int
+
+    def __init__(self, name: str, path: str, max_range: int):
+        self.name = name
+        self.path = path
+        self.max_range = max_range
+        self._fd = os.open(os.path.join(path, "energy_uj"), os.O_RDONLY)
+        self._last = self.read_counter()
+        self.total = 0
+
+    def read_counter(self) -> int:
+        return int(os.pread(self._fd, 32, 0))
+
+    def update(self) -> int:
+        """
+        Microjoules since the domain was opened. The counter restarts at zero after reaching max_energy_range_uj
+        """
+        counter = self.read_counter()
+
+        if counter >= self._last:
+            self.total += counter - self._last
+        else:
+            self.total += self.max_range - self._last + counter
+
+        self._last = counter
+        return self.total
+
+    @property
+    def is_package(self) -> bool:
+        return "/" not in self.name
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def _read_text(path: str) -> str:
+    with open(path) as f:
+        return f.read().strip()
+
+
+class PowercapSampler(EnergySampler):
+    """
+    Energy counters of every RAPL package and subdomain in the powercap framework. energy sums up the core domains,
+    which corresponds to the core register read by RaplSampler. Without core domains the packages are summed up
+    instead
+    """
+    root: str
+    domains: List[PowercapDomain]
+    selected: List[PowercapDomain]
+
+    def __init__(self, root: str = POWERCAP_ROOT):
+        self.root = root
+        self.domains = []
+        packages = {}
+
+        # Zones are named intel-rapl:<package>[:<subdomain>], also on AMD processors. Packages sort in front of
+        # their subdomains
+        for path in sorted(glob.glob(os.path.join(glob.escape(root), "intel-rapl:*"))):
+            zone = os.path.basename(path)
+            package, _, subdomain = zone[len("intel-rapl:"):].partition(":")
+
+            try:
+                name = _read_text(os.path.join(path, "name"))
+                max_range = int(_read_text(os.path.join(path, "max_energy_range_uj")))
+
+                if subdomain:
+                    name = "{}/{}".format(packages.get(package, "intel-rapl:" + package), name)
+                else:
+                    packages[package] = name
+
+                self.domains.append(PowercapDomain(name, path, max_range))
+            except (OSError, ValueError):
+                continue
+
+        if not self.domains:
+            raise RuntimeError("No readable RAPL domains found in {}".format(root))
+
+        cores = [domain for domain in self.domains if domain.name.endswith("/core")]
+        self.selected = cores if cores else [domain for domain in self.domains if domain.is_package]
+
+    def energy(self) -> float:
+        return sum(domain.update() for domain in self.selected) * POWERCAP_UNIT
+
+    def domain_energies(self) -> Dict[str, float]:
+        """
+        Energy in joules of every package and subdomain since the creation of the sampler
+        """
+        return {domain.name: domain.update() * POWERCAP_UNIT for domain in self.domains}
+
+    def close(self):
+        for domain in self.domains:
+            domain.close()
+
+
+def open_sampler(core: int = 0, powercap_root: str = POWERCAP_ROOT) -> EnergySampler:
+    """
+    Sampler of the MSR device of the given core if it can be read, of the powercap framework otherwise
+    """
+    try:
+        return RaplSampler(core)
+    except (OSError, RuntimeError):
+        return PowercapSampler(powercap_root)
+
+
+class FakeMsrDevice:
+    """
+    Sparse file standing in for /dev/cpu/N/msr. The registers are stored at their offsets, so a RaplSampler reads
+    the fake device like the real one. Unlike the device, a file cannot hold registers less than eight bytes apart,
+    which rules out the AMD register numbers
+    """
+    path: str
+    energy_register: int
+    unit_register: int
+
+    def __init__(self, path: Optional[str] = None, energy_register: int = INTEL_ENERGY_REGISTER,
+                 unit_register: int = INTEL_UNIT_REGISTER, energy_unit: int = 14, counter: int = 0):
+        if abs(energy_register - unit_register) < _REGISTER.size:
+            raise ValueError("Registers {:#x} and {:#x} overlap in a file".format(energy_register, unit_register))
+
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="msr.")
+            os.close(fd)
+
+        self.path = path
+        self.energy_register = energy_register
+        self.unit_register = unit_register
+
+        # The energy status unit occupies bits 8 to 12 of the unit register
+        self.write_register(unit_register, (energy_unit & 0x1F) << 8)
+        self.write_register(energy_register, counter)
+
+    def write_register(self, register: int, value: int):
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT, 0o600)
+
+        try:
+            os.pwrite(fd, _REGISTER.pack(value & 0xFFFFFFFFFFFFFFFF), register)
+        finally:
+            os.close(fd)
+
+    @property
+    def counter(self) -> int:
+        with open(self.path, "rb") as f:
+            f.seek(self.energy_register)
+            return _REGISTER.unpack(f.read(_REGISTER.size))[0]
+
+    def advance(self, ticks: int):
+        """
+        Advance the energy counter by the given ticks, wrapping around like the 32-bit hardware counter
+        """
+        self.write_register(self.energy_register, (self.counter + ticks) & COUNTER_MASK)
+
+    def sampler(self) -> RaplSampler:
+        return RaplSampler(path=self.path, energy_register=self.energy_register, unit_register=self.unit_register)
+
+    def remove(self):
+        os.unlink(self.path)
+
+
+class FakePowercapTree:
+    """
+    Directory standing in for /sys/class/powercap. Zones are added with their zone name, e.g. intel-rapl:0:1
+    """
+    root: str
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root if root is not None else tempfile.mkdtemp(prefix="powercap.")
+
+    def add_zone(self, zone: str, name: str, energy: int = 0, max_range: int = 262143328850):
+        path = os.path.join(self.root, zone)
+        os.makedirs(path, exist_ok=True)
+
+        with open(os.path.join(path, "name"), "w") as f:
+            f.write(name + "\n")
+        with open(os.path.join(path, "max_energy_range_uj"), "w") as f:
+            f.write("{}\n".format(max_range))
+        self.set_energy(zone, energy)
+
+    def set_energy(self, zone: str, energy: int):
+        with open(os.path.join(self.root, zone, "energy_uj"), "w") as f:
+            f.write("{}\n".format(energy))
+
+    def sampler(self) -> PowercapSampler:
+        return PowercapSampler(self.root)
+
+    def remove(self):
+        shutil.rmtree(self.root)
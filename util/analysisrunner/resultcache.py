@@ -0,0 +1,136 @@
+"""
+Persistent cache of analysis results.
+
+A result is stored as JSON file named after the hash of everything the analysis depends on: the analyzed file, the
+profile, the configuration, the analysis binary and further parameters like the strategies and the loop bound. The
+cache is bounded in size and evicts the least recently used results first.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+# Default upper bound of the cache size in bytes
+DEFAULT_MAX_SIZE = 256 << 20
+
+_SUFFIX = ".json"
+
+
+class ResultCache:
+    """
+    Size bounded on-disk cache of JSON results. The modification time of an entry is its last use, so evicting the
+    oldest entries first implements LRU eviction
+    """
+    directory: Path
+    max_size: int
+
+    def __init__(self, directory: Path, max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        self._lock = Lock()
+
+    def file_hash(self, path) -> str:
+        """
+        Hash of the content of the given file. Files shared by all analyses like the profile or the binary are only
+        read once as long as their size and modification time do not change
+        """
+        path = os.path.realpath(path)
+        stat = os.stat(path)
+        identity = (path, stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            if identity in self._hashes:
+                return self._hashes[identity]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+
+        with self._lock:
+            self._hashes[identity] = digest.hexdigest()
+
+        return digest.hexdigest()
+
+    def key(self, files: Dict[str, str], **parameters) -> str:
+        """
+        Cache key of an analysis reading the given files, given as role and path, with the given parameters
+        """
+        description = {
+            "files": {role: self.file_hash(path) for role, path in files.items()},
+            "parameters": parameters,
+        }
+
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Stored result of the given key or None. A hit marks the entry as recently used. Unreadable entries are
+        removed and reported as misses
+        """
+        path = self.directory / (key + _SUFFIX)
+
+        try:
+            with open(path) as f:
+                result = json.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            self._remove(path)
+            return None
+
+        return result
+
+    def put(self, key: str, result: dict):
+        """
+        Store the result of the given key and evict the least recently used entries exceeding the size bound. The
+        entry is written to a temporary file first, so concurrent readers never observe a partial result
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmppath = tempfile.mkstemp(prefix=f".{key}.", suffix=".tmp", dir=self.directory)
+
+        try:
+            with open(fd, "w") as f:
+                json.dump(result, f)
+            os.replace(tmppath, self.directory / (key + _SUFFIX))
+        except BaseException:
+            os.unlink(tmppath)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache fits into its size bound
+        """
+        entries = []
+
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(_SUFFIX) and entry.is_file():
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, Path(entry.path)))
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            self._remove(path)
+            size -= entry_size
+
+    @staticmethod
+    def _remove(path: Path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
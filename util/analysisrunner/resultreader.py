@@ -0,0 +1,295 @@
+"""
+Streaming reader of the JSON documents written by spear and the energy pass.
+
+The output of a program analyzed in instruction or block mode reaches hundreds of MB, while the runners only use a
+few values of it. The reader scans the document chunk by chunk, skips everything outside the requested paths without
+building it and only decodes the requested values, so the memory used is bounded by the chunk size and the size of the
+requested values.
+
+Paths are tuples of object keys and array indices, e.g. ("functions", "main", "strategies"). The wildcard "*" matches
+every key or index at its position.
+"""
+
+import json
+import re
+from typing import Any, Dict, IO, Iterable, Optional, Tuple
+
+JsonPath = Tuple
+WILDCARD = "*"
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRING_BODY = r'[^"\\]*(?:\\.[^"\\]*)*"'
+_STRING_END = re.compile(_STRING_BODY, re.S)
+_STRING_PART = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.S)
+# Runs of input without brackets, where strings and containers holding no further containers count as a single
+# element. Skipping over them at once leaves only the nested containers to the Python loop. The patterns are unrolled,
+# so a run cut off by the end of the buffer backtracks in linear time
+_PLAIN = r'[^\[\]{}"]*'
+_FLAT = r'{0}(?:"{1}{0})*'.format(_PLAIN, _STRING_BODY)
+_FLAT_RUN = re.compile(r'{0}(?:(?:"{1}|\{{{2}\}}|\[{2}\]){0})*'.format(_PLAIN, _STRING_BODY, _FLAT), re.S)
+_SCALAR = re.compile(r"[^,:\]}\s]+")
+
+
+class _Done(Exception):
+    """
+    Raised once every requested path was found
+    """
+
+
+class _Scanner:
+    """
+    Buffered cursor over a text stream. Consumed input is dropped from the buffer unless a value is being decoded
+    """
+
+    def __init__(self, stream: IO[str], chunk_size: int):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.anchor: Optional[int] = None
+
+    def fill(self) -> bool:
+        """
+        Read the next chunk, returns False at the end of the stream
+        """
+        keep = self.pos if self.anchor is None else self.anchor
+        self.buffer = self.buffer[keep:]
+        self.pos -= keep
+        if self.anchor is not None:
+            self.anchor -= keep
+
+        chunk = self.stream.read(self.chunk_size)
+        self.buffer += chunk
+        return bool(chunk)
+
+    def error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self.buffer, self.pos)
+
+    def peek(self) -> str:
+        """
+        Skip whitespace and return the next character without consuming it, "" at the end of the stream
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, characters: str) -> str:
+        character = self.peek()
+        if character == "" or character not in characters:
+            raise self.error("Expected one of '{}'".format(characters))
+
+        self.pos += 1
+        return character
+
+    def skip_string(self):
+        self.pos += 1
+
+        while True:
+            match = _STRING_END.match(self.buffer, self.pos)
+            if match is not None:
+                self.pos = match.end()
+                return
+
+            # Keep the scanned part of a string longer than the buffer, except for an escape cut in half
+            self.pos = _STRING_PART.match(self.buffer, self.pos).end()
+            if not self.fill():
+                raise self.error("Unterminated string")
+
+    def read_string(self) -> str:
+        if self.peek() != '"':
+            raise self.error("Expected a string")
+
+        # Filling the buffer moves the anchor along with the kept input
+        self.anchor = self.pos
+        self.skip_string()
+        start, self.anchor = self.anchor, None
+        return json.loads(self.buffer[start:self.pos])
+
+    def skip_value(self):
+        character = self.peek()
+
+        if character == '"':
+            self.skip_string()
+        elif character in "{[":
+            self.skip_container()
+        elif character == "":
+            raise self.error("Expected a value")
+        else:
+            self.skip_scalar()
+
+    def skip_container(self):
+        self.pos += 1
+        depth = 1
+
+        while True:
+            self.pos = _FLAT_RUN.match(self.buffer, self.pos).end()
+            if self.pos == len(self.buffer):
+                if not self.fill():
+                    raise self.error("Unterminated container")
+                continue
+
+            # A string or container cut off by the end of the buffer stops the run as well
+            character = self.buffer[self.pos]
+            if character == '"':
+                self.skip_string()
+                continue
+
+            self.pos += 1
+            depth += 1 if character in "{[" else -1
+            if depth == 0:
+                return
+
+    def skip_scalar(self):
+        # The scalar must be followed by a delimiter, otherwise it may continue in the next chunk
+        while True:
+            match = _SCALAR.match(self.buffer, self.pos)
+            if match is not None and match.end() < len(self.buffer):
+                self.pos = match.end()
+                return
+            if not self.fill():
+                if match is None:
+                    raise self.error("Expected a value")
+                self.pos = match.end()
+                return
+
+    def read_value(self) -> Any:
+        self.peek()
+        # Filling the buffer moves the anchor along with the kept input
+        self.anchor = self.pos
+        self.skip_value()
+        start, self.anchor = self.anchor, None
+        return json.loads(self.buffer[start:self.pos])
+
+
+def _matches(path: JsonPath, pattern: JsonPath) -> bool:
+    return all(part == WILDCARD or part == key for part, key in zip(pattern, path))
+
+
+class _Extractor:
+    """
+    Walks the document and decodes the values at the requested paths
+    """
+
+    def __init__(self, scanner: _Scanner, paths: Iterable[JsonPath]):
+        self.scanner = scanner
+        self.patterns = [tuple(path) for path in paths]
+        self.pending = {pattern for pattern in self.patterns if WILDCARD not in pattern}
+        self.complete = len(self.pending) == len(self.patterns)
+        self.results: Dict[JsonPath, Any] = {}
+
+    def wanted(self, path: JsonPath) -> bool:
+        return any(len(pattern) == len(path) and _matches(path, pattern) for pattern in self.patterns)
+
+    def inside(self, path: JsonPath) -> bool:
+        return any(len(pattern) > len(path) and _matches(path, pattern) for pattern in self.patterns)
+
+    def collect(self, path: JsonPath, value: Any):
+        """
+        Record the decoded value and the requested values nested in it
+        """
+        if self.wanted(path):
+            self.results.setdefault(path, value)
+            self.pending.discard(path)
+
+        if self.inside(path):
+            children = value.items() if isinstance(value, dict) else enumerate(value) if isinstance(value, list) else ()
+            for key, child in children:
+                self.collect(path + (key,), child)
+
+    def value(self, path: JsonPath):
+        if self.wanted(path):
+            self.collect(path, self.scanner.read_value())
+
+            if self.complete and not self.pending:
+                raise _Done()
+        elif self.inside(path):
+            character = self.scanner.peek()
+            if character == "{":
+                self.object(path)
+            elif character == "[":
+                self.array(path)
+            else:
+                self.scanner.skip_value()
+        else:
+            self.scanner.skip_value()
+
+    def object(self, path: JsonPath):
+        self.scanner.expect("{")
+        if self.scanner.peek() == "}":
+            self.scanner.pos += 1
+            return
+
+        while True:
+            key = self.scanner.read_string()
+            self.scanner.expect(":")
+            self.value(path + (key,))
+
+            if self.scanner.expect(",}") == "}":
+                return
+
+    def array(self, path: JsonPath):
+        self.scanner.expect("[")
+        if self.scanner.peek() == "]":
+            self.scanner.pos += 1
+            return
+
+        index = 0
+        while True:
+            self.value(path + (index,))
+            index += 1
+
+            if self.scanner.expect(",]") == "]":
+                return
+
+
+def extract(stream: IO[str], paths: Iterable[JsonPath], chunk_size: int = CHUNK_SIZE, drain: bool = False) \
+        -> Dict[JsonPath, Any]:
+    """
+    Decode the values at the given paths of the JSON document read from the text stream. Returns the values keyed
+    by their path, paths missing in the document are left out. Reading stops as soon as every path without wildcards
+    was found, unless drain is set. Drain the stdout of a subprocess, so the process does not block on a full pipe
+    """
+    scanner = _Scanner(stream, chunk_size)
+    extractor = _Extractor(scanner, paths)
+
+    try:
+        extractor.value(())
+        if scanner.peek() != "":
+            raise scanner.error("Extra data")
+    except _Done:
+        if drain:
+            while stream.read(chunk_size):
+                pass
+
+    return extractor.results
+
+
+def extract_file(filename, paths: Iterable[JsonPath], chunk_size: int = CHUNK_SIZE) -> Dict[JsonPath, Any]:
+    """
+    Decode the values at the given paths of a JSON file, e.g. an output file of spear analyze
+    """
+    with open(filename, encoding="utf-8") as f:
+        return extract(f, paths, chunk_size)
+
+
+def nested(results: Dict[JsonPath, Any]) -> dict:
+    """
+    Rebuild a sparse document holding only the extracted values, so code indexing the full document keeps working.
+    Array indices become object keys
+    """
+    document = {}
+
+    for path, value in results.items():
+        if not path:
+            return value
+
+        node = document
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+
+    return document
@@ -0,0 +1,126 @@
+"""
+Client of the analysis server started with `spear serve`.
+
+The server loads the profile and the configuration once and answers analysis requests on a UNIX domain socket.
+Requests and responses are JSON objects, one per line. Responses carry the id of their request and arrive as soon as
+their analysis finished, so several requests can be in flight on one connection.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import time
+from typing import Iterator, List, Optional
+
+
+class AnalysisError(RuntimeError):
+    """
+    The server could not analyze a program
+    """
+
+
+class SpearClient:
+    """
+    Connection to an analysis server. A connection must not be shared by several threads, open one per thread
+    instead
+    """
+    path: str
+
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        self.path = path
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(path)
+        self._reader = self._socket.makefile("r", encoding="utf-8")
+        self._next_id = 0
+
+    def submit(self, program: str, strategy: Optional[str] = None) -> int:
+        """
+        Send an analysis request without waiting for its response. Returns the id of the request
+        """
+        self._next_id += 1
+        request = {"id": self._next_id, "program": program}
+        if strategy is not None:
+            request["strategy"] = strategy
+
+        self._socket.sendall((json.dumps(request) + "\n").encode())
+        return self._next_id
+
+    def receive(self) -> dict:
+        """
+        Wait for the next response
+        """
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("The analysis server at {} closed the connection".format(self.path))
+
+        return json.loads(line)
+
+    def analyze(self, program: str, strategy: Optional[str] = None) -> dict:
+        """
+        Analyze a single program and return the output of the analysis, which has the layout of the output files
+        written by spear analyze
+        """
+        self.submit(program, strategy)
+        return result(self.receive())
+
+    def analyze_many(self, programs: List[str], strategy: Optional[str] = None) -> Iterator[dict]:
+        """
+        Send all requests at once and yield the responses in the order the analyses finish. The program of a
+        response is stored under "program"
+        """
+        for program in programs:
+            self.submit(program, strategy)
+
+        for _ in programs:
+            yield self.receive()
+
+    def close(self):
+        self._reader.close()
+        self._socket.close()
+
+    def __enter__(self) -> "SpearClient":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def result(response: dict) -> dict:
+    """
+    Output of the analysis of the given response, raises an AnalysisError for failed requests
+    """
+    if response.get("status") != "ok":
+        raise AnalysisError(response.get("error", "Unknown error"))
+
+    return response["result"]
+
+
+def start_server(spear: str, profile: str, config: str, path: str, workers: Optional[int] = None,
+                 timeout: float = 30.0) -> subprocess.Popen:
+    """
+    Start spear serve and wait until it accepts connections. Stop the returned process with terminate()
+    """
+    command = [spear, "serve", "--profile", profile, "--config", config, "--socket", path]
+    if workers is not None:
+        command += ["--workers", str(workers)]
+
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("spear serve exited with {}".format(process.returncode))
+
+        if os.path.exists(path):
+            try:
+                SpearClient(path).close()
+                return process
+            except OSError:
+                pass
+
+        time.sleep(0.05)
+
+    process.terminate()
+    raise TimeoutError("spear serve did not start listening on {}".format(path))
@@ -1,12 +1,21 @@
+import argparse
 import csv
 import math
 import os
 import json
+import statistics
 import sys
 import matplotlib.pyplot as plt
 import numpy as np
 import time
 
+from benchmark import DEFAULT_CONFIDENCE, bootstrap_interval
+
+# Reasons to stop profiling, recorded in the result
+CONVERGED = "converged"
+MAX_RUNS = "max_runs"
+TIME_BUDGET = "time_budget"
+
 result = {}
 stats = {"mean": {}, "variant": {}, "stddeviation": {}}
 group = [
@@ -109,7 +118,30 @@ def addToResult(iterations, data):
         result[iterations][key] = data["profile"][key]
 
 
-def write_result_to_file():
+def interval_widths(confidence=DEFAULT_CONFIDENCE):
+    """
+    Width of the bootstrap confidence interval of the mean of every group relative to the mean. Groups measured less
+    than twice have no width yet
+    """
+    widths = {}
+
+    for gro in group:
+        values = [result[key][gro] for key in result.keys() if gro in result[key]]
+        if len(values) < 2:
+            continue
+
+        mean = statistics.fmean(values)
+        low, high = bootstrap_interval(values, confidence, statistic=statistics.fmean)
+
+        if mean == 0:
+            widths[gro] = 0.0 if high == low else math.inf
+        else:
+            widths[gro] = (high - low) / abs(mean)
+
+    return widths
+
+
+def write_result_to_file(stopped=MAX_RUNS, widths=None):
     with open('./stability/stability_result.csv', 'w') as f:
         size = len(result.keys())
         groupvals = {}
@@ -143,11 +175,32 @@ def write_result_to_file():
         w.writerow(["variant", *list(stats["variant"].values())])
         w.writerow(["stddeviation", *list(stats["stddeviation"].values())])
 
+        if widths is not None:
+            w.writerow(["ci_width", *[widths.get(gro, "") for gro in group]])
+        w.writerow(["stopped", stopped])
+        w.writerow(["runs", len(result)])
+
 
-def main(spearpath, profilepath):
-    iterations = range(1, 100 , 1)
+def main(spearpath, profilepath, target=None, confidence=DEFAULT_CONFIDENCE, min_runs=10, max_runs=99,
+         max_time=None):
+    """
+    Profile up to max_runs times. With a target the profiling stops once the confidence interval of the mean of every
+    group is narrower than the target relative to the mean, checked from min_runs runs on. With max_time no run is
+    started that would end after max_time seconds, judged by the average duration of the previous runs
+    """
+    start = time.monotonic()
+    stopped = MAX_RUNS
+    widths = None
+    its = 0
 
-    for its in iterations:
+    while its < max_runs:
+        if max_time is not None and its > 0:
+            elapsed = time.monotonic() - start
+            if elapsed + elapsed / its > max_time:
+                stopped = TIME_BUDGET
+                break
+
+        its += 1
         abspahts = {"profile": os.path.abspath(profilepath), "savedir": os.path.abspath("./stability")}
 
         isExist = os.path.exists(abspahts["savedir"])
@@ -164,13 +217,43 @@ def main(spearpath, profilepath):
             print(data)
             addToResult(its, data)
 
+        if target is not None:
+            widths = interval_widths(confidence)
+            if widths:
+                widest = max(widths, key=widths.get)
+                print("Run {}: widest confidence interval {} at {:.2%} of the mean".format(its, widest,
+                                                                                          widths[widest]))
+
+            if its >= min_runs and widths and max(widths.values()) <= target:
+                stopped = CONVERGED
+                break
+
+    print("Stopped after {} runs: {}".format(its, stopped))
     print("Printing result to file...")
-    write_result_to_file()
+    write_result_to_file(stopped, widths)
     plot()
 
 
 if __name__ == "__main__":
-    if len(sys.argv) == 3:
-        main(sys.argv[1], sys.argv[2])
-    else:
-        print("Please provide a path to a folder containing .ll files")
+    parser = argparse.ArgumentParser(description="Profile repeatedly and record how stable the group energies are.")
+    parser.add_argument("spearpath", help="spear executable")
+    parser.add_argument("profilepath", help="Directory of the profile programs passed as --model")
+    parser.add_argument("--target-ci", type=float, default=None,
+                        help="Stop once the confidence interval of the mean of every group is narrower than this "
+                             "fraction of the mean, e.g. 0.01. All --max-runs runs are made if not given")
+    parser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE,
+                        help="Confidence level of the intervals")
+    parser.add_argument("--min-runs", type=int, default=10,
+                        help="Runs made before the confidence intervals are checked")
+    parser.add_argument("--max-runs", type=int, default=99, help="Maximum number of profile runs")
+    parser.add_argument("--max-hours", type=float, default=None,
+                        help="Do not start a run that would end after this many hours")
+
+    args = parser.parse_args()
+
+    if args.max_runs < 1 or args.min_runs < 2:
+        print("At least one run and two runs before checking the confidence intervals are needed")
+        sys.exit(1)
+
+    max_time = args.max_hours * 3600 if args.max_hours is not None else None
+    main(args.spearpath, args.profilepath, args.target_ci, args.confidence, args.min_runs, args.max_runs, max_time)
@@ -16,6 +16,17 @@ function compileFile() {
 
   mkdir -p "$path/compiled"
 
+  # Files prefixed with lib are linked as shared library exporting the kernel functions
+  relocation=()
+  linkflags=()
+  output="$path/compiled/$filename"
+
+  if [[ "$filename" == lib* ]]; then
+    relocation=(--relocation-model=pic)
+    linkflags=(-shared -fPIC)
+    output="$path/compiled/$filename.so"
+  fi
+
   echo "Generating LLVM IR"
   echo "Compiling $path/$filename.ll down to binary..."
 
@@ -28,11 +39,12 @@ function compileFile() {
     -fast-isel \
     -regalloc=fast \
     --dwarf64 \
+    "${relocation[@]}" \
     -filetype=obj \
     "$path/compiled/$filename.bc" \
     -o "$path/compiled/$filename.o"
 
-  echo "Generating final binary: $path/compiled/$filename"
+  echo "Generating final binary: $output"
 
   "$CLANGXX" \
     -O0 \
@@ -42,8 +54,9 @@ function compileFile() {
     -fno-vectorize \
     -fno-slp-vectorize \
     -fno-unroll-loops \
+    "${linkflags[@]}" \
     "$path/compiled/$filename.o" \
-    -o "$path/compiled/$filename"
+    -o "$output"
 
   rm "$path/compiled/$filename.bc"
   rm "$path/compiled/$filename.o"
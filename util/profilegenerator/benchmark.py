@@ -0,0 +1,47 @@
+import argparse
+import tempfile
+from pathlib import Path
+from timeit import default_timer as timer
+
+from main import worklist
+from profilegenerator.generator import Generator
+
+
+def measure(reps, runs):
+    """
+    Generate the full worklist with the given amount of repetitions and return the best time and the size of the
+    generated kernels
+    """
+    durations = []
+    size = 0
+
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            gen = Generator(worklist, Path(tmpdir), reps)
+
+            start = timer()
+            gen.generate()
+            durations.append(timer() - start)
+
+            size = sum(f.stat().st_size for f in Path(tmpdir).glob("*.ll"))
+
+    return min(durations), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the generation time of the profile kernels.")
+    parser.add_argument("repetitions", type=int, nargs="*", default=[1000, 10000, 100000],
+                        help="Repetition counts to benchmark")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per repetition count, the best run is reported")
+
+    args = parser.parse_args()
+
+    print(f"{'repetitions':>12} {'seconds':>10} {'MiB':>10} {'MiB/s':>10}")
+    for reps in args.repetitions:
+        duration, size = measure(reps, args.runs)
+        mib = size / (1 << 20)
+        print(f"{reps:>12} {duration:>10.3f} {mib:>10.1f} {mib / duration:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import List
+
+from profilegenerator.builder import Builder, BuildResult, Toolchain, DEFAULT_CACHE_SIZE, DEFAULT_LLVM_VERSION
+from profilegenerator.vector import vector_instructions
+
+# Kernels compiling this many times slower than the median are highlighted in the report
+SLOW_FACTOR = 3
+
+
+def check_vector_kernels(toolchain: Toolchain, results: List[BuildResult], basedir: Path) -> List[str]:
+    """
+    Count the vector operations in the compiled vector kernels. A kernel contains at least one operation per
+    instruction of its body, the repetitions of an unrolled kernel or the unroll factor of a loop kernel. Fewer
+    operations mean llc removed the dependency chain as dead code. Returns a message for every such kernel
+    """
+    try:
+        with open(basedir / "meta.json", "r") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return []
+
+    expected = meta.get("unroll_factor", meta.get("repeated_executions"))
+    if not isinstance(expected, int):
+        return []
+
+    names = {inst.get_opcode() for inst in vector_instructions()}
+    symbols = meta.get("symbols", {})
+    problems = []
+
+    for result in results:
+        if not result.ok:
+            continue
+
+        # Kernels have their own program in the file layout and are functions of the module in the other layouts
+        if result.source.stem in names:
+            functions = {result.source.stem: "main"}
+        else:
+            functions = {name: symbol for name, symbol in symbols.items() if name in names}
+        if not functions:
+            continue
+
+        counts = toolchain.vector_operations(result.output)
+        for name, function in functions.items():
+            if counts.get(function, 0) < expected:
+                problems.append(f"Vector kernel {name} contains {counts.get(function, 0)} vector operations, "
+                                f"expected at least {expected}")
+
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the generated profile kernels into binaries.")
+    parser.add_argument("path", type=Path, help="Kernel directory or a single .ll file")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count(),
+                        help="Number of kernels compiled in parallel")
+    parser.add_argument("--llvm-version", default=DEFAULT_LLVM_VERSION,
+                        help="Version suffix of the LLVM tools, empty for unsuffixed tools")
+    parser.add_argument("--cache-dir", type=Path, default=None,
+                        help="Directory of the artifact cache (default: <kernel directory>/.buildcache)")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE >> 20,
+                        help=f"Size limit of the artifact cache in MiB, the least recently used binaries are evicted "
+                             f"beyond it. 0 disables the limit (default: {DEFAULT_CACHE_SIZE >> 20})")
+
+    args = parser.parse_args()
+
+    if args.jobs < 1:
+        print("Jobs must be greater than 0")
+        sys.exit(1)
+
+    if args.cache_size < 0:
+        print("Cache size must not be negative")
+        sys.exit(1)
+
+    if args.path.is_dir():
+        sources = sorted(args.path.glob("*.ll"))
+        basedir = args.path
+    elif args.path.is_file():
+        sources = [args.path]
+        basedir = args.path.parent
+    else:
+        print(f"Error: '{args.path}' is not a directory or file")
+        sys.exit(1)
+
+    cache_dir = args.cache_dir if args.cache_dir is not None else basedir / ".buildcache"
+    builder = Builder(Toolchain(args.llvm_version), cache_dir, args.cache_size << 20 if args.cache_size > 0 else None)
+
+    try:
+        results = builder.build(sources, args.jobs)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"LLVM toolchain not usable: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    compiled = [result for result in results if result.ok and not result.cached]
+    median = statistics.median([result.duration for result in compiled]) if compiled else 0.0
+
+    print(f"{'seconds':>10}  {'status':<8} kernel")
+    for result in sorted(results, key=lambda r: r.duration, reverse=True):
+        if not result.ok:
+            status = "failed"
+        elif result.cached:
+            status = "cached"
+        elif len(compiled) > 1 and result.duration > SLOW_FACTOR * median:
+            status = "slow"
+        else:
+            status = "built"
+        print(f"{result.duration:>10.3f}  {status:<8} {result.source.name}")
+
+    failed = [result for result in results if not result.ok]
+    print(f"Compiled {len(compiled)} kernels, {len(results) - len(compiled) - len(failed)} from cache, "
+          f"{len(failed)} failed")
+    if builder.evicted:
+        print(f"Evicted {len(builder.evicted)} binaries from the cache")
+
+    for result in failed:
+        print(f"Failed to compile {result.source}: {result.error}", file=sys.stderr)
+
+    try:
+        problems = check_vector_kernels(builder.toolchain, results, basedir)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Could not disassemble the vector kernels: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    for problem in problems:
+        print(problem, file=sys.stderr)
+
+    if failed or problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,13 @@
 import argparse
+import os
+import sys
 from pathlib import Path
 
+from profilegenerator.builder import CompileCostModel, Toolchain, DEFAULT_LLVM_VERSION
 from profilegenerator.instruction import Instruction
-from profilegenerator.generator import Generator
+from profilegenerator.memory import CacheGeometry, LEVELS, memory_instructions, parse_size
+from profilegenerator.vector import scalar_instructions, vector_instructions
+from profilegenerator.generator import Generator, KERNEL_MODES, UNROLLED, DEFAULT_UNROLL, LAYOUTS, FILES
 
 worklist = [
     Instruction.complex_instruction('_noise', '', '', ''),
@@ -52,23 +57,157 @@ worklist = [
     Instruction("udiv", "i32", ["42", "3"]),
 ]
 
+# Kernel compiled at these repetitions to calibrate the compile time estimate of the dry run
+CALIBRATION_INSTRUCTION = Instruction("add", "i32", ["42", "311"])
+CALIBRATION_REPETITIONS = (100, 1000, 10000)
+
+# Default size limits of a single kernel, larger kernels are reported by the dry run
+DEFAULT_MAX_SIZE = "64M"
+DEFAULT_MAX_LINES = 1000000
+
+
+def dry_run(gen: Generator, args):
+    """
+    Report the size of every kernel and the estimated time to compile it without writing anything
+    """
+    estimates = gen.estimate()
+
+    sources = {}
+    for reps in CALIBRATION_REPETITIONS:
+        calibration = Generator([CALIBRATION_INSTRUCTION], "", reps)
+        kernel = calibration.build_kernel(CALIBRATION_INSTRUCTION)
+        sources[f"calibration{reps}.ll"] = "".join(calibration.render(kernel))
+
+    try:
+        model = CompileCostModel.calibrate(Toolchain(args.llvm_version), sources)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"Calibration compile failed, compile time is not estimated: {e}", file=sys.stderr)
+        model = None
+
+    # Modules are compiled as a whole, so their compile time is estimated once. Kernels that failed to render are
+    # not compiled
+    sizes = {}
+    for estimate in estimates:
+        if estimate.ok:
+            sizes[estimate.filename] = sizes.get(estimate.filename, 0) + estimate.size
+
+    print(f"{'lines':>12}  {'bytes':>14}  {'seconds':>10}  kernel")
+    for estimate in sorted(estimates, key=lambda e: e.size, reverse=True):
+        if not estimate.ok:
+            continue
+        seconds = f"{model.predict(estimate.size):.3f}" if model is not None else "-"
+        print(f"{estimate.lines:>12}  {estimate.size:>14}  {seconds:>10}  {estimate.opcode}")
+
+    ok = [estimate for estimate in estimates if estimate.ok]
+    print(f"{len(ok)} kernels in {len(sizes)} files, {sum(e.lines for e in ok)} lines, "
+          f"{sum(e.size for e in ok) / (1 << 20):.1f} MiB")
+
+    # Without a kernel to compile there is no compile time to estimate, the failures are reported below
+    if model is not None and sizes:
+        total = sum(model.predict(size) for size in sizes.values())
+        cores = os.cpu_count() or 1
+        print(f"Estimated compile time: {total:.1f}s sequential, {total / min(cores, len(sizes)):.1f}s "
+              f"with {cores} parallel jobs")
+
+    for estimate in ok:
+        if estimate.size > args.max_size or estimate.lines > args.max_lines:
+            print(f"Warning: {estimate.opcode} has {estimate.lines} lines and {estimate.size} bytes, exceeding "
+                  f"the limit of {args.max_lines} lines or {args.max_size} bytes", file=sys.stderr)
+
+    for estimate in estimates:
+        if not estimate.ok:
+            print(f"Failed to render {estimate.opcode}: {estimate.error}", file=sys.stderr)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Process a path input.")
     parser.add_argument("path", type=Path, help="Path to a file or directory")
     parser.add_argument("repetitions", type=int, help="Amount of instruction repetitions")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help=f"Number of processes generating kernels in parallel (this machine: {os.cpu_count()})")
+    parser.add_argument("--mode", choices=KERNEL_MODES, default=UNROLLED,
+                        help="Unroll every repetition or wrap a fixed amount of copies into a counted loop")
+    parser.add_argument("--unroll", type=int, default=DEFAULT_UNROLL,
+                        help="Instruction copies inside the loop body of loop kernels")
+    parser.add_argument("--layout", choices=LAYOUTS, default=FILES,
+                        help="Generate one program per kernel, a single program running the kernel named by its "
+                             "argument or a shared library exporting every kernel")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip the memory kernels sized to the levels of the cache hierarchy")
+    parser.add_argument("--no-vector", action="store_true",
+                        help="Skip the kernels of i64, double and vector types")
+    parser.add_argument("--l1", type=parse_size, help="L1 data cache size, e.g. 48K (default: read from sysfs)")
+    parser.add_argument("--l2", type=parse_size, help="L2 cache size, e.g. 2M (default: read from sysfs)")
+    parser.add_argument("--llc", type=parse_size, help="Last level cache size, e.g. 32M (default: read from sysfs)")
+    parser.add_argument("--line-size", type=int, help="Cache line size in bytes (default: read from sysfs)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Report the size and estimated compile time of every kernel without writing anything")
+    parser.add_argument("--max-size", type=parse_size, default=DEFAULT_MAX_SIZE,
+                        help=f"Size of a kernel reported by the dry run, e.g. 16M (default: {DEFAULT_MAX_SIZE})")
+    parser.add_argument("--max-lines", type=int, default=DEFAULT_MAX_LINES,
+                        help=f"Lines of a kernel reported by the dry run (default: {DEFAULT_MAX_LINES})")
+    parser.add_argument("--llvm-version", default=DEFAULT_LLVM_VERSION,
+                        help="Version suffix of the LLVM tools used to calibrate the dry run")
+    parser.add_argument("--force", action="store_true",
+                        help="Regenerate every kernel, even if it is unchanged since the last run")
 
     args = parser.parse_args()
     input_path = args.path
     reps = args.repetitions
 
-    # Always create the directory if needed
-    input_path.mkdir(parents=True, exist_ok=True)
+    # Always create the directory if needed, a dry run writes nothing
+    if not args.dry_run:
+        input_path.mkdir(parents=True, exist_ok=True)
+
+    if args.jobs < 1:
+        print("Jobs must be greater than 0")
+        sys.exit(1)
+
+    instructions = list(worklist)
+
+    if not args.no_vector:
+        instructions += scalar_instructions() + vector_instructions()
+
+    if not args.no_memory:
+        geometry = CacheGeometry.from_sysfs()
+        geometry.l1 = args.l1 or geometry.l1
+        geometry.l2 = args.l2 or geometry.l2
+        geometry.llc = args.llc or geometry.llc
+        geometry.line_size = args.line_size or geometry.line_size
+
+        working_sets = geometry.working_sets()
+        missing = [level for level in LEVELS if level not in working_sets]
+        if missing:
+            print(f"Cache geometry incomplete, skipping memory kernels for {', '.join(missing)}")
 
+        instructions += memory_instructions(geometry)
 
     if reps > 0:
-        gen = Generator(worklist, input_path, reps)
-        gen.generate()
+        try:
+            gen = Generator(instructions, input_path, reps, args.mode, args.unroll, args.force, args.layout)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+
+        if args.dry_run:
+            dry_run(gen, args)
+            return
+
+        results = gen.generate(args.jobs)
         gen.create_meta_file()
+
+        failed = [result for result in results if not result.ok]
+        skipped = [result for result in results if result.skipped]
+
+        print(f"Generated {len(results) - len(skipped) - len(failed)} kernels, "
+              f"skipped {len(skipped)} unchanged, removed {len(gen.removed)} stale files")
+
+        for result in failed:
+            print(f"Failed to generate {result.filename}: {result.error}", file=sys.stderr)
+
+        if failed:
+            print(f"{len(failed)} of {len(results)} kernels failed", file=sys.stderr)
+            sys.exit(1)
     else:
         print("Repetitions must be greater than 0")
 
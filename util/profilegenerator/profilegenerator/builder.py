@@ -0,0 +1,329 @@
+"""
+Parallel build of the generated kernels.
+
+Every kernel is compiled through llvm-as, llc and clang++ using the same flags as util/llvmToBinary/irToBinary.sh.
+Finished binaries are stored in an artifact cache keyed on the kernel source, the toolchain version and the flags,
+so unchanged kernels are never compiled twice. The least recently used binaries are evicted once the cache grows
+beyond its size limit.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from timeit import default_timer as timer
+from typing import Dict, List, Optional
+
+# LLVM version the tools are suffixed with, matches irToBinary.sh
+DEFAULT_LLVM_VERSION = "17"
+
+LLC_FLAGS = ["-O0", "-fast-isel", "-regalloc=fast", "--dwarf64", "-filetype=obj"]
+CLANG_FLAGS = ["-O0", "-g", "-fno-builtin", "-fno-inline", "-fno-vectorize", "-fno-slp-vectorize",
+               "-fno-unroll-loops"]
+
+# Kernels prefixed with lib are linked as shared library
+SHARED_LLC_FLAGS = ["--relocation-model=pic"]
+SHARED_CLANG_FLAGS = ["-shared", "-fPIC"]
+
+# Size limit of the artifact cache in bytes
+DEFAULT_CACHE_SIZE = 2 << 30
+
+# Start of a function and operands naming an SSE, AVX or AVX-512 register in the disassembly of a binary
+_FUNCTION = re.compile(r"^[0-9a-f]+ <(.+)>:$")
+_VECTOR_REGISTER = re.compile(r"%[xyz]mm\d+")
+
+# Instructions only moving a vector between registers and memory, e.g. spills and the loads of the start values
+_VECTOR_MOVE = re.compile(r"v?mov(?:aps|apd|ups|upd|dq[au]\d*|d|q|ss|sd)")
+
+
+class Toolchain:
+    """
+    LLVM tools used to compile a kernel
+    """
+    llvm_as: str
+    llc: str
+    clangxx: str
+    objdump: str
+    _version: Optional[str]
+
+    def __init__(self, llvm_version: str = DEFAULT_LLVM_VERSION):
+        suffix = f"-{llvm_version}" if llvm_version else ""
+        self.llvm_as = f"llvm-as{suffix}"
+        self.llc = f"llc{suffix}"
+        self.clangxx = f"clang++{suffix}"
+        self.objdump = f"llvm-objdump{suffix}"
+        self._version = None
+
+    @property
+    def version(self) -> str:
+        """
+        Version output of all tools. Part of the cache key, so updating the toolchain invalidates the cache
+        """
+        if self._version is None:
+            outputs = []
+            for tool in [self.llvm_as, self.llc, self.clangxx]:
+                process = subprocess.run([tool, "--version"], capture_output=True, text=True, check=True)
+                outputs.append(process.stdout)
+            self._version = "".join(outputs)
+        return self._version
+
+    @staticmethod
+    def is_shared(source: Path) -> bool:
+        return source.name.startswith("lib")
+
+    def flags(self, source: Path) -> dict:
+        """
+        Flags used to compile the given kernel
+        """
+        if self.is_shared(source):
+            return {"llc": LLC_FLAGS + SHARED_LLC_FLAGS, "clang": CLANG_FLAGS + SHARED_CLANG_FLAGS}
+        return {"llc": LLC_FLAGS, "clang": CLANG_FLAGS}
+
+    @staticmethod
+    def output_name(source: Path) -> str:
+        """
+        Name of the binary compiled from the given kernel
+        """
+        if Toolchain.is_shared(source):
+            return f"{source.stem}.so"
+        return source.stem
+
+    def compile(self, source: Path, target: Path, workdir: Path):
+        """
+        Compile the given kernel into the target binary. Intermediate files are placed in the working directory
+        """
+        flags = self.flags(source)
+        bitcode = workdir / f"{source.stem}.bc"
+        obj = workdir / f"{source.stem}.o"
+
+        self._run([self.llvm_as, str(source), "-o", str(bitcode)])
+        self._run([self.llc] + flags["llc"] + [str(bitcode), "-o", str(obj)])
+        self._run([self.clangxx] + flags["clang"] + [str(obj), "-o", str(target)])
+
+    def vector_operations(self, binary: Path) -> Dict[str, int]:
+        """
+        Amount of instructions computing on vector registers in every function of the given binary. Moves are not
+        counted, so a kernel whose instructions were removed as dead code shows up with almost no operations
+        """
+        process = subprocess.run([self.objdump, "-d", "--no-show-raw-insn", str(binary)],
+                                 capture_output=True, text=True, check=True)
+
+        counts = {}
+        function = None
+        for line in process.stdout.splitlines():
+            match = _FUNCTION.match(line)
+            if match:
+                function = match.group(1)
+                counts[function] = 0
+                continue
+
+            _, _, instruction = line.partition(":")
+            mnemonic = instruction.split(maxsplit=1)[0] if instruction.strip() else ""
+            if function is not None and _VECTOR_REGISTER.search(instruction) and not _VECTOR_MOVE.fullmatch(mnemonic):
+                counts[function] += 1
+
+        return counts
+
+    @staticmethod
+    def _run(command: List[str]):
+        process = subprocess.run(command, capture_output=True, text=True)
+
+        if process.returncode != 0:
+            message = process.stderr.strip().splitlines()
+            raise RuntimeError(f"{command[0]} failed: {message[0] if message else process.returncode}")
+
+
+class BuildResult:
+    """
+    Outcome of the build of a single kernel
+    """
+    source: Path
+    output: Path
+    duration: float
+    cached: bool
+    error: Optional[str]
+
+    def __init__(self, source: Path, output: Path, duration: float, cached: bool = False,
+                 error: Optional[str] = None):
+        self.source = source
+        self.output = output
+        self.duration = duration
+        self.cached = cached
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class Builder:
+    """
+    Compiles kernels in parallel and caches the compiled binaries. The cache is limited to cache_size bytes, None
+    lets it grow without bound
+    """
+    toolchain: Toolchain
+    cache_dir: Path
+    cache_size: Optional[int]
+    evicted: List[Path]
+
+    def __init__(self, toolchain: Toolchain, cache_dir: Path, cache_size: Optional[int] = DEFAULT_CACHE_SIZE):
+        self.toolchain = toolchain
+        self.cache_dir = Path(cache_dir)
+        self.cache_size = cache_size
+        self.evicted = []
+
+    def cache_key(self, source: Path, content: bytes) -> str:
+        """
+        Hash of everything the binary of the given kernel is compiled from
+        """
+        description = {
+            "flags": self.toolchain.flags(source),
+            "toolchain": self.toolchain.version,
+        }
+
+        digest = hashlib.sha256(content)
+        digest.update(json.dumps(description, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def build(self, sources: List[Path], jobs: int = 1) -> List[BuildResult]:
+        """
+        Build the given kernels into the compiled directory next to them. The results are returned in the order of
+        the given kernels. Afterwards the cache is trimmed to its size limit, keeping the binaries of this build
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        start = time.time()
+
+        # Probe the tools once, so a missing tool fails the build here and the workers reuse the resolved version
+        _ = self.toolchain.version
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(self.build_file, sources))
+
+        self.evicted = self.evict(start)
+        return results
+
+    def build_file(self, source: Path) -> BuildResult:
+        """
+        Build a single kernel. Failures are reported in the result instead of aborting the remaining builds
+        """
+        output = source.parent / "compiled" / self.toolchain.output_name(source)
+        start = timer()
+        cached = False
+
+        try:
+            artifact = self.cache_dir / self.cache_key(source, source.read_bytes())
+            cached = artifact.is_file()
+
+            if cached:
+                # The modification time orders the artifacts for eviction
+                os.utime(artifact)
+            else:
+                with tempfile.TemporaryDirectory(dir=self.cache_dir) as workdir:
+                    binary = Path(workdir) / "binary"
+                    self.toolchain.compile(source, binary, Path(workdir))
+                    os.replace(binary, artifact)
+
+            self.install(artifact, output)
+        except (OSError, RuntimeError, subprocess.CalledProcessError) as e:
+            return BuildResult(source, output, timer() - start, cached, f"{type(e).__name__}: {e}")
+
+        return BuildResult(source, output, timer() - start, cached)
+
+    def evict(self, used_since: float) -> List[Path]:
+        """
+        Delete the least recently used artifacts until the cache fits into its size limit. Artifacts used since the
+        given time are kept even if the limit is exceeded, as they belong to the current build
+        """
+        if self.cache_size is None:
+            return []
+
+        artifacts = []
+        for entry in self.cache_dir.iterdir():
+            # Working directories of running builds are no artifacts
+            if entry.is_file():
+                status = entry.stat()
+                artifacts.append((status.st_mtime, status.st_size, entry))
+
+        total = sum(size for _, size, _ in artifacts)
+        evicted = []
+
+        for mtime, size, artifact in sorted(artifacts):
+            if total <= self.cache_size or mtime >= used_since:
+                break
+
+            artifact.unlink(missing_ok=True)
+            total -= size
+            evicted.append(artifact)
+
+        return evicted
+
+    @staticmethod
+    def install(artifact: Path, output: Path):
+        """
+        Copy the cached binary to its output location. The copy replaces the output at once, so the profiler
+        never executes a partially copied binary
+        """
+        output.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmppath = tempfile.mkstemp(prefix=f".{output.name}.", suffix=".tmp", dir=output.parent)
+        os.close(fd)
+
+        try:
+            shutil.copy2(artifact, tmppath)
+            os.replace(tmppath, output)
+        except BaseException:
+            os.unlink(tmppath)
+            raise
+
+
+class CompileCostModel:
+    """
+    Linear model of the compile time of a kernel in its size. The model is fitted to the compile times of a few
+    calibration kernels, which is accurate enough since llc is roughly linear in the size of the unrolled kernels
+    """
+    overhead: float
+    seconds_per_byte: float
+
+    def __init__(self, overhead: float, seconds_per_byte: float):
+        self.overhead = overhead
+        self.seconds_per_byte = seconds_per_byte
+
+    @classmethod
+    def calibrate(cls, toolchain: Toolchain, sources: Dict[str, str]) -> "CompileCostModel":
+        """
+        Compile the given kernels, given as file name and IR text, and fit the model to their compile times.
+        At least two kernels of different size are needed
+        """
+        samples = []
+
+        with tempfile.TemporaryDirectory() as workdir:
+            for name, text in sources.items():
+                source = Path(workdir) / name
+                source.write_text(text)
+
+                start = timer()
+                toolchain.compile(source, Path(workdir) / Toolchain.output_name(source), Path(workdir))
+                samples.append((len(text.encode()), timer() - start))
+
+        if len({size for size, _ in samples}) < 2:
+            raise ValueError("Calibration needs kernels of at least two different sizes")
+
+        # Least squares fit of duration = overhead + seconds_per_byte * size
+        mean_size = sum(size for size, _ in samples) / len(samples)
+        mean_duration = sum(duration for _, duration in samples) / len(samples)
+        covariance = sum((size - mean_size) * (duration - mean_duration) for size, duration in samples)
+        variance = sum((size - mean_size) ** 2 for size, _ in samples)
+
+        seconds_per_byte = max(covariance / variance, 0.0)
+        return cls(max(mean_duration - seconds_per_byte * mean_size, 0.0), seconds_per_byte)
+
+    def predict(self, size: int) -> float:
+        """
+        Estimated compile time in seconds of a kernel of the given size in bytes
+        """
+        return self.overhead + self.seconds_per_byte * size
@@ -0,0 +1,366 @@
+"""
+Template based emission of the profile kernels.
+
+A kernel is described once by its static parts and a pre-rendered template for a single iteration of the
+profiled instruction. The emitter expands the iteration template for whole batches of repetitions at once and
+writes the result through a large buffer instead of issuing one write call per IR line.
+"""
+
+import os
+import re
+import secrets
+from itertools import chain, repeat
+from typing import Callable, Iterator, List, Optional, Tuple
+
+# Markers usable inside iteration templates
+ITER = "\x00i\x00"
+NEXT = "\x00next\x00"
+EXIT = "\x00exit\x00"
+
+# Marker usable inside the footer for the value the carry holds after the last iteration
+LAST = "\x00last\x00"
+
+_MARKER = re.compile("\x00(i|next|exit)\x00")
+
+# Global variables and functions defined by a kernel and external function declarations
+_DEFINITION = re.compile(r"^(?:@([-\w.$]+)\s*=|define\b[^@\n]*@([-\w.$]+)\()", re.MULTILINE)
+_DECLARATION = re.compile(r"^declare\b.*\n?", re.MULTILINE)
+
+# Stack allocations inside an iteration template
+_ALLOCA = re.compile(r"^[ \t]*%[-\w.$\x00]+ = alloca\b.*\n?", re.MULTILINE)
+
+# Amount of iterations rendered at once before they are handed to the file object
+DEFAULT_BATCH_SIZE = 8192
+
+# Size of the buffer used by the underlying file object
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+
+def template(text: str) -> str:
+    """
+    Convert IR text using the markers {i}, {next}, {exit} and {last} into an iteration template
+    """
+    return text.replace("{i}", ITER).replace("{next}", NEXT).replace("{exit}", EXIT).replace("{last}", LAST)
+
+
+class IterationTemplate:
+    """
+    Pre-split iteration template. Static text and markers alternate, so a batch of iterations can be
+    rendered by interleaving the static parts with the iteration numbers
+    """
+    text: str
+    parts: List[str]
+    markers: List[str]
+
+    def __init__(self, text: str):
+        self.text = text
+        pieces = _MARKER.split(text)
+        self.parts = pieces[0::2]
+        self.markers = pieces[1::2]
+
+    def render(self, start: int, stop: int, exit_label: str) -> str:
+        """
+        Render the iterations start..stop-1
+        """
+        if not self.markers:
+            return self.parts[0] * (stop - start)
+
+        numbers = list(map(str, range(start, stop + 1)))
+        values = {"i": numbers[:-1], "next": numbers[1:], "exit": repeat(exit_label)}
+
+        columns = []
+        for part, marker in zip(self.parts, self.markers):
+            columns.append(repeat(part))
+            columns.append(values[marker])
+        columns.append(repeat(self.parts[-1]))
+
+        # zip stops with the shortest column, which is always one of the number columns
+        return "".join(chain.from_iterable(zip(*columns)))
+
+
+class Carry:
+    """
+    Value carried from one iteration to the next. Iteration i reads %<name>i and defines %<name>{next}, the first
+    iteration reads the initial value
+    """
+    type: str
+    name: str
+    initial: str
+
+    def __init__(self, type: str, name: str, initial: str):
+        self.type = type
+        self.name = name
+        self.initial = initial
+
+
+class Kernel:
+    """
+    Template representation of a single profile program
+
+    globals:    Text in front of the function definition
+    pretext:    Text placed at the start of the entry block
+    body_start: Text placed in front of the first iteration
+    step:       Template of a single iteration
+    last:       Template of the last iteration. Defaults to step
+    terminated: True if the last iteration branches to the exit label on its own
+    footer:     Text placed after the last iteration, may refer to the final carried value through {last}
+    carry:      Value carried from one iteration to the next, None if the iterations are independent
+    """
+    globals: str
+    pretext: str
+    body_start: str
+    step: IterationTemplate
+    last: IterationTemplate
+    terminated: bool
+    footer: str
+    carry: Optional[Carry]
+
+    def __init__(self, globals: str, step: str, footer: str = "", pretext: str = "", body_start: str = "",
+                 last: Optional[str] = None, terminated: bool = False, carry: Optional[Carry] = None):
+        self.globals = globals
+        self.pretext = pretext
+        self.body_start = body_start
+        self.step = IterationTemplate(step)
+        self.last = IterationTemplate(last if last is not None else step)
+        self.terminated = terminated
+        self.footer = footer
+        self.carry = carry
+
+    def iterations(self, start: int, stop: int, exit_label: str, batch_size: int = DEFAULT_BATCH_SIZE) \
+            -> Iterator[str]:
+        """
+        Render the iterations start..stop-1 in batches. The last iteration uses the last template and
+        branches to the given exit label
+        """
+        for batch_start in range(start, stop - 1, batch_size):
+            batch_stop = min(batch_start + batch_size, stop - 1)
+            yield self.step.render(batch_start, batch_stop, exit_label)
+
+        if stop > start:
+            yield self.last.render(stop - 1, stop, exit_label)
+
+    def final_footer(self, last: int) -> str:
+        """
+        Footer referring to the carried value defined by the iteration with the given number
+        """
+        if self.carry is None:
+            return self.footer
+        return self.footer.replace(LAST, f"%{self.carry.name}{last}")
+
+    def transformed(self, transform: Callable[[str], str]) -> "Kernel":
+        """
+        Copy of the kernel with the given transformation applied to all of its text
+        """
+        return Kernel(
+            globals=transform(self.globals),
+            step=transform(self.step.text),
+            footer=transform(self.footer),
+            pretext=transform(self.pretext),
+            body_start=transform(self.body_start),
+            last=transform(self.last.text),
+            terminated=self.terminated,
+            carry=Carry(self.carry.type, self.carry.name, transform(self.carry.initial)) if self.carry else None)
+
+    def without_allocas(self) -> Tuple[Optional[IterationTemplate], "Kernel"]:
+        """
+        Template of the allocas of a single iteration and a copy of the kernel without them. Returns None and the
+        kernel itself if the iterations allocate nothing
+        """
+        allocas = "".join(_ALLOCA.findall(self.step.text))
+        if not allocas:
+            return None, self
+
+        kernel = Kernel(globals=self.globals, step=_ALLOCA.sub("", self.step.text), footer=self.footer,
+                        pretext=self.pretext, body_start=self.body_start, last=_ALLOCA.sub("", self.last.text),
+                        terminated=self.terminated, carry=self.carry)
+        return IterationTemplate(allocas), kernel
+
+    def prefixed(self, prefix: str) -> "Kernel":
+        """
+        Copy of the kernel with the given prefix in front of every global variable and function it defines, so
+        several kernels can share a module. Declarations of external functions keep their name
+        """
+        names = [variable or function for variable, function in _DEFINITION.findall(self.globals)]
+        if not names:
+            return self
+
+        symbol = re.compile("@(" + "|".join(map(re.escape, names)) + r")(?![-\w.$])")
+        return self.transformed(lambda text: symbol.sub(lambda match: f"@{prefix}{match.group(1)}", text))
+
+
+class KernelEmitter:
+    """
+    Write kernels to disk using a large buffer and batched writes
+    """
+    batch_size: int
+    buffer_size: int
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.batch_size = batch_size
+        self.buffer_size = buffer_size
+
+    def render(self, kernel: Kernel, repetitions: int, function: str = "main") -> Iterator[str]:
+        """
+        Render the fully unrolled kernel executing the instruction repetitions + 1 times
+        """
+        yield kernel.globals
+        yield f'define i32 @{function}() #0 {{\n'
+        yield 'entry:\n'
+        yield kernel.pretext
+
+        # The carried value needs its own block to start from the initial value
+        if kernel.carry is not None:
+            carry = kernel.carry
+            yield '  br label %body\n\n'
+            yield 'body:\n'
+            yield f'  %{carry.name}0 = phi {carry.type} [ {carry.initial}, %entry ]\n'
+
+        yield kernel.body_start
+        yield from kernel.iterations(0, repetitions + 1, "end", self.batch_size)
+
+        if kernel.terminated:
+            yield 'end:\n'
+
+        yield kernel.final_footer(repetitions + 1)
+        yield '  ret i32 0\n'
+        yield '}\n'
+
+    def render_loop(self, kernel: Kernel, unroll: int, trips: int, function: str = "main") -> Iterator[str]:
+        """
+        Render the kernel as a counted loop. The loop body contains unroll iterations of the instruction and is
+        executed trips times, so the size of the kernel does not depend on the amount of executions.
+
+        Allocas inside the loop would grow the stack on every trip. They are placed in the entry block instead,
+        where they are static allocations like in the unrolled kernels, and the loop body only uses them
+        """
+        allocas, kernel = kernel.without_allocas()
+
+        yield kernel.globals
+        yield f'define i32 @{function}() #0 {{\n'
+        yield 'entry:\n'
+        yield kernel.pretext
+        if allocas is not None:
+            yield allocas.render(0, unroll, "latch")
+        yield '  br label %loop\n\n'
+        yield 'loop:\n'
+        yield '  %loop.iter = phi i64 [ 0, %entry ], [ %loop.next, %latch ]\n'
+
+        if kernel.carry is not None:
+            carry = kernel.carry
+            yield (f'  %{carry.name}0 = phi {carry.type} '
+                   f'[ {carry.initial}, %entry ], [ %{carry.name}{unroll}, %latch ]\n')
+        yield kernel.body_start
+        yield from kernel.iterations(0, unroll, "latch", self.batch_size)
+
+        if not kernel.terminated:
+            yield '  br label %latch\n\n'
+
+        yield 'latch:\n'
+        yield '  %loop.next = add i64 %loop.iter, 1\n'
+        yield f'  %loop.cond = icmp ult i64 %loop.next, {trips}\n'
+        yield '  br i1 %loop.cond, label %loop, label %exit\n\n'
+        yield 'exit:\n'
+        yield kernel.final_footer(unroll)
+        yield '  ret i32 0\n'
+        yield '}\n'
+
+    def render_library(self, kernels: List[Tuple[str, str, Kernel]],
+                       render: Callable[[Kernel, str], Iterator[str]]) -> Iterator[str]:
+        """
+        Render several kernels into a single module. The kernels are given as tuples of kernel name, function name
+        and kernel, their symbols must not collide. Each kernel is rendered into its own function by the given
+        render function. Declarations of external functions shared by several kernels are only emitted once
+        """
+        declarations = []
+        for _, _, kernel in kernels:
+            declarations += [line for line in _DECLARATION.findall(kernel.globals) if line not in declarations]
+
+        for line in declarations:
+            yield line if line.endswith("\n") else line + "\n"
+        yield '\n'
+
+        for _, function, kernel in kernels:
+            yield from render(kernel.transformed(lambda text: _DECLARATION.sub("", text)), function)
+            yield '\n'
+
+    def render_bundle(self, kernels: List[Tuple[str, str, Kernel]],
+                      render: Callable[[Kernel, str], Iterator[str]]) -> Iterator[str]:
+        """
+        Render several kernels into a single program like render_library. main runs the kernel whose name is
+        passed as first argument and returns 1 for unknown names
+        """
+        yield from self.render_library(kernels, render)
+
+        yield 'declare i32 @strcmp(i8*, i8*)\n\n'
+
+        for index, (name, _, _) in enumerate(kernels):
+            encoded = name.encode() + b"\0"
+            text = "".join(chr(c) if 32 <= c < 127 and c not in b'"\\' else f"\\{c:02X}" for c in encoded)
+            yield f'@kernel.name.{index} = private unnamed_addr constant [{len(encoded)} x i8] c"{text}"\n'
+        yield '\n'
+
+        yield 'define i32 @main(i32 %argc, i8** %argv) {\n'
+        yield 'entry:\n'
+        yield '  %has.name = icmp sge i32 %argc, 2\n'
+        yield '  br i1 %has.name, label %select, label %unknown\n\n'
+        yield 'select:\n'
+        yield '  %name.ptr = getelementptr i8*, i8** %argv, i64 1\n'
+        yield '  %name = load i8*, i8** %name.ptr\n'
+        yield '  br label %check0\n\n'
+
+        for index, (name, function, _) in enumerate(kernels):
+            size = len(name.encode()) + 1
+            yield f'check{index}:\n'
+            yield (f'  %cmp{index} = call i32 @strcmp(i8* %name, i8* getelementptr inbounds '
+                   f'([{size} x i8], [{size} x i8]* @kernel.name.{index}, i64 0, i64 0))\n')
+            yield f'  %match{index} = icmp eq i32 %cmp{index}, 0\n'
+            yield f'  br i1 %match{index}, label %run{index}, label %check{index + 1}\n\n'
+            yield f'run{index}:\n'
+            yield f'  %result{index} = call i32 @{function}()\n'
+            yield f'  ret i32 %result{index}\n\n'
+
+        yield f'check{len(kernels)}:\n'
+        yield '  br label %unknown\n\n'
+        yield 'unknown:\n'
+        yield '  ret i32 1\n'
+        yield '}\n'
+
+    @staticmethod
+    def measure(chunks: Iterator[str]) -> Tuple[int, int]:
+        """
+        Count the lines and bytes of the given chunks without keeping them in memory
+        """
+        lines = 0
+        size = 0
+
+        for chunk in chunks:
+            lines += chunk.count("\n")
+            size += len(chunk) if chunk.isascii() else len(chunk.encode())
+
+        return lines, size
+
+    def write(self, filename, chunks: Iterator[str]):
+        """
+        Write the given chunks to the given file. The chunks are written to a temporary file next to the target,
+        which replaces the target once it is complete. Readers therefore never observe a partially written kernel
+        """
+        path = os.fspath(filename)
+        directory = os.path.dirname(path) or "."
+
+        # Unlike mkstemp, creating the file with mode 0666 lets the kernel apply the umask, so the finished kernel
+        # gets the permissions of a regular file without reading the process wide umask
+        while True:
+            tmppath = os.path.join(directory, f".{os.path.basename(path)}.{secrets.token_hex(4)}.tmp")
+            try:
+                fd = os.open(tmppath, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+                break
+            except FileExistsError:
+                continue
+
+        try:
+            with open(fd, "w", buffering=self.buffer_size) as f:
+                f.writelines(chunks)
+            os.replace(tmppath, path)
+        except BaseException:
+            os.unlink(tmppath)
+            raise
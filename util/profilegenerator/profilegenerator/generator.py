@@ -1,176 +1,529 @@
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
 from .instruction import Instruction
+from .emitter import Kernel, KernelEmitter, ITER, template
+from .memory import build_memory_kernel, memory_baselines
+from .vector import build_vector_kernel
 from pathlib import Path
 from .util import Util
+import hashlib
 import json
+import math
+import re
+
+# Kernel modes supported by the generator
+UNROLLED = "unrolled"
+LOOP = "loop"
+KERNEL_MODES = (UNROLLED, LOOP)
+
+# Default amount of instruction copies inside the loop body of loop kernels
+DEFAULT_UNROLL = 100
+
+# Name of the empty loop kernel used to subtract the loop overhead
+LOOP_BASELINE = "_loopbaseline"
+
+# Output layouts: one program per kernel, all kernels in a single program selecting the kernel by its argument or
+# all kernels exported from a shared library
+FILES = "files"
+BUNDLE = "bundle"
+LIBRARY = "library"
+LAYOUTS = (FILES, BUNDLE, LIBRARY)
+
+# Name of the program containing all kernels in the bundle layout
+BUNDLE_NAME = "_bundle"
+
+# Name of the shared library containing all kernels in the library layout. The lib prefix makes the build script
+# link it as shared library
+LIBRARY_NAME = "lib_kernels"
+
+# Part of every kernel hash. Increase it whenever the emitted IR changes for unchanged instructions
+GENERATOR_VERSION = 6
+
+
+class GenerationResult:
+    """
+    Outcome of the generation of a single instruction kernel
+    """
+    opcode: str
+    filename: Path
+    error: Optional[str]
+    skipped: bool
+
+    def __init__(self, opcode: str, filename: Path, error: Optional[str] = None, skipped: bool = False):
+        self.opcode = opcode
+        self.filename = filename
+        self.error = error
+        self.skipped = skipped
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class KernelEstimate:
+    """
+    Size of a kernel as it would be generated
+    """
+    opcode: str
+    filename: Path
+    lines: int
+    size: int
+    error: Optional[str]
+
+    def __init__(self, opcode: str, filename: Path, lines: int = 0, size: int = 0, error: Optional[str] = None):
+        self.opcode = opcode
+        self.filename = filename
+        self.lines = lines
+        self.size = size
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
 
 class Generator:
     instlist: List[Instruction]
     baseloc: str
     repetitions: int
+    mode: str
+    unroll: int
+    layout: str
+    force: bool
+    emitter: KernelEmitter
+    manifest: Dict[str, str]
+    removed: List[Path]
+
+    def __init__(self, instlist, baseloc, reps, mode: str = UNROLLED, unroll: int = DEFAULT_UNROLL,
+                 force: bool = False, layout: str = FILES):
+        if mode not in KERNEL_MODES:
+            raise ValueError(f"Unknown kernel mode {mode}")
+
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown output layout {layout}")
+
+        # Kernels reference the second instruction result after the body, so we need at least two copies
+        if mode == LOOP and unroll < 2:
+            raise ValueError("The unroll factor of loop kernels must be at least 2")
 
-    def __init__(self, instlist, baseloc, reps):
         self.instlist = instlist
         self.baseloc = baseloc
         self.repetitions = reps
+        self.mode = mode
+        self.unroll = unroll
+        self.layout = layout
+        self.force = force
+        self.emitter = KernelEmitter()
+        self.manifest = {}
+        self.removed = []
+
+    @property
+    def trip_count(self) -> int:
+        """
+        Amount of loop iterations needed to execute the instruction at least repetitions + 1 times
+        """
+        return math.ceil((self.repetitions + 1) / self.unroll)
+
+    @property
+    def executions(self) -> int:
+        """
+        Amount of instruction executions per kernel run. Unrolled kernels execute repetitions + 1 copies, but
+        the metadata has always reported the repetitions, so we keep it that way
+        """
+        if self.mode == LOOP:
+            return self.trip_count * self.unroll
+        return self.repetitions
+
+    def kernels(self) -> List[Instruction]:
+        """
+        Instructions to generate kernels for, including the baseline kernel of the loop mode
+        """
+        if self.mode == LOOP:
+            return self.instlist + [Instruction(LOOP_BASELINE, "", [])]
+        return list(self.instlist)
+
+    def kernel_hash(self, inst: Instruction) -> str:
+        """
+        Hash of everything the kernel of the given instruction is generated from
+        """
+        description = {
+            "instruction": inst.to_dict(),
+            "repetitions": self.repetitions,
+            "mode": self.mode,
+            "unroll": self.unroll if self.mode == LOOP else None,
+            "layout": self.layout,
+            "version": GENERATOR_VERSION,
+        }
+
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def read_meta(self) -> dict:
+        """
+        Read the meta file of the previous generation. Returns an empty dict if there is none
+        """
+        filename = Path(self.baseloc) / "meta.json"
 
-    def generate(self):
-        for inst in self.instlist:
+        try:
+            with open(filename, "r") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        return meta if isinstance(meta, dict) else {}
+
+    def invalidate(self, opcodes: List[str]):
+        """
+        Clear the manifest entries of the given kernels before they are rewritten. A run interrupted while writing
+        them leaves kernels that do not match their entries anymore, so the next run regenerates them instead of
+        skipping them. The entries keep their names, so the stale kernels are still found for removal
+        """
+        meta = self.read_meta()
+        manifest = meta.get("manifest")
+        if not isinstance(manifest, dict) or not any(opcode in manifest for opcode in opcodes):
+            return
+
+        meta["manifest"] = {opcode: None if opcode in opcodes else digest for opcode, digest in manifest.items()}
+        self.write_meta(meta)
+
+    def write_meta(self, meta: dict):
+        """
+        Replace the meta file atomically, so it always describes complete kernels
+        """
+        self.emitter.write(Path(self.baseloc) / "meta.json", [json.dumps(meta)])
+
+    def remove_stale(self, meta: dict, current: Dict[str, str]) -> List[Path]:
+        """
+        Delete the kernels and compiled binaries that are not part of the current generation. These are the kernels
+        of instructions removed from the instruction list and all outputs of a previously used layout
+        """
+        previous = meta.get("manifest", {})
+        previous = previous if isinstance(previous, dict) else {}
+
+        layout = meta.get("layout", FILES)
+
+        if layout == FILES:
+            names = previous.keys() - current.keys() if self.layout == FILES else previous.keys()
+        elif layout != self.layout:
+            names = [meta.get(layout, self.module_name(layout))]
+        else:
+            names = []
+
+        removed = []
+
+        for name in names:
+            for stale in [Path(self.baseloc) / f"{name}.ll", Path(self.baseloc) / "compiled" / name,
+                          Path(self.baseloc) / "compiled" / f"{name}.so"]:
+                if stale.is_file():
+                    stale.unlink()
+                    removed.append(stale)
+
+        return removed
+
+    def generate(self, jobs: int = 1) -> List[GenerationResult]:
+        """
+        Generate the kernels of all instructions. The results are returned in the order of the instruction list.
+
+        Kernels whose hash matches the manifest of the previous generation are skipped, unless the generator
+        is forced to regenerate everything
+        """
+        kernels = self.kernels()
+        meta = self.read_meta()
+        previous = meta.get("manifest", {})
+        previous = previous if isinstance(previous, dict) else {}
+        hashes = {inst.get_opcode(): self.kernel_hash(inst) for inst in kernels}
+
+        if self.layout in (BUNDLE, LIBRARY):
+            results = self.generate_module(kernels, previous, hashes)
+        else:
+            results = self.generate_files(kernels, previous, hashes, jobs)
+
+        # Failed kernels are left out of the manifest, so the next run retries them
+        self.manifest = {result.opcode: hashes[result.opcode] for result in results if result.ok}
+        self.removed = self.remove_stale(meta, hashes)
+
+        return results
+
+    def generate_files(self, kernels: List[Instruction], previous: Dict[str, str], hashes: Dict[str, str],
+                       jobs: int) -> List[GenerationResult]:
+        """
+        Generate one program per kernel. With more than one job the instructions are spread over a process pool
+        """
+        def unchanged(inst: Instruction) -> bool:
             opcode = inst.get_opcode()
-            ty = inst.get_type()
-            args = inst.get_args()
-            tdefault = Util.get_type_default(ty)
-
-            filename = Path(self.baseloc) / f"{opcode}.ll"
-
-            # Handle special instructions
-            if opcode == "br":
-                with open(filename, "w") as f:
-                    f.write(f'@global = global i32 0\n\n')
-                    f.write('define i32 @main() #0 {\n')
-                    f.write('entry:\n')
-                    f.write('  br label %block0\n\n')
-
-                    # Generate unrolled blocks
-                    for i in range(0, self.repetitions + 1):
-                        f.write(f'block{i}:\n')
-                        f.write(f'  %v{i} = and i32 42, 311\n')
-                        f.write(f'  br i1 true, label %then{i}, label %else{i}\n\n')
-
-                        f.write(f'then{i}:\n')
-                        f.write(f'  store volatile i32 %v{i}, i32* @global\n')
-                        # jump to next block or exit
-                        if i < self.repetitions:
-                            f.write(f'  br label %block{i+1}\n\n')
-                        else:
-                            f.write(f'  br label %end\n\n')
-
-                        f.write(f'else{i}:\n')
-                        f.write(f'  store volatile i32 %v{i}, i32* @global\n')
-                        if i < self.repetitions:
-                            f.write(f'  br label %block{i+1}\n\n')
-                        else:
-                            f.write(f'  br label %end\n\n')
-
-                    f.write('end:\n')
-                    f.write('  ret i32 0\n')
-                    f.write('}\n')
-
-                continue # Skip the rest of the loop for this instruction since we already handled it
-
-            if opcode == "switch":
-                with open(filename, "w") as f:
-                    f.write('@global = global i32 0\n\n')
-                    f.write('define i32 @main() #0 {\n')
-                    f.write('entry:\n')
-                    f.write('  br label %block0\n\n')
-
-                    for i in range(0, self.repetitions + 1):
-                        f.write(f'block{i}:\n')
-                        f.write(f'  %v{i} = and i32 42, 3\n')
-                        f.write(f'  switch i32 %v{i}, label %default{i} [\n')
-                        f.write(f'    i32 0, label %case0_{i}\n')
-                        f.write(f'    i32 1, label %case1_{i}\n')
-                        f.write(f'    i32 2, label %case2_{i}\n')
-                        f.write('  ]\n\n')
-
-                        for case in range(3):
-                            f.write(f'case{case}_{i}:\n')
-                            f.write(f'  store volatile i32 %v{i}, i32* @global\n')
-                            if i < self.repetitions:
-                                f.write(f'  br label %block{i+1}\n\n')
-                            else:
-                                f.write('  br label %end\n\n')
-
-                        f.write(f'default{i}:\n')
-                        f.write(f'  store volatile i32 %v{i}, i32* @global\n')
-                        if i < self.repetitions:
-                            f.write(f'  br label %block{i+1}\n\n')
-                        else:
-                            f.write('  br label %end\n\n')
-
-                    f.write('end:\n')
-                    f.write('  ret i32 0\n')
-                    f.write('}\n')
-
-                continue # Skip the rest of the loop for this instruction since we already handled it
-
-            if opcode == "frem":
-                with open(filename, "w") as f:
-                    # Two globals used for volatile loads
-                    f.write(f'@c42 = global {ty} {args.split(",")[0]}\n')
-                    f.write(f'@c3  = global {ty} {args.split(",")[1]}\n')
-
-                    f.write('define i32 @main() #0 {\n')
-                    f.write('entry:\n')
-
-                    for i in range(0, self.repetitions + 1):
-                        f.write(f'  %x{i} = load volatile {ty}, {ty}* @c42\n')
-                        f.write(f'  %y{i} = load volatile {ty}, {ty}* @c3\n')
-                        f.write(f'  %r{i} = frem {ty} %x{i}, %y{i}\n')
-                        f.write(f'  call void asm sideeffect "", "x"({ty} %r{i})\n\n')
-
-                    f.write(f'  store volatile {ty} %r0, {ty}* @c42\n')
-                    f.write('  ret i32 0\n')
-                    f.write('}\n')
-
-                continue # Skip the rest of the loop for this instruction since we already handled it
-
-            # Handle non exceptions and deal with complex and normal instructions
-            if not inst.is_complex:
-                with open(filename, "w") as f:
-                    if inst.sideeffecttype is not None:
-                        f.write(f'@global = global {inst.sideeffecttype} {tdefault}\n')
-                    else:
-                        f.write(f'@global = global {ty} {tdefault}\n')
-
-                    f.write('define i32 @main() #0 {\n')
-                    f.write('entry:\n')
-
-                    for i in range(0, self.repetitions + 1):
-                        f.write(f'  %{i} = {opcode} {ty} {args}\n')
-
-                        if inst.sideeffecttype is not None:
-                            f.write(f'  call void asm sideeffect "", "r"({inst.sideeffecttype} %{i})\n')
-                        else:
-                            f.write(f'  call void asm sideeffect "", "r"({ty} %{i})\n')
-
-                    if inst.sideeffecttype is not None:
-                        f.write(f'  store volatile {inst.sideeffecttype} %1, {inst.sideeffecttype}* @global\n')
-                    else:
-                        f.write(f'  store volatile {ty} %1, {ty}* @global\n')
-
-                    f.write('  ret i32 0\n')
-                    f.write('}\n')
+            return (not self.force and previous.get(opcode) == hashes[opcode]
+                    and (Path(self.baseloc) / f"{opcode}.ll").is_file())
 
+        pending = [inst for inst in kernels if not unchanged(inst)]
+        self.invalidate([inst.get_opcode() for inst in pending])
+
+        if jobs > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                generated = list(pool.map(self.generate_instruction, pending))
+        else:
+            generated = [self.generate_instruction(inst) for inst in pending]
+
+        generated = {result.opcode: result for result in generated}
+        results = []
+
+        for inst in kernels:
+            opcode = inst.get_opcode()
+            if opcode in generated:
+                results.append(generated[opcode])
             else:
-                with open(filename, "w") as f:
-                    f.write(f'{inst.cpx_header_block}\n\n')
-                    f.write('define i32 @main() #0 {\n')
-                    f.write('entry:\n')
-
-                    f.write(inst.cpx_pretext)
-
-                    for i in range(0, self.repetitions + 1):
-                        block = inst.cpx_exec_block
-                        if inst.cpx_use_counter:
-                            if "COUNTER" in block:
-                                block = block.replace("COUNTER", f"%{i}")
-                            f.write(f'  %{i} = {block}\n')
-                        else:
-                            f.write(f'  {block}\n')
-
-                    f.write(f'  {inst.cpx_footer_block}\n')
-                    f.write('  ret i32 0\n')
-                    f.write('}\n')
+                results.append(GenerationResult(opcode, Path(self.baseloc) / f"{opcode}.ll", skipped=True))
+
+        return results
+
+    @staticmethod
+    def module_name(layout: str) -> str:
+        """
+        Name of the module containing all kernels in the given layout
+        """
+        return LIBRARY_NAME if layout == LIBRARY else BUNDLE_NAME
+
+    @staticmethod
+    def kernel_symbols(kernels: List[Instruction]) -> Dict[str, str]:
+        """
+        Unique function name of every kernel inside a module containing all kernels
+        """
+        symbols = {}
+
+        for inst in kernels:
+            # Opcodes like "icmp eq" are no valid symbol names
+            name = re.sub(r"\W", "_", inst.get_opcode())
+            while f"kernel.{name}" in symbols.values():
+                name += "_"
+            symbols[inst.get_opcode()] = f"kernel.{name}"
+
+        return symbols
+
+    def generate_module(self, kernels: List[Instruction], previous: Dict[str, str],
+                        hashes: Dict[str, str]) -> List[GenerationResult]:
+        """
+        Generate a single module containing every kernel as its own function. In the bundle layout the module is
+        a program selecting the kernel by its argument, in the library layout the functions are exported from a
+        shared library. The module is only regenerated as a whole, so it is skipped if no kernel changed
+        """
+        filename = Path(self.baseloc) / f"{self.module_name(self.layout)}.ll"
+
+        if not self.force and previous == hashes and filename.is_file():
+            return [GenerationResult(inst.get_opcode(), filename, skipped=True) for inst in kernels]
+
+        results = {}
+        bundled = []
+        symbols = self.kernel_symbols(kernels)
+
+        for inst in kernels:
+            opcode = inst.get_opcode()
+            function = symbols[opcode]
+
+            try:
+                kernel = self.build_kernel(inst).prefixed(f"{function.removeprefix('kernel.')}.")
+            except Exception as e:
+                results[opcode] = GenerationResult(opcode, filename, f"{type(e).__name__}: {e}")
+                continue
+
+            bundled.append((opcode, function, kernel))
+
+        self.invalidate([inst.get_opcode() for inst in kernels])
+
+        if self.layout == LIBRARY:
+            chunks = self.emitter.render_library(bundled, self.render)
+        else:
+            chunks = self.emitter.render_bundle(bundled, self.render)
+
+        try:
+            self.emitter.write(filename, chunks)
+        except Exception as e:
+            for opcode, _, _ in bundled:
+                results[opcode] = GenerationResult(opcode, filename, f"{type(e).__name__}: {e}")
+
+        return [results.get(inst.get_opcode(), GenerationResult(inst.get_opcode(), filename)) for inst in kernels]
+
+    def estimate(self) -> List[KernelEstimate]:
+        """
+        Measure the kernels of all instructions without writing anything. In the bundle and library layouts each
+        kernel is measured as the function it becomes inside the module
+        """
+        kernels = self.kernels()
+        estimates = []
+
+        if self.layout in (BUNDLE, LIBRARY):
+            filename = Path(self.baseloc) / f"{self.module_name(self.layout)}.ll"
+            functions = self.kernel_symbols(kernels)
+        else:
+            filename = None
+            functions = {}
+
+        for inst in kernels:
+            opcode = inst.get_opcode()
+            target = filename if filename is not None else Path(self.baseloc) / f"{opcode}.ll"
+
+            try:
+                chunks = self.render(self.build_kernel(inst), functions.get(opcode, "main"))
+                lines, size = self.emitter.measure(chunks)
+            except Exception as e:
+                estimates.append(KernelEstimate(opcode, target, error=f"{type(e).__name__}: {e}"))
+                continue
+
+            estimates.append(KernelEstimate(opcode, target, lines, size))
+
+        return estimates
+
+    def generate_instruction(self, inst: Instruction) -> GenerationResult:
+        """
+        Generate the kernel of a single instruction. Failures are reported in the result instead of aborting the
+        generation of the remaining instructions
+        """
+        filename = Path(self.baseloc) / f"{inst.get_opcode()}.ll"
+
+        try:
+            self.emitter.write(filename, self.render(self.build_kernel(inst)))
+        except Exception as e:
+            return GenerationResult(inst.get_opcode(), filename, f"{type(e).__name__}: {e}")
+
+        return GenerationResult(inst.get_opcode(), filename)
+
+    def render(self, kernel: Kernel, function: str = "main"):
+        """
+        Render the given kernel in the configured mode
+        """
+        if self.mode == LOOP:
+            return self.emitter.render_loop(kernel, self.unroll, self.trip_count, function)
+        return self.emitter.render(kernel, self.repetitions, function)
+
+    def build_kernel(self, inst: Instruction) -> Kernel:
+        opcode = inst.get_opcode()
+        ty = inst.get_type()
+        args = inst.get_args()
+        tdefault = Util.get_type_default(ty)
+
+        # The loop baseline only consists of the loop itself
+        if opcode == LOOP_BASELINE:
+            return Kernel(globals='', step='')
+
+        if inst.memory_access is not None:
+            return build_memory_kernel(inst)
+
+        if inst.vector_opcode is not None:
+            return build_vector_kernel(inst)
+
+        # Handle special instructions
+        if opcode == "br":
+            def branch_block(target):
+                return template(
+                    'block{i}:\n'
+                    '  %v{i} = and i32 42, 311\n'
+                    '  br i1 true, label %then{i}, label %else{i}\n\n'
+                    'then{i}:\n'
+                    '  store volatile i32 %v{i}, i32* @global\n'
+                    f'  br label {target}\n\n'
+                    'else{i}:\n'
+                    '  store volatile i32 %v{i}, i32* @global\n'
+                    f'  br label {target}\n\n')
+
+            return Kernel(
+                globals='@global = global i32 0\n\n',
+                body_start='  br label %block0\n\n',
+                step=branch_block('%block{next}'),
+                last=branch_block('%{exit}'),
+                terminated=True)
+
+        if opcode == "switch":
+            def switch_block(target):
+                text = ('block{i}:\n'
+                        '  %v{i} = and i32 42, 3\n'
+                        '  switch i32 %v{i}, label %default{i} [\n'
+                        '    i32 0, label %case0_{i}\n'
+                        '    i32 1, label %case1_{i}\n'
+                        '    i32 2, label %case2_{i}\n'
+                        '  ]\n\n')
+
+                for case in range(3):
+                    text += (f'case{case}_{{i}}:\n'
+                             '  store volatile i32 %v{i}, i32* @global\n'
+                             f'  br label {target}\n\n')
+
+                text += ('default{i}:\n'
+                         '  store volatile i32 %v{i}, i32* @global\n'
+                         f'  br label {target}\n\n')
+                return template(text)
+
+            return Kernel(
+                globals='@global = global i32 0\n\n',
+                body_start='  br label %block0\n\n',
+                step=switch_block('%block{next}'),
+                last=switch_block('%{exit}'),
+                terminated=True)
+
+        if opcode == "frem":
+            # Two globals used for volatile loads
+            return Kernel(
+                globals=f'@c42 = global {ty} {args.split(",")[0]}\n'
+                        f'@c3  = global {ty} {args.split(",")[1]}\n',
+                step=template(f'  %x{{i}} = load volatile {ty}, {ty}* @c42\n'
+                              f'  %y{{i}} = load volatile {ty}, {ty}* @c3\n'
+                              f'  %r{{i}} = frem {ty} %x{{i}}, %y{{i}}\n'
+                              f'  call void asm sideeffect "", "x"({ty} %r{{i}})\n\n'),
+                footer=f'  store volatile {ty} %r0, {ty}* @c42\n')
+
+        # Handle non exceptions and deal with complex and normal instructions
+        if not inst.is_complex:
+            if inst.sideeffecttype is not None:
+                sideeffecttype = inst.sideeffecttype
+            else:
+                sideeffecttype = ty
+
+            return Kernel(
+                globals=f'@global = global {sideeffecttype} {tdefault}\n',
+                step=template(f'  %{{i}} = {opcode} {ty} {args}\n'
+                              f'  call void asm sideeffect "", "{Util.get_constraint(sideeffecttype)}"({sideeffecttype} %{{i}})\n'),
+                footer=f'  store volatile {sideeffecttype} %1, {sideeffecttype}* @global\n')
+
+        block = inst.cpx_exec_block
+        if inst.cpx_use_counter:
+            step = f'  %{ITER} = ' + block.replace("COUNTER", f"%{ITER}") + '\n'
+        else:
+            step = f'  {block}\n'
+
+        return Kernel(
+            globals=f'{inst.cpx_header_block}\n\n',
+            pretext=inst.cpx_pretext,
+            step=step,
+            footer=f'  {inst.cpx_footer_block}\n')
 
     def create_meta_file(self):
         meta = {
-            "repeated_executions": self.repetitions
+            "repeated_executions": self.executions
         }
 
-        json_meta = json.dumps(meta)
-        filename = Path(self.baseloc) / "meta.json"
+        if self.mode == LOOP:
+            meta["kernel_mode"] = self.mode
+            meta["unroll_factor"] = self.unroll
+            meta["trip_count"] = self.trip_count
+            meta["loop_baseline"] = LOOP_BASELINE
+
+        if self.layout == BUNDLE:
+            symbols = self.kernel_symbols(self.kernels())
+
+            meta["layout"] = self.layout
+            meta["bundle"] = BUNDLE_NAME
+            meta["kernels"] = list(self.manifest)
+            meta["symbols"] = {opcode: symbols[opcode] for opcode in self.manifest}
+
+        if self.layout == LIBRARY:
+            symbols = self.kernel_symbols(self.kernels())
+
+            meta["layout"] = self.layout
+            meta["library"] = LIBRARY_NAME
+            meta["kernels"] = list(self.manifest)
+            meta["symbols"] = {opcode: symbols[opcode] for opcode in self.manifest}
+
+        # The profiler subtracts the initialization of the buffers from the memory kernels
+        baselines = memory_baselines(self.instlist)
+        if baselines:
+            meta["memory_baselines"] = baselines
+
+        meta["manifest"] = self.manifest
 
-        with open(filename, "w") as f:
-            json.dump(meta, f)
\ No newline at end of file
+        self.write_meta(meta)
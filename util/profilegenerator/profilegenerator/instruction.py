@@ -13,6 +13,12 @@ class Instruction:
     cpx_pretext: str
     cpx_footer_block: str
     cpx_use_counter: bool
+    memory_access: str = None
+    memory_pattern: str
+    memory_working_set: int
+    memory_line_size: int
+    vector_opcode: str = None
+    vector_type: str
 
     def __init__(self, opcode: str, type: str, args: List[str], sideeffecttype: str = None):
         self.opcode = opcode
@@ -36,6 +42,53 @@ class Instruction:
         return inst
 
 
+    @classmethod
+    def memory_instruction(cls, opcode: str, access: str, pattern: str, working_set: int, line_size: int):
+        inst = cls(opcode, "", [])
+        inst.memory_access = access
+        inst.memory_pattern = pattern
+        inst.memory_working_set = working_set
+        inst.memory_line_size = line_size
+        return inst
+
+    @classmethod
+    def vector_instruction(cls, name: str, opcode: str, type: str):
+        inst = cls(name, type, [])
+        inst.vector_opcode = opcode
+        inst.vector_type = type
+        return inst
+
+    def to_dict(self):
+        """
+        Describe everything about the instruction that influences its generated kernel
+        """
+        description = {
+            "opcode": self.opcode,
+            "type": self.type,
+            "args": list(self.args),
+            "sideeffecttype": self.sideeffecttype,
+            "is_complex": self.is_complex,
+        }
+
+        if self.is_complex:
+            description["cpx_exec_block"] = self.cpx_exec_block
+            description["cpx_header_block"] = self.cpx_header_block
+            description["cpx_footer_block"] = self.cpx_footer_block
+            description["cpx_pretext"] = self.cpx_pretext
+            description["cpx_use_counter"] = self.cpx_use_counter
+
+        if self.memory_access is not None:
+            description["memory_access"] = self.memory_access
+            description["memory_pattern"] = self.memory_pattern
+            description["memory_working_set"] = self.memory_working_set
+            description["memory_line_size"] = self.memory_line_size
+
+        if self.vector_opcode is not None:
+            description["vector_opcode"] = self.vector_opcode
+            description["vector_type"] = self.vector_type
+
+        return description
+
     def get_opcode(self):
         return self.opcode
 
@@ -0,0 +1,245 @@
+"""
+Memory kernels with working sets sized to the levels of the cache hierarchy.
+
+Every buffer comes with a table of the order its lines are visited in. Strided kernels visit the lines in order, which
+the hardware prefetcher can follow. Chasing kernels visit them in a random order, which defeats the prefetcher. The
+order is shuffled with a fixed seed when the buffer is initialized, so it is the same in every run.
+
+Load kernels walk the buffer through a chain of pointers linking every line to the next one of the order, so each
+access depends on the previous one and no address arithmetic is needed. Store kernels read the next line from the
+order table instead. The table is read sequentially, so its reads hit the cache and no store waits for another one.
+
+Every program initializes its buffer before the first access. The initialization touches the whole working set, which
+would dominate the LLC and DRAM kernels, so every buffer comes with a baseline kernel that only initializes it. The
+profiler subtracts the baseline from the kernels using the buffer.
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .emitter import Carry, Kernel, template
+from .instruction import Instruction
+
+LEVELS = ("L1", "L2", "LLC", "DRAM")
+ACCESSES = ("load", "store")
+
+# Access of the baseline kernels, which only initialize their buffer
+INIT = "init"
+PATTERNS = ("stride", "chase")
+
+DEFAULT_LINE_SIZE = 64
+
+# Size of a pointer inside the buffer
+POINTER_SIZE = 8
+
+# Seed of the xorshift generator shuffling the order of chasing kernels
+SEED = 88172645463325252
+
+_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def parse_size(text: str) -> int:
+    """
+    Parse a size like 48K, 2M or 32768 into bytes
+    """
+    text = text.strip().upper().removesuffix("B")
+
+    if text and text[-1] in _UNITS:
+        return int(text[:-1]) * _UNITS[text[-1]]
+    return int(text)
+
+
+class CacheGeometry:
+    """
+    Sizes of the data caches in bytes. Unknown levels are None
+    """
+    l1: Optional[int]
+    l2: Optional[int]
+    llc: Optional[int]
+    line_size: int
+
+    def __init__(self, l1: Optional[int] = None, l2: Optional[int] = None, llc: Optional[int] = None,
+                 line_size: int = DEFAULT_LINE_SIZE):
+        self.l1 = l1
+        self.l2 = l2
+        self.llc = llc
+        self.line_size = line_size
+
+    @classmethod
+    def from_sysfs(cls, cpu: int = 0, root: Path = Path("/sys/devices/system/cpu")) -> "CacheGeometry":
+        """
+        Read the cache geometry of the given CPU from sysfs. Levels that cannot be read stay unknown
+        """
+        caches = {}
+        line_size = DEFAULT_LINE_SIZE
+
+        for index in sorted((root / f"cpu{cpu}" / "cache").glob("index*")):
+            try:
+                level = int((index / "level").read_text())
+                kind = (index / "type").read_text().strip()
+                size = parse_size((index / "size").read_text())
+                line_size = int((index / "coherency_line_size").read_text())
+            except (OSError, ValueError):
+                continue
+
+            if kind != "Instruction":
+                caches[level] = size
+
+        # The last level cache is only reported separately if it is not the L2
+        llc = max(caches) if caches else None
+        return cls(caches.get(1), caches.get(2), caches[llc] if llc is not None and llc > 2 else None, line_size)
+
+    def working_sets(self) -> Dict[str, int]:
+        """
+        Working set in bytes for every level of the hierarchy that is known. Each working set fits well into its level
+        but exceeds the level above, and is rounded down to a power of two lines
+        """
+        sets = {}
+
+        if self.l1:
+            sets["L1"] = self.l1 // 2
+        if self.l2:
+            sets["L2"] = max(self.l2 // 2, 2 * self.l1) if self.l1 else self.l2 // 2
+        if self.llc:
+            sets["LLC"] = max(self.llc // 2, 2 * self.l2) if self.l2 else self.llc // 2
+            sets["DRAM"] = 4 * self.llc
+
+        lines = {level: max(size // self.line_size, 2) for level, size in sets.items()}
+        return {level: (1 << (count.bit_length() - 1)) * self.line_size for level, count in lines.items()}
+
+
+def memory_instructions(geometry: CacheGeometry) -> List[Instruction]:
+    """
+    Memory kernels for every combination of access, pattern and known level, followed by the baseline kernel of
+    every buffer
+    """
+    instructions = []
+
+    for level, working_set in geometry.working_sets().items():
+        for access in ACCESSES:
+            for pattern in PATTERNS:
+                instructions.append(Instruction.memory_instruction(
+                    f"{access}_{pattern}_{level}", access, pattern, working_set, geometry.line_size))
+
+    for level, working_set in geometry.working_sets().items():
+        for pattern in PATTERNS:
+            instructions.append(Instruction.memory_instruction(
+                f"_{INIT}_{pattern}_{level}", INIT, pattern, working_set, geometry.line_size))
+
+    return instructions
+
+
+def memory_baselines(instructions: List[Instruction]) -> Dict[str, str]:
+    """
+    Mapping of every memory kernel to the baseline kernel initializing the same buffer. Kernels without a baseline
+    in the given instructions are left out
+    """
+    def buffer(inst: Instruction):
+        return inst.memory_pattern, inst.memory_working_set, inst.memory_line_size
+
+    baselines = {buffer(inst): inst.get_opcode() for inst in instructions if inst.memory_access == INIT}
+
+    return {inst.get_opcode(): baselines[buffer(inst)] for inst in instructions
+            if inst.memory_access in ACCESSES and buffer(inst) in baselines}
+
+
+def build_memory_kernel(inst: Instruction) -> Kernel:
+    """
+    Build the kernel of a memory instruction. An init function fills the order table and links the lines of the
+    buffer into a single cycle following it. It only runs on the first call of the kernel. Baseline kernels only
+    call the init function
+    """
+    lines = inst.memory_working_set // inst.memory_line_size
+    slots = inst.memory_line_size // POINTER_SIZE
+    buffer = f"[{lines} x [{slots} x i8*]]"
+    order = f"[{lines} x i32]"
+
+    # The order keeps the first line in place and shuffles the others with Fisher-Yates. Linking the lines in this
+    # order yields a uniformly random cycle through all of them, the permutation Sattolo's algorithm produces
+    shuffled = inst.memory_pattern == "chase" and lines > 2
+    shuffle = ('shuffle:\n'
+               f'  %s = phi i64 [ {lines - 1}, %fill ], [ %s.next, %shuffle ]\n'
+               f'  %x = phi i64 [ {SEED}, %fill ], [ %x.3, %shuffle ]\n'
+               '  %x.shl = shl i64 %x, 13\n'
+               '  %x.1 = xor i64 %x, %x.shl\n'
+               '  %x.lshr = lshr i64 %x.1, 7\n'
+               '  %x.2 = xor i64 %x.1, %x.lshr\n'
+               '  %x.shl2 = shl i64 %x.2, 17\n'
+               '  %x.3 = xor i64 %x.2, %x.shl2\n'
+               '  %r = urem i64 %x.3, %s\n'
+               '  %r.pos = add i64 %r, 1\n'
+               f'  %s.slot = getelementptr {order}, {order}* @order, i64 0, i64 %s\n'
+               f'  %r.slot = getelementptr {order}, {order}* @order, i64 0, i64 %r.pos\n'
+               '  %s.line = load i32, i32* %s.slot\n'
+               '  %r.line = load i32, i32* %r.slot\n'
+               '  store i32 %r.line, i32* %s.slot\n'
+               '  store i32 %s.line, i32* %r.slot\n'
+               '  %s.next = sub i64 %s, 1\n'
+               '  %shuffled = icmp eq i64 %s.next, 1\n'
+               '  br i1 %shuffled, label %link, label %shuffle\n\n') if shuffled else ''
+    linked_from = "shuffle" if shuffled else "fill"
+
+    globals = (f'@buffer = global {buffer} zeroinitializer, align {inst.memory_line_size}\n'
+               f'@order = global {order} zeroinitializer\n'
+               '@initialized = global i1 false\n\n'
+               'define void @init_buffer() #0 {\n'
+               'entry:\n'
+               '  %ready = load i1, i1* @initialized\n'
+               '  br i1 %ready, label %done, label %fill\n\n'
+               'fill:\n'
+               '  %f = phi i64 [ 0, %entry ], [ %f.next, %fill ]\n'
+               f'  %f.slot = getelementptr {order}, {order}* @order, i64 0, i64 %f\n'
+               '  %f.line = trunc i64 %f to i32\n'
+               '  store i32 %f.line, i32* %f.slot\n'
+               '  %f.next = add i64 %f, 1\n'
+               f'  %filled = icmp eq i64 %f.next, {lines}\n'
+               f'  br i1 %filled, label %{"shuffle" if shuffled else "link"}, label %fill\n\n'
+               + shuffle +
+               'link:\n'
+               f'  %k = phi i64 [ 0, %{linked_from} ], [ %k.next, %link ]\n'
+               '  %k.next = add i64 %k, 1\n'
+               f'  %k.wrapped = and i64 %k.next, {lines - 1}\n'
+               f'  %cur.index = getelementptr {order}, {order}* @order, i64 0, i64 %k\n'
+               f'  %next.index = getelementptr {order}, {order}* @order, i64 0, i64 %k.wrapped\n'
+               '  %cur.line = load i32, i32* %cur.index\n'
+               '  %next.line = load i32, i32* %next.index\n'
+               '  %cur = zext i32 %cur.line to i64\n'
+               '  %next = zext i32 %next.line to i64\n'
+               f'  %cur.slot = getelementptr {buffer}, {buffer}* @buffer, i64 0, i64 %cur, i64 0\n'
+               f'  %next.slot = getelementptr {buffer}, {buffer}* @buffer, i64 0, i64 %next, i64 0\n'
+               '  %next.ptr = bitcast i8** %next.slot to i8*\n'
+               '  store i8* %next.ptr, i8** %cur.slot\n'
+               f'  %linked = icmp eq i64 %k.next, {lines}\n'
+               '  br i1 %linked, label %finish, label %link\n\n'
+               'finish:\n'
+               '  store i1 true, i1* @initialized\n'
+               '  br label %done\n\n'
+               'done:\n'
+               '  ret void\n'
+               '}\n\n')
+
+    if inst.memory_access == INIT:
+        return Kernel(globals=globals, pretext='  call void @init_buffer()\n', step=template(''))
+
+    if inst.memory_access == "store":
+        # The line is read from the order table, so the stores follow the same cycle as the pointers
+        return Kernel(
+            globals=globals,
+            pretext='  call void @init_buffer()\n',
+            step=template(f'  %a{{i}}.index = getelementptr {order}, {order}* @order, i64 0, i64 %a{{i}}\n'
+                          '  %a{i}.line32 = load i32, i32* %a{i}.index\n'
+                          '  %a{i}.line = zext i32 %a{i}.line32 to i64\n'
+                          f'  %a{{i}}.slot = getelementptr {buffer}, {buffer}* @buffer, i64 0, i64 %a{{i}}.line, '
+                          'i64 1\n'
+                          '  store volatile i8* null, i8** %a{i}.slot\n'
+                          '  %a{i}.pos = add i64 %a{i}, 1\n'
+                          f'  %a{{next}} = and i64 %a{{i}}.pos, {lines - 1}\n'),
+            carry=Carry("i64", "a", "0"))
+
+    return Kernel(
+        globals=globals,
+        pretext=('  call void @init_buffer()\n'
+                 f'  %start = getelementptr {buffer}, {buffer}* @buffer, i64 0, i64 0, i64 0\n'),
+        step=template('  %p{next}.raw = load volatile i8*, i8** %p{i}\n'
+                      '  %p{next} = bitcast i8* %p{next}.raw to i8**\n'),
+        carry=Carry("i8**", "p", "%start"))
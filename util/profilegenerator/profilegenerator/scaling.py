@@ -0,0 +1,224 @@
+"""
+Synthetic programs for measuring how the analysis scales.
+
+A program is described by a shape of five knobs. The program consists of a number of functions whose calls form
+chains of the given call depth. Every function runs a nest of counted loops, and the innermost body computes a chain
+of dependent SSA values from the loop counter and branches on the end of the chain several times in a row. The IR
+follows the layout clang emits at -O0, so the loop bound analysis finds the counters in their allocas.
+"""
+
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+from .emitter import KernelEmitter
+from .generator import GenerationResult, KernelEstimate
+
+# Knobs of a program shape
+FUNCTIONS = "functions"
+CALL_DEPTH = "call_depth"
+LOOP_DEPTH = "loop_depth"
+BRANCH_WIDTH = "branch_width"
+CHAIN_LENGTH = "chain_length"
+KNOBS = (FUNCTIONS, CALL_DEPTH, LOOP_DEPTH, BRANCH_WIDTH, CHAIN_LENGTH)
+
+# Smallest value of every knob
+MINIMUM = {FUNCTIONS: 1, CALL_DEPTH: 1, LOOP_DEPTH: 0, BRANCH_WIDTH: 0, CHAIN_LENGTH: 0}
+
+# Iterations of every loop
+DEFAULT_TRIP_COUNT = 8
+
+# Operations of the SSA chain, applied in turn
+CHAIN_OPERATIONS = ("add", "xor", "mul")
+
+
+class ScalingShape:
+    """
+    Knobs of a synthetic program
+
+    functions:    Amount of functions besides main
+    call_depth:   Length of the call chains. Main calls the first function of every chain, each function calls the
+                  next one of its chain
+    loop_depth:   Nesting depth of the loops in every function
+    branch_width: Conditional branches in a row inside the innermost loop
+    chain_length: Dependent instructions between the loop counter and the branch conditions
+    """
+    functions: int
+    call_depth: int
+    loop_depth: int
+    branch_width: int
+    chain_length: int
+
+    def __init__(self, functions: int = 1, call_depth: int = 1, loop_depth: int = 1, branch_width: int = 1,
+                 chain_length: int = 1):
+        self.functions = functions
+        self.call_depth = call_depth
+        self.loop_depth = loop_depth
+        self.branch_width = branch_width
+        self.chain_length = chain_length
+
+        for knob, value in self.to_dict().items():
+            if value < MINIMUM[knob]:
+                raise ValueError(f"{knob} must be at least {MINIMUM[knob]}")
+
+    def with_knob(self, knob: str, value: int) -> "ScalingShape":
+        """
+        Copy of the shape with a single knob changed
+        """
+        if knob not in KNOBS:
+            raise ValueError(f"Unknown knob {knob}")
+
+        values = self.to_dict()
+        values[knob] = value
+        return ScalingShape(**values)
+
+    @property
+    def name(self) -> str:
+        return (f"scale_f{self.functions}_d{self.call_depth}_l{self.loop_depth}_w{self.branch_width}"
+                f"_c{self.chain_length}")
+
+    def to_dict(self) -> Dict[str, int]:
+        return {knob: getattr(self, knob) for knob in KNOBS}
+
+
+def geometric_sweep(start: int, factor: float, steps: int) -> List[int]:
+    """
+    Knob values growing geometrically from start. Rounding may map neighbouring steps to the same value, these are
+    only kept once
+    """
+    if start < 1 or factor <= 1 or steps < 1:
+        raise ValueError("A sweep needs a start of at least 1, a factor greater than 1 and at least one step")
+
+    values = []
+    for step in range(steps):
+        value = round(start * factor ** step)
+        if value not in values:
+            values.append(value)
+
+    return values
+
+
+class ScalingGenerator:
+    baseloc: str
+    trip_count: int
+    emitter: KernelEmitter
+
+    def __init__(self, baseloc, trip_count: int = DEFAULT_TRIP_COUNT):
+        if trip_count < 1:
+            raise ValueError("The trip count must be at least 1")
+
+        self.baseloc = baseloc
+        self.trip_count = trip_count
+        self.emitter = KernelEmitter()
+
+    def filename(self, shape: ScalingShape) -> Path:
+        return Path(self.baseloc) / f"{shape.name}.ll"
+
+    def generate(self, shapes: List[ScalingShape]) -> List[GenerationResult]:
+        """
+        Generate the program of every shape. Failures are reported in the results, the results are returned in the
+        order of the shapes
+        """
+        results = []
+
+        for shape in shapes:
+            filename = self.filename(shape)
+
+            try:
+                self.emitter.write(filename, self.render(shape))
+            except Exception as e:
+                results.append(GenerationResult(shape.name, filename, f"{type(e).__name__}: {e}"))
+                continue
+
+            results.append(GenerationResult(shape.name, filename))
+
+        return results
+
+    def estimate(self, shape: ScalingShape) -> KernelEstimate:
+        """
+        Lines and bytes of the program of the given shape without writing it
+        """
+        lines, size = self.emitter.measure(self.render(shape))
+        return KernelEstimate(shape.name, self.filename(shape), lines, size)
+
+    @staticmethod
+    def chains(shape: ScalingShape) -> List[Tuple[int, ...]]:
+        """
+        Indices of the functions forming each call chain
+        """
+        return [tuple(range(first, min(first + shape.call_depth, shape.functions)))
+                for first in range(0, shape.functions, shape.call_depth)]
+
+    def render(self, shape: ScalingShape) -> Iterator[str]:
+        """
+        Render the whole program of the given shape
+        """
+        yield '@sink = global i32 0\n\n'
+
+        for chain in self.chains(shape):
+            for position, function in enumerate(chain):
+                callee = chain[position + 1] if position + 1 < len(chain) else None
+                yield from self.render_function(shape, function, callee)
+
+        yield 'define i32 @main() #0 {\n'
+        yield 'entry:\n'
+        for chain in self.chains(shape):
+            yield f'  %call{chain[0]} = call i32 @function{chain[0]}(i32 {chain[0]})\n'
+        yield '  ret i32 0\n'
+        yield '}\n\n'
+
+        yield 'attributes #0 = { noinline nounwind optnone }\n'
+
+    def render_function(self, shape: ScalingShape, function: int, callee) -> Iterator[str]:
+        """
+        Render a single function, calling the given callee after its loops
+        """
+        depth = shape.loop_depth
+
+        yield f'define i32 @function{function}(i32 %arg) #0 {{\n'
+        yield 'entry:\n'
+        for level in range(depth):
+            yield f'  %counter{level} = alloca i32, align 4\n'
+
+        # Every loop is entered from the body of its parent, the outermost one from the entry block
+        for level in range(depth):
+            yield f'  store i32 0, ptr %counter{level}, align 4\n'
+            yield f'  br label %loop{level}.cond\n\n'
+            yield f'loop{level}.cond:\n'
+            yield f'  %loop{level}.value = load i32, ptr %counter{level}, align 4\n'
+            yield f'  %loop{level}.cmp = icmp slt i32 %loop{level}.value, {self.trip_count}\n'
+            yield f'  br i1 %loop{level}.cmp, label %loop{level}.body, label %loop{level}.end\n\n'
+            yield f'loop{level}.body:\n'
+
+        yield from self.render_body(shape, f'%loop{depth - 1}.value' if depth > 0 else '%arg')
+
+        for level in reversed(range(depth)):
+            yield f'  br label %loop{level}.inc\n\n'
+            yield f'loop{level}.inc:\n'
+            yield f'  %loop{level}.current = load i32, ptr %counter{level}, align 4\n'
+            yield f'  %loop{level}.next = add nsw i32 %loop{level}.current, 1\n'
+            yield f'  store i32 %loop{level}.next, ptr %counter{level}, align 4\n'
+            yield f'  br label %loop{level}.cond\n\n'
+            yield f'loop{level}.end:\n'
+
+        if callee is not None:
+            yield f'  %call = call i32 @function{callee}(i32 %arg)\n'
+        yield '  ret i32 0\n'
+        yield '}\n\n'
+
+    @staticmethod
+    def render_body(shape: ScalingShape, counter: str) -> Iterator[str]:
+        """
+        Render the innermost loop body: the SSA chain starting at the counter followed by the branches on its end
+        """
+        yield f'  %chain0 = add i32 {counter}, 1\n'
+        for link in range(1, shape.chain_length + 1):
+            operation = CHAIN_OPERATIONS[link % len(CHAIN_OPERATIONS)]
+            yield f'  %chain{link} = {operation} i32 %chain{link - 1}, {link + 1}\n'
+
+        value = f'%chain{shape.chain_length}'
+        for branch in range(shape.branch_width):
+            yield f'  %branch{branch}.cmp = icmp eq i32 {value}, {branch}\n'
+            yield f'  br i1 %branch{branch}.cmp, label %branch{branch}.then, label %branch{branch}.join\n\n'
+            yield f'branch{branch}.then:\n'
+            yield f'  store volatile i32 {value}, ptr @sink, align 4\n'
+            yield f'  br label %branch{branch}.join\n\n'
+            yield f'branch{branch}.join:\n'
@@ -20,5 +20,51 @@ class Util:
             return "0"
         elif type == "float":
             return "0.0"
+        elif type == "i64":
+            return "0"
+        elif type == "double":
+            return "0.0"
+        elif Util.is_vector(type):
+            return "zeroinitializer"
         return None
 
+    @staticmethod
+    def is_vector(type: str) -> bool:
+        return type.startswith("<")
+
+    @staticmethod
+    def get_lanes(type: str) -> int:
+        """
+        Number of elements of a vector type like <4 x float>
+        """
+        return int(type.strip("<>").split(" x ")[0])
+
+    @staticmethod
+    def get_element_type(type: str) -> str:
+        """
+        Element type of a vector type like <4 x float>, scalar types are returned unchanged
+        """
+        if Util.is_vector(type):
+            return type.strip("<>").split(" x ")[1]
+        return type
+
+    @staticmethod
+    def mangle(type: str) -> str:
+        """
+        Short name of a type as used by LLVM intrinsics, e.g. v4f32 for <4 x float> or i64 for i64
+        """
+        element = Util.get_element_type(type)
+        element = {"half": "f16", "float": "f32", "double": "f64"}.get(element, element)
+
+        if Util.is_vector(type):
+            return f"v{Util.get_lanes(type)}{element}"
+        return element
+
+    @staticmethod
+    def get_constraint(type: str) -> str:
+        """
+        Inline assembly constraint keeping a value of the given type alive. Vectors are kept in vector registers
+        """
+        if Util.is_vector(type):
+            return "x"
+        return "r"
@@ -0,0 +1,153 @@
+"""
+Kernels for i64, double and vector types.
+
+The kernels are named <instruction>.<type>, using the type names of LLVM intrinsics, e.g. add.i64, fmul.v4f32 or
+reduce.add.v8i32. The analysis looks these keys up first and falls back to the untyped instruction.
+
+Vectors wider than the vector registers of the target cannot be kept alive by inline assembly. Instructions producing
+a vector therefore form a dependency chain, each iteration operating on the result of the previous one, and the kernel
+stores the end of the chain.
+
+Even at -O0, llc selects vector instructions through the SelectionDAG. It would fold a chain inside a basic block into
+a single instruction, e.g. twenty additions of 3 into one addition of 60, and merge identical extractions of the same
+vector. Every iteration therefore ends its own basic block.
+"""
+
+# Block of the instructions following an iteration
+NEXT_BLOCK = '  br label %chain{next}\n\nchain{next}:\n'
+
+
+from typing import List
+
+from .emitter import Carry, Kernel, template
+from .instruction import Instruction
+from .util import Util
+
+VECTOR_TYPES = ("<4 x float>", "<8 x i32>", "<2 x double>")
+
+INTEGER_OPERATIONS = ("add", "sub", "mul", "and", "or", "xor")
+FLOAT_OPERATIONS = ("fadd", "fsub", "fmul", "fdiv")
+
+# Scalar instructions profiled for i64 and double, with the operands used by the kernels
+SCALAR_OPERATIONS = {
+    "i64": {"add": ("42", "311"), "sub": ("42", "311"), "mul": ("42", "3"), "sdiv": ("42", "3"),
+            "udiv": ("42", "3"), "and": ("42", "311"), "or": ("42", "311"), "xor": ("42", "311"),
+            "shl": ("42", "1"), "lshr": ("42", "1")},
+    "double": {"fadd": ("42.0", "311.0"), "fsub": ("42.0", "311.0"), "fmul": ("42.0", "3.0"),
+               "fdiv": ("42.0", "311.0")},
+}
+
+INTEGER_REDUCTIONS = ("add", "mul")
+FLOAT_REDUCTIONS = ("fadd", "fmul")
+
+# Operand of the vector dependency chains. Floating point chains use 1.0, which neither overflows nor runs into
+# denormals however long the chain gets. The kernels load it from a global, as llc folds a multiplication or division
+# by the constant 1.0
+INTEGER_OPERAND = "3"
+FLOAT_OPERAND = "1.0"
+START_VALUE = {"i32": "42", "i64": "42", "float": "42.0", "double": "42.0"}
+
+
+def splat(type: str, value: str) -> str:
+    """
+    Vector constant of the given type with every element set to the given value
+    """
+    element = Util.get_element_type(type)
+    return "<" + ", ".join([f"{element} {value}"] * Util.get_lanes(type)) + ">"
+
+
+def is_float(type: str) -> bool:
+    return Util.get_element_type(type) in ("half", "float", "double")
+
+
+def scalar_instructions() -> List[Instruction]:
+    """
+    Kernels of the scalar i64 and double instructions
+    """
+    instructions = []
+
+    for ty, operations in SCALAR_OPERATIONS.items():
+        for opcode, (lhs, rhs) in operations.items():
+            instructions.append(Instruction.complex_instruction(
+                f"{opcode}.{Util.mangle(ty)}",
+                f'{opcode} {ty} {lhs}, {rhs}\n  call void asm sideeffect "", "{Util.get_constraint(ty)}"({ty} COUNTER)',
+                f'@global = global {ty} {Util.get_type_default(ty)}',
+                f'store volatile {ty} %1, {ty}* @global',
+                "",
+                True))
+
+    return instructions
+
+
+def vector_instructions() -> List[Instruction]:
+    """
+    Arithmetic, shuffle, insert, extract and reduction kernels of every vector type
+    """
+    instructions = []
+
+    for ty in VECTOR_TYPES:
+        name = Util.mangle(ty)
+        operations = FLOAT_OPERATIONS if is_float(ty) else INTEGER_OPERATIONS
+        reductions = FLOAT_REDUCTIONS if is_float(ty) else INTEGER_REDUCTIONS
+
+        for opcode in operations:
+            instructions.append(Instruction.vector_instruction(f"{opcode}.{name}", opcode, ty))
+
+        for opcode in ("shufflevector", "insertelement", "extractelement"):
+            instructions.append(Instruction.vector_instruction(f"{opcode}.{name}", opcode, ty))
+
+        for reduction in reductions:
+            instructions.append(Instruction.vector_instruction(f"reduce.{reduction}.{name}", f"reduce.{reduction}", ty))
+
+    return instructions
+
+
+def build_vector_kernel(inst: Instruction) -> Kernel:
+    """
+    Build the kernel of a vector instruction
+    """
+    ty = inst.vector_type
+    element = Util.get_element_type(ty)
+    opcode = inst.vector_opcode
+    header = f'@global = global {ty} {splat(ty, START_VALUE[element])}\n'
+
+    # Instructions producing a scalar use the same vector in every iteration and keep their result alive in a register
+    if opcode == "extractelement" or opcode.startswith("reduce."):
+        if opcode == "extractelement":
+            value = f'extractelement {ty} %vec, i32 1'
+        else:
+            intrinsic = f'llvm.vector.{opcode}.{Util.mangle(ty)}'
+            header += f'declare {element} @{intrinsic}({element + ", " if is_float(ty) else ""}{ty})\n'
+
+            # Floating point reductions take a start value
+            start = f'{element} 0.0, ' if is_float(ty) else ''
+            value = f'call {element} @{intrinsic}({start}{ty} %vec)'
+
+        return Kernel(
+            globals=header + f'@sink = global {element} {Util.get_type_default(element)}\n',
+            pretext=f'  %vec = load volatile {ty}, {ty}* @global\n',
+            step=template(f'  %r{{i}} = {value}\n'
+                          f'  call void asm sideeffect "", "{Util.get_constraint(element)}"({element} %r{{i}})\n'
+                          + NEXT_BLOCK),
+            footer=f'  store volatile {element} %r0, {element}* @sink\n')
+
+    pretext = f'  %start = load volatile {ty}, {ty}* @global\n'
+
+    if opcode == "shufflevector":
+        lanes = Util.get_lanes(ty)
+        mask = "<" + ", ".join(f"i32 {lane}" for lane in reversed(range(lanes))) + ">"
+        value = f'shufflevector {ty} %v{{i}}, {ty} %v{{i}}, <{lanes} x i32> {mask}'
+    elif opcode == "insertelement":
+        value = f'insertelement {ty} %v{{i}}, {element} {START_VALUE[element]}, i32 1'
+    else:
+        operand = FLOAT_OPERAND if is_float(ty) else INTEGER_OPERAND
+        header += f'@operand = global {ty} {splat(ty, operand)}\n'
+        pretext += f'  %operand = load volatile {ty}, {ty}* @operand\n'
+        value = f'{opcode} {ty} %v{{i}}, %operand'
+
+    return Kernel(
+        globals=header,
+        pretext=pretext,
+        step=template(f'  %v{{next}} = {value}\n' + NEXT_BLOCK),
+        footer=template(f'  store volatile {ty} {{last}}, {ty}* @global\n'),
+        carry=Carry(ty, "v", "%start"))
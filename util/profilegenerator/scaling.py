@@ -0,0 +1,212 @@
+import argparse
+import json
+import math
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from timeit import default_timer as timer
+
+from profilegenerator.scaling import CALL_DEPTH, KNOBS, MINIMUM, DEFAULT_TRIP_COUNT, ScalingGenerator, ScalingShape, \
+    geometric_sweep
+
+# Analyses whose output is a single document, the comparison analysis writes one per analysis
+ANALYSES = ("monolithic", "clustered", "legacy")
+
+# Phases growing faster than this exponent are reported as superlinear
+DEFAULT_MAX_EXPONENT = 1.2
+
+# Phases staying below this duration in µs are too short to fit a reliable exponent
+DEFAULT_MIN_DURATION = 1000
+
+# Wall time of the whole spear run, reported like a phase
+WALL = "wall"
+
+
+def write_config(baseconfig, analysis, outputdir):
+    """
+    Derive the configuration of the sweep from the given spear configuration. The analysis writes a single document
+    per program into the output directory and skips the dot files, which would add to the measured phases
+    """
+    with open(baseconfig) as f:
+        config = json.load(f)
+
+    config["analysis"]["type"] = analysis
+    config["analysis"]["outputmode"] = "normal"
+    config["analysis"]["outputDirectory"] = str(outputdir)
+    config["analysis"]["writeDotFiles"] = False
+
+    outputdir.mkdir(parents=True, exist_ok=True)
+    configpath = outputdir / "scalingconfig.json"
+    with open(configpath, "w") as f:
+        json.dump(config, f, indent=2)
+
+    return configpath
+
+
+def run_spear(spear, profile, config, program: Path, outputdir: Path) -> dict:
+    """
+    Analyze the program once and return the duration of every phase in µs, including the wall time of the run
+    """
+    # spear analyze exits with 0 even if the analysis of the program failed, so an old output must not be read
+    output = outputdir / f"{program.stem}.json"
+    output.unlink(missing_ok=True)
+
+    start = timer()
+    process = subprocess.run([spear, "analyze", "--profile", str(profile), "--config", str(config),
+                              "--program", str(program)], capture_output=True, text=True)
+    wall = timer() - start
+
+    if process.returncode != 0:
+        message = process.stderr.strip().splitlines()
+        raise RuntimeError(f"spear exited with {process.returncode}" + (f": {message[-1]}" if message else ""))
+
+    if not output.is_file():
+        raise RuntimeError(f"spear wrote no output for {program}")
+
+    with open(output) as f:
+        timings = json.load(f).get("timings", {})
+
+    return {**timings, WALL: wall * 1e6}
+
+
+def median_timings(runs) -> dict:
+    """
+    Median duration of every phase over several runs
+    """
+    phases = {}
+    for run in runs:
+        for phase, duration in run.items():
+            phases.setdefault(phase, []).append(duration)
+
+    return {phase: statistics.median(durations) for phase, durations in phases.items()}
+
+
+def growth_exponent(points):
+    """
+    Exponent k of the power law y = c * x^k fitted to the given (x, y) points by least squares in log-log space.
+    Points with a non-positive coordinate are left out. Returns None for fewer than two distinct x values
+    """
+    logs = [(math.log(x), math.log(y)) for x, y in points if x > 0 and y > 0]
+    if len({x for x, _ in logs}) < 2:
+        return None
+
+    mean_x = statistics.fmean(x for x, _ in logs)
+    mean_y = statistics.fmean(y for _, y in logs)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in logs)
+    variance = sum((x - mean_x) ** 2 for x, _ in logs)
+
+    return covariance / variance
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit the growth exponent of every analysis phase over synthetic "
+                                                 "programs growing along one knob.")
+    parser.add_argument("path", type=Path, help="Directory for the generated programs and the analysis output")
+    parser.add_argument("--profile", type=Path, required=True, help="Profile passed to spear")
+    parser.add_argument("--config", type=Path, required=True, help="spear configuration the sweep is derived from")
+    parser.add_argument("--spear", default="spear", help="spear executable")
+    parser.add_argument("--analysis", choices=ANALYSES, default="monolithic", help="Analysis to measure")
+    parser.add_argument("--knob", choices=KNOBS, required=True, help="Knob growing along the sweep")
+    parser.add_argument("--start", type=int, default=1, help="Value of the knob at the first step")
+    parser.add_argument("--factor", type=float, default=2, help="Growth of the knob from one step to the next")
+    parser.add_argument("--steps", type=int, default=6, help="Steps of the sweep")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per step, the median of every phase is fitted")
+    parser.add_argument("--trip-count", type=int, default=DEFAULT_TRIP_COUNT, help="Iterations of every loop")
+    for knob in KNOBS:
+        parser.add_argument(f"--{knob.replace('_', '-')}", type=int, default=max(MINIMUM[knob], 1),
+                            help="Value of the knob while another knob is swept")
+    parser.add_argument("--max-exponent", type=float, default=DEFAULT_MAX_EXPONENT,
+                        help=f"Exponent above which a phase is reported as superlinear (default: "
+                             f"{DEFAULT_MAX_EXPONENT})")
+    parser.add_argument("--min-duration", type=float, default=DEFAULT_MIN_DURATION,
+                        help=f"Phases staying below this duration in µs are not checked (default: "
+                             f"{DEFAULT_MIN_DURATION})")
+
+    args = parser.parse_args()
+
+    if args.runs < 1:
+        print("Runs must be greater than 0")
+        sys.exit(1)
+
+    try:
+        base = ScalingShape(**{knob: getattr(args, knob) for knob in KNOBS})
+        shapes = [base.with_knob(args.knob, value) for value in geometric_sweep(args.start, args.factor, args.steps)]
+        gen = ScalingGenerator(args.path / "programs", args.trip_count)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    if len(shapes) < 2:
+        print("The sweep needs at least two distinct knob values to fit an exponent")
+        sys.exit(1)
+
+    # The call chains are made of the functions, longer chains than functions leave the program unchanged
+    if args.knob == CALL_DEPTH and shapes[-1].call_depth > base.functions:
+        print(f"call_depth cannot grow beyond the {base.functions} functions, raise --functions to at least "
+              f"{shapes[-1].call_depth}")
+        sys.exit(1)
+
+    (args.path / "programs").mkdir(parents=True, exist_ok=True)
+    outputdir = args.path / "output"
+    config = write_config(args.config, args.analysis, outputdir)
+
+    failed = [result for result in gen.generate(shapes) if not result.ok]
+    for result in failed:
+        print(f"Failed to generate {result.filename}: {result.error}", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+    steps = []
+    for shape in shapes:
+        program = gen.filename(shape)
+
+        try:
+            timings = median_timings([run_spear(args.spear, args.profile, config, program, outputdir)
+                                      for _ in range(args.runs)])
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"Failed to analyze {program}: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        steps.append({"shape": shape.to_dict(), "lines": gen.estimate(shape).lines, "timings": timings})
+        print(f"{args.knob}={getattr(shape, args.knob)}: {steps[-1]['lines']} lines, {timings[WALL] / 1e6:.3f}s")
+
+    # The exponents relate a phase to the swept knob and to the lines of the program. Knobs like call_depth restructure
+    # the program without adding lines, so only the knob exponent can be fitted for them. Both are checked where they
+    # exist, a fixed part of the program hides a superlinear phase in the knob exponent
+    phases = sorted({phase for step in steps for phase in step["timings"]})
+
+    print(f"{'phase':<14} {'exponent':>9} {'size exp.':>9} {'largest ms':>11}")
+    superlinear = []
+    exponents = {}
+    size_exponents = {}
+    for phase in phases:
+        measured = [step for step in steps if phase in step["timings"]]
+        exponent = growth_exponent([(step["shape"][args.knob], step["timings"][phase]) for step in measured])
+        size_exponent = growth_exponent([(step["lines"], step["timings"][phase]) for step in measured])
+        exponents[phase] = exponent
+        size_exponents[phase] = size_exponent
+        largest = max(step["timings"][phase] for step in measured)
+
+        flag = ""
+        fitted = [value for value in (exponent, size_exponent) if value is not None]
+        if fitted and max(fitted) > args.max_exponent and largest >= args.min_duration:
+            superlinear.append(phase)
+            flag = "  superlinear"
+
+        shown = [f"{value:.2f}" if value is not None else "-" for value in (exponent, size_exponent)]
+        print(f"{phase:<14} {shown[0]:>9} {shown[1]:>9} {largest / 1e3:>11.3f}{flag}")
+
+    with open(args.path / f"scaling_{args.knob}.json", "w") as f:
+        json.dump({"knob": args.knob, "analysis": args.analysis, "trip_count": args.trip_count, "steps": steps,
+                   "exponents": exponents, "size_exponents": size_exponents, "superlinear": superlinear}, f,
+                  indent=2)
+
+    if superlinear:
+        print(f"{len(superlinear)} phases grow with an exponent above {args.max_exponent} along {args.knob}: "
+              f"{', '.join(superlinear)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()